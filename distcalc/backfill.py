@@ -0,0 +1,154 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import sys
+import glob
+import json
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATTERN = "Journal.*.log"
+JUMP_EVENTS = ("FSDJump", "CarrierJump")
+JUMP_DISTANCE = b'"JumpDist"'
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backfill.json")
+
+
+def scan_journal(path: str, offset: int = 0) -> Tuple[str, int, float, int]:
+    """
+    Sum up the jump distances of a journal file starting at offset. Only complete lines are read, so the returned
+    offset can be used to continue once the game has written more.
+    Returns (path, new offset, distance, number of jumps).
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+
+    distance = 0.0
+    jumps = 0
+    # look for the few lines containing a jump distance instead of splitting and parsing every line
+    position = data.find(JUMP_DISTANCE, 0, end)
+    while position != -1:
+        line_start = data.rfind(b"\n", 0, position) + 1
+        line_end = data.find(b"\n", position, end)
+        try:
+            entry = json.loads(data[line_start:line_end])
+            if entry.get("event") in JUMP_EVENTS:
+                distance += entry["JumpDist"]
+                jumps += 1
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Skipping broken journal line in {path} at {offset + line_start}")
+        position = data.find(JUMP_DISTANCE, line_end, end)
+    return path, offset + end, distance, jumps
+
+
+class JournalBackfill(object):
+    """
+    Calculates the travelled distance from all journal files. The progress of each file is stored in a checkpoint
+    file, so running it again only reads what the game has written since.
+    """
+
+    def __init__(self, journal_dir: str, checkpoint_path: str, workers: int = None, processes: bool = True):
+        self.journal_dir = journal_dir
+        self.checkpoint_path = checkpoint_path
+        self.workers = workers or os.cpu_count() or 1
+        self.processes = processes
+        self.checkpoints: Dict[str, Dict] = dict()  # file name -> {"offset", "distance", "jumps"}
+
+    def load_checkpoints(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                self.checkpoints = json.load(f).get("files", dict())
+        except FileNotFoundError:
+            self.checkpoints = dict()
+        except (OSError, ValueError):
+            logger.exception(f"Could not read the checkpoints of the journal backfill from {self.checkpoint_path}")
+            self.checkpoints = dict()
+
+    def save_checkpoints(self):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.checkpoints}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def create_executor(self) -> Executor:
+        # New processes would start another instance of a frozen EDMC, so use threads there. Since only the few lines
+        # with a jump distance are parsed, a single thread still gets through the journals quickly.
+        if not self.processes or getattr(sys, "frozen", False) or self.workers == 1:
+            return ThreadPoolExecutor(max_workers=self.workers)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def run(self) -> Tuple[float, int]:
+        """
+        Returns (total distance, number of jumps) of all journal files.
+        """
+        self.load_checkpoints()
+        pending = list()
+        present = set()
+        for path in glob.glob(os.path.join(self.journal_dir, JOURNAL_PATTERN)):
+            file_name = os.path.basename(path)
+            present.add(file_name)
+            size = os.path.getsize(path)
+            checkpoint = self.checkpoints.get(file_name)
+            if checkpoint and checkpoint["offset"] > size:  # the file was replaced, start over
+                checkpoint = None
+            if not checkpoint:
+                checkpoint = {"offset": 0, "distance": 0.0, "jumps": 0}
+                self.checkpoints[file_name] = checkpoint
+            if size > checkpoint["offset"]:
+                pending.append((path, checkpoint["offset"]))
+
+        # biggest files first so a single large file doesn't end up last in the pool
+        pending.sort(key=lambda job: os.path.getsize(job[0]) - job[1], reverse=True)
+        if pending:
+            with self.create_executor() as executor:
+                for path, offset, distance, jumps in executor.map(scan_journal, *zip(*pending)):
+                    checkpoint = self.checkpoints[os.path.basename(path)]
+                    checkpoint["offset"] = offset
+                    checkpoint["distance"] += distance
+                    checkpoint["jumps"] += jumps
+            self.save_checkpoints()
+
+        # Deleted journals still count, the jumps happened after all
+        total = sum(checkpoint["distance"] for checkpoint in self.checkpoints.values())
+        jumps = sum(checkpoint["jumps"] for checkpoint in self.checkpoints.values())
+        logger.info(f"Journal backfill: {len(pending)} of {len(present)} files had new data, {jumps} jumps with {total:.2f} Ly")
+        return total, jumps
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m distcalc.backfill", description="Calculate the travelled distance from the journal files.")
+    parser.add_argument("journal_dir", help="folder containing the journal files")
+    parser.add_argument("--checkpoints", default=DEFAULT_CHECKPOINT_PATH, help=f"checkpoint file (default: {DEFAULT_CHECKPOINT_PATH})")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+    backfill = JournalBackfill(args.journal_dir, args.checkpoints, args.workers)
+    total, jumps = backfill.run()
+    print(f"{jumps} jumps, {total:.2f} Ly")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1025 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+# Benchmarks for the hot paths of the plugin. Run them from the plugin folder with
+#     python -m distcalc.benchmark [name ...]
+
+import os
+import sys
+import json
+import math
+import time
+import heapq
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import tracemalloc
+from array import array
+from typing import Callable, Dict, Iterator, List
+
+from distcalc import backfill, core, history, navroute, proximity, publish, route, spatial, stats, systemindex, tail, targets, targetstore
+
+BENCHMARKS: Dict[str, Callable[[argparse.Namespace], None]] = dict()
+
+
+def benchmark(function: Callable[[argparse.Namespace], None]):
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+def time_per_call(function: Callable, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def random_targets(count: int, seed: int = 1) -> List[Dict]:
+    rng = random.Random(seed)
+    return [{"system": f"Target {i}", "x": rng.uniform(-40000, 40000), "y": rng.uniform(-2000, 2000), "z": rng.uniform(-10000, 70000)}
+            for i in range(count)]
+
+
+def write_synthetic_dump(path: str, count: int, rng: random.Random) -> List[str]:
+    """
+    Write an EDSM dump with count procedurally named systems like "Eok Bluae AB-C d1-23". Returns some of the names.
+    """
+    syllables = ["eo", "bl", "ua", "ae", "pr", "oo", "sy", "nu", "ef", "ph", "ro", "ai", "sk", "au", "mb", "ch", "th", "io", "ck", "hyp"]
+    regions = ["".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).title() for _ in range(2000)]
+    sample = list()
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(count):
+            letters = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+            name = f"{rng.choice(regions)} {letters[:2]}-{letters[2]} {rng.choice('abcdefgh')}{rng.randrange(30)}-{rng.randrange(5000)}"
+            if i % max(count // 1000, 1) == 0:
+                sample.append(name)
+            f.write(json.dumps({"id": i, "name": name, "coords": {"x": rng.uniform(-40000, 40000), "y": rng.uniform(-2000, 2000), "z": rng.uniform(-10000, 70000)}}))
+            f.write(",\n" if i < count - 1 else "\n")
+        f.write("]\n")
+    return sample
+
+
+def percentiles(latencies: List[float]) -> str:
+    latencies = sorted(latencies)
+    return f"p50 {latencies[len(latencies) // 2] * 1e6:.1f} us p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.1f} us"
+
+
+@benchmark
+def lookup(args: argparse.Namespace):
+    """
+    Looking up a system name in the index as the EDSM button does: cold, with the index dropped from the page cache
+    and opened again before each lookup, and warm, for names in the index and names that aren't.
+    """
+    rng = random.Random(6)
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        dump_path = os.path.join(directory, "systems.json")
+        index_path = os.path.join(directory, systemindex.DEFAULT_FILE_NAME)
+        sample = write_synthetic_dump(dump_path, args.systems, rng)
+        systemindex.build_index(dump_path, index_path)
+        misses = [name[::-1] for name in sample]
+
+        def evict():
+            # drop the cached pages of the index, like after a reboot. Not available everywhere
+            if hasattr(os, "posix_fadvise"):
+                fd = os.open(index_path, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                finally:
+                    os.close(fd)
+
+        results = dict()
+        for kind, names in (("hit", sample), ("miss", misses)):
+            cold = list()
+            for name in names[:100]:
+                evict()
+                start = time.perf_counter()
+                index = systemindex.SystemIndex(index_path)
+                found = index.lookup(name)
+                cold.append(time.perf_counter() - start)
+                index.close()
+                assert (found is not None) == (kind == "hit")
+            index = systemindex.SystemIndex(index_path)
+            try:
+                for name in names:
+                    index.lookup(name)  # touch the pages
+                warm = list()
+                for _ in range(10):
+                    for name in names:
+                        start = time.perf_counter()
+                        index.lookup(name)
+                        warm.append(time.perf_counter() - start)
+            finally:
+                index.close()
+            results[kind] = (cold, warm)
+        print(f"lookup: {args.systems} systems" + ("" if hasattr(os, "posix_fadvise") else " (page cache not dropped)") + "; " +
+              "; ".join(f"{kind} cold {percentiles(cold)}, warm {percentiles(warm)}" for kind, (cold, warm) in results.items()))
+    finally:
+        shutil.rmtree(directory)
+
+
+@benchmark
+def distances(args: argparse.Namespace):
+    """
+    Distances to all targets after a jump: the scalar loop used before against the batched TargetList.
+    """
+    systems = random_targets(args.targets)
+    target_list = targets.TargetList(systems)
+    position = (12.5, -3.25, 25000.0)
+
+    def scalar():
+        return [math.sqrt((s["x"] - position[0]) ** 2 + (s["y"] - position[1]) ** 2 + (s["z"] - position[2]) ** 2) for s in systems]
+
+    def batched():
+        return target_list.distances(*position)
+
+    for a, b in zip(scalar(), batched()):
+        assert abs(a - b) < 1e-6
+
+    scalar_time = time_per_call(scalar, args.repeat)
+    batched_time = time_per_call(batched, args.repeat)
+    backend = "numpy" if targets.numpy is not None else "array"
+    print(f"distances: {args.targets} targets, scalar loop {scalar_time * 1000:.3f} ms, "
+          f"batched ({backend}) {batched_time * 1000:.3f} ms, speedup {scalar_time / batched_time:.1f}x")
+
+
+@benchmark
+def nearest(args: argparse.Namespace):
+    """
+    Nearest targets of the sector grid against calculating all distances. tests/test_spatial.py checks the results.
+    Half of the targets are clustered around the bubble to get crowded as well as empty sectors.
+    """
+    rng = random.Random(2)
+    systems = random_targets(args.targets // 2) + [{"system": f"Bubble {i}", "x": rng.gauss(0, 150), "y": rng.gauss(0, 150), "z": rng.gauss(0, 150)}
+                                                   for i in range(args.targets - args.targets // 2)]
+    grid = spatial.SectorGrid()
+    for i, s in enumerate(systems):
+        grid.insert(i, s["x"], s["y"], s["z"])
+
+    # remove and insert some entries again to check that incremental updates keep the grid consistent
+    for i in range(0, len(systems), 7):
+        grid.remove(i)
+    for i in range(0, len(systems), 14):
+        grid.insert(i, systems[i]["x"], systems[i]["y"], systems[i]["z"])
+    present = [i for i in range(len(systems)) if i in grid]
+
+    positions = [(rng.gauss(0, 200), rng.gauss(0, 200), rng.gauss(0, 200)) for _ in range(25)] + \
+                [(rng.uniform(-40000, 40000), rng.uniform(-2000, 2000), rng.uniform(-10000, 70000)) for _ in range(25)]
+
+    def brute_force(position):
+        return sorted(math.sqrt((systems[i]["x"] - position[0]) ** 2 + (systems[i]["y"] - position[1]) ** 2 + (systems[i]["z"] - position[2]) ** 2)
+                      for i in present)
+
+    index = 0
+
+    def query():
+        nonlocal index
+        index = (index + 1) % len(positions)
+        return grid.nearest(*positions[index], args.nearest)
+
+    def scan():
+        nonlocal index
+        index = (index + 1) % len(positions)
+        return heapq.nsmallest(args.nearest, brute_force(positions[index]))
+
+    nearest_time = time_per_call(query, args.repeat)
+    scan_time = time_per_call(scan, max(1, args.repeat // 10))
+    print(f"nearest: {len(grid)} targets, {args.nearest} nearest from grid {nearest_time * 1000:.3f} ms, "
+          f"full scan {scan_time * 1000:.3f} ms")
+
+
+def write_synthetic_journal(path: str, size: int, rng: random.Random) -> float:
+    """
+    Write a journal file of roughly size bytes where about every 20th event is a jump. Returns the jumped distance.
+    """
+    filler = ('{{ "timestamp":"2021-01-01T00:00:00Z", "event":"ReceiveText", "From":"", "Message":"$COMMS_entered:#name=Sector {0};", '
+              '"Message_Localised":"Entered Channel: Sector {0}", "Channel":"npc" }}\n')
+    jump = ('{{ "timestamp":"2021-01-01T00:00:00Z", "event":"FSDJump", "StarSystem":"Sector {0}", "SystemAddress":{0}, '
+            '"StarPos":[{1:.5f},{2:.5f},{3:.5f}], "SystemAllegiance":"", "Body":"Sector {0}", "JumpDist":{4:.3f}, "FuelUsed":1.5, "FuelLevel":30.0 }}\n')
+    total = 0.0
+    written = 0
+    with open(path, "w", encoding="utf-8") as f:
+        while written < size:
+            if rng.random() < 0.05:
+                distance = round(rng.uniform(5, 60), 3)
+                total += distance
+                line = jump.format(rng.randrange(1 << 40), rng.uniform(-100, 100), rng.uniform(-100, 100), rng.uniform(-100, 100), distance)
+            else:
+                line = filler.format(rng.randrange(1000))
+            f.write(line)
+            written += len(line)
+    return total
+
+
+@benchmark
+def journal_backfill(args: argparse.Namespace):
+    """
+    Backfill of the travelled distance from synthetic journals: a cold run and a second run that only reads the data
+    appended since the first one.
+    """
+    rng = random.Random(3)
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        expected = 0.0
+        for i in range(args.journals):
+            expected += write_synthetic_journal(os.path.join(directory, f"Journal.{i:06d}.01.log"), args.journal_size * 1024 * 1024, rng)
+        checkpoint_path = os.path.join(directory, "backfill.json")
+        size = args.journals * args.journal_size
+
+        start = time.perf_counter()
+        total, jumps = backfill.JournalBackfill(directory, checkpoint_path).run()
+        cold = time.perf_counter() - start
+        assert abs(total - expected) < 1e-3 * max(jumps, 1)
+
+        expected += write_synthetic_journal(os.path.join(directory, f"Journal.{args.journals:06d}.01.log"), 1024 * 1024, rng)
+        start = time.perf_counter()
+        total, jumps = backfill.JournalBackfill(directory, checkpoint_path).run()
+        warm = time.perf_counter() - start
+        assert abs(total - expected) < 1e-3 * max(jumps, 1)
+
+        print(f"journal_backfill: {size} MB in {args.journals} files, {jumps} jumps, cold {cold:.2f} s ({size / cold:.0f} MB/s), "
+              f"re-run with 1 MB new data {warm * 1000:.1f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+def synthetic_journal_events(count: int, seed: int = 4) -> Iterator[Dict]:
+    """
+    Yield count journal events as EDMC passes them to the plugin: mostly jumps, some Location events and a LoadGame
+    every few hundred events. The events come from a pool that is cycled, so millions of them don't need to be kept.
+    """
+    rng = random.Random(seed)
+    pool: List[Dict] = list()
+    for i in range(4096):
+        position = [round(rng.gauss(0, 500), 5), round(rng.gauss(0, 100), 5), round(rng.gauss(0, 500), 5)]
+        if i % 300 == 0:
+            pool.append({"timestamp": "2021-01-01T00:00:00Z", "event": "LoadGame", "Commander": "Benchmark", "GameMode": "Solo"})
+        elif i % 50 == 0:
+            pool.append({"timestamp": "2021-01-01T00:00:00Z", "event": "Location", "StarSystem": f"Sector {i}", "SystemAddress": i, "StarPos": position})
+        else:
+            pool.append({"timestamp": "2021-01-01T00:00:00Z", "event": "FSDJump", "StarSystem": f"Sector {i}", "SystemAddress": i, "StarPos": position,
+                         "JumpDist": round(rng.uniform(5, 60), 3), "FuelUsed": 1.5, "FuelLevel": 30.0})
+    for i in range(count):
+        yield pool[i % len(pool)]
+
+
+@benchmark
+def journal_events(args: argparse.Namespace):
+    """
+    The headless core processing synthetic journal events like the plugin does. Reports the throughput, the latency
+    per event and the peak memory allocated while processing. The plugin coalesces the updates of the main window, so
+    the time to get the displayed targets after a jump is measured on its own.
+    """
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    systems = random_targets(args.event_targets)
+
+    def create_core() -> core.DistanceCore:
+        config = core.MemoryConfig()
+        config.set(core.OPTIONS_KEY, 0b111)  # total and session distance, session per game
+        engine = core.DistanceCore(config, os.path.join(directory, f"travelled{len(os.listdir(directory))}.log"))
+        engine.set_targets(systems)
+        return engine
+
+    try:
+        # throughput without timing every single event
+        engine = create_core()
+        start = time.perf_counter()
+        for entry in synthetic_journal_events(args.events):
+            engine.journal_entry(entry)
+        elapsed = time.perf_counter() - start
+        expected = engine.distance_total
+        engine.close()
+
+        # latency of every event
+        engine = create_core()
+        latencies = array("d", bytes(8 * args.events))
+        clock = time.perf_counter
+        for i, entry in enumerate(synthetic_journal_events(args.events)):
+            start = clock()
+            engine.journal_entry(entry)
+            latencies[i] = clock() - start
+        assert abs(engine.distance_total - expected) < 1e-6 * max(expected, 1)
+        engine.close()
+        ordered = sorted(latencies)
+
+        def percentile(p: float) -> float:
+            return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1e6
+
+        # memory, tracing slows everything down so it gets its own run
+        engine = create_core()
+        tracemalloc.start()
+        for entry in synthetic_journal_events(args.events):
+            engine.journal_entry(entry)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        refresh = time_per_call(engine.get_displayed_targets, args.repeat)
+        engine.close()
+
+        print(f"journal_events: {args.events} events, {args.events / elapsed:,.0f} events/s, latency p50 {percentile(0.5):.1f} us, "
+              f"p99 {percentile(0.99):.1f} us, p99.9 {percentile(0.999):.1f} us, max {ordered[-1] * 1e6:.0f} us, peak memory {peak / 1024:.0f} KiB, "
+              f"displayed targets of {args.event_targets} {refresh * 1e6:.1f} us")
+    finally:
+        shutil.rmtree(directory)
+
+
+@benchmark
+def complete(args: argparse.Namespace):
+    """
+    Completion and typo suggestions of the system index as used by the typeahead in the settings.
+    Every prefix of the sample names is queried, like typing them letter by letter.
+    """
+    rng = random.Random(5)
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        dump_path = os.path.join(directory, "systems.json")
+        index_path = os.path.join(directory, systemindex.DEFAULT_FILE_NAME)
+        sample = write_synthetic_dump(dump_path, args.systems, rng)
+        start = time.perf_counter()
+        systemindex.build_index(dump_path, index_path)
+        build = time.perf_counter() - start
+
+        index = systemindex.SystemIndex(index_path)
+        try:
+            latencies = list()
+            for name in sample[:200]:
+                for length in range(1, len(name) + 1):
+                    start = time.perf_counter()
+                    results = index.complete(name[:length], args.nearest)
+                    latencies.append(time.perf_counter() - start)
+                    assert results and all(systemindex.normalize_name(r[0]).startswith(systemindex.normalize_name(name[:length])) for r in results)
+            typo_latencies = list()
+            for name in sample[:200]:
+                typo = name[:-2] + name[-1] + name[-2]  # swapped the last two characters
+                start = time.perf_counter()
+                results = index.complete(typo, args.nearest) or index.suggest(typo, args.nearest)
+                typo_latencies.append(time.perf_counter() - start)
+                assert results
+            latencies.sort()
+            typo_latencies.sort()
+            print(f"complete: {len(index)} systems, index built in {build:.1f} s, {len(latencies)} prefixes p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, "
+                  f"max {latencies[-1] * 1000:.3f} ms, with typos p50 {typo_latencies[len(typo_latencies) // 2] * 1000:.3f} ms, "
+                  f"max {typo_latencies[-1] * 1000:.3f} ms")
+        finally:
+            index.close()
+    finally:
+        shutil.rmtree(directory)
+
+
+@benchmark
+def corridor(args: argparse.Namespace):
+    """
+    Reading the stars around the straight line of a route from the system index, as before plotting it: all records
+    against the cells the slices of the corridor touch. Both have to find the same stars.
+    """
+    rng = random.Random(6)
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        dump_path = os.path.join(directory, "systems.json")
+        index_path = os.path.join(directory, systemindex.DEFAULT_FILE_NAME)
+        write_synthetic_dump(dump_path, args.systems, rng)
+        systemindex.build_index(dump_path, index_path)
+        index = systemindex.SystemIndex(index_path)
+        try:
+            results = list()
+            for start, end in (((0.0, 0.0, 0.0), (1200.0, 50.0, 900.0)), ((0.0, 0.0, 0.0), (-9530.5, -910.3, 19808.1))):
+                begin = time.perf_counter()
+                star_map = route.StarMap.from_system_index(index, start, end, args.jump_range)
+                cells = time.perf_counter() - begin
+
+                begin = time.perf_counter()
+                lower = tuple(min(a, b) - route.CORRIDOR_RADIUS for a, b in zip(start, end))
+                upper = tuple(max(a, b) + route.CORRIDOR_RADIUS for a, b in zip(start, end))
+                scanned = list(index._scan_box(lower, upper))
+                scan = time.perf_counter() - begin
+
+                direction = tuple(b - a for a, b in zip(start, end))
+                length_squared = sum(d * d for d in direction)
+                expected = set()
+                for name, x, y, z in scanned:
+                    t = max(0.0, min(1.0, sum((c - s) * d for c, s, d in zip((x, y, z), start, direction)) / length_squared))
+                    if math.dist((x, y, z), tuple(s + t * d for s, d in zip(start, direction))) <= route.CORRIDOR_RADIUS:
+                        expected.add(name)
+                assert set(star_map.names) == expected and len(star_map) == len(expected)
+                results.append(f"{math.dist(start, end):.0f} Ly {len(star_map)} stars, all records {scan * 1000:.0f} ms, cells {cells * 1000:.1f} ms")
+        finally:
+            index.close()
+        print(f"corridor: {args.systems} systems, {index.cell_count} cells; " + "; ".join(results))
+    finally:
+        shutil.rmtree(directory)
+
+
+@benchmark
+def route_plot(args: argparse.Namespace):
+    """
+    A* routes of 1000 Ly and more over random stars, once without and once with neutron stars on the way. One star in a
+    hundred is a neutron star, so there is one in range of most jumps and supercharging has to save jumps. Every hop of a
+    route is checked against the jump range.
+    """
+    rng = random.Random(6)
+    jump_range = args.jump_range
+    length = 1200.0
+    stars = [(f"Star {i}", rng.uniform(-100, length + 100), rng.uniform(-100, 100), rng.uniform(-100, 100), rng.random() < 0.01)
+             for i in range(args.stars)]
+    endpoints = [((rng.uniform(0, 50), rng.uniform(-50, 50), rng.uniform(-50, 50)), (rng.uniform(length - 200, length), rng.uniform(-50, 50), rng.uniform(-50, 50)))
+                 for _ in range(args.routes)]
+    results = list()
+    total_jumps = list()
+    for neutrons in (False, True):
+        star_map = route.StarMap(jump_range)
+        for name, x, y, z, neutron in stars:
+            star_map.add(name, x, y, z, neutron and neutrons)
+        planner = route.RoutePlanner(star_map, jump_range)
+        times = list()
+        jumps = list()
+        for start, end in endpoints:
+            begin = time.perf_counter()
+            result = planner.plot(start, end)
+            times.append(time.perf_counter() - begin)
+            assert result is not None
+            position = start
+            reach = jump_range
+            for hop in [int(system_name.split()[1]) for system_name in result.systems] + [None]:  # the stars are numbered in order
+                coordinates = end if hop is None else star_map.get_coordinates(hop)
+                assert math.dist(position, coordinates) <= reach + 1e-6
+                position = coordinates
+                reach = jump_range * route.NEUTRON_BOOST if hop is not None and star_map.neutron[hop] else jump_range
+            if not neutrons:
+                assert result.jumps >= core.estimate_jumps(math.dist(start, end), jump_range) and result.neutron_jumps == 0
+            jumps.append(result.jumps)
+        times.sort()
+        total_jumps.append(sum(jumps))
+        results.append(f"{'with' if neutrons else 'without'} neutron stars {sum(jumps) / len(jumps):.1f} jumps, "
+                       f"p50 {times[len(times) // 2] * 1000:.0f} ms, max {times[-1] * 1000:.0f} ms")
+    assert total_jumps[1] < total_jumps[0] * 0.75, "supercharging doesn't save jumps"
+    print(f"route_plot: {args.stars} stars, {args.routes} routes of 1000-1200 Ly with {jump_range} Ly range, " + ", ".join(results))
+
+
+@benchmark
+def navroute_progress(args: argparse.Namespace):
+    """
+    Following a plotted route of many hops: loading it once and the update after each jump, with a detour off the
+    route every 100 jumps. The remaining distance is checked against summing up the rest of the route.
+    """
+    rng = random.Random(7)
+    hops = list()
+    position = [0.0, 0.0, 0.0]
+    for i in range(args.hops):
+        hops.append({"StarSystem": f"Hop {i}", "SystemAddress": 1000 + i, "StarPos": list(position), "StarClass": "K"})
+        position = [position[0] + rng.uniform(20, 60), position[1] + rng.uniform(-5, 5), position[2] + rng.uniform(-5, 5)]
+
+    start = time.perf_counter()
+    tracker = navroute.NavRoute()
+    tracker.load(hops)
+    load = time.perf_counter() - start
+
+    latencies = list()
+    for i in range(1, args.hops):
+        if i % 100 == 0:
+            tracker.arrive(1, (hops[i]["StarPos"][0], 500.0, 0.0), "2021-01-01T00:00:00Z")  # a detour
+            assert tracker.off_route is not None and tracker.jumps_left == args.hops - i + 1
+        timestamp = f"2021-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+        begin = time.perf_counter()
+        tracker.arrive(1000 + i, tuple(hops[i]["StarPos"]), timestamp)
+        remaining = tracker.remaining_distance
+        latencies.append(time.perf_counter() - begin)
+        if i % 500 == 0:
+            expected = sum(math.dist(a["StarPos"], b["StarPos"]) for a, b in zip(hops[i:], hops[i + 1:]))
+            assert abs(remaining - expected) < 1e-6 * max(expected, 1.0) and tracker.jumps_left == args.hops - 1 - i
+    assert tracker.finished
+    latencies.sort()
+    print(f"navroute_progress: {args.hops} hops loaded in {load * 1000:.1f} ms, per jump p50 {latencies[len(latencies) // 2] * 1e6:.1f} us, "
+          f"max {latencies[-1] * 1e6:.1f} us, {tracker.resyncs} re-syncs")
+
+
+@benchmark
+def jump_history(args: argparse.Namespace):
+    """
+    Memory of the jump history compared to keeping the jumps as tuples, the time per recorded jump and the size of the
+    history file. The rolling statistics are checked against recalculating them from the recorded jumps.
+    """
+    rng = random.Random(8)
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        jumps = list()
+        timestamp = 1600000000.0
+        for _ in range(args.jumps):
+            timestamp += rng.uniform(30, 90)
+            jumps.append((timestamp, rng.uniform(5, 60), rng.uniform(-1000, 1000), rng.uniform(-100, 100), rng.uniform(-1000, 1000)))
+
+        def record_all() -> history.JumpHistory:
+            records = history.JumpHistory(os.path.join(directory, history.DEFAULT_FILE_NAME), os.path.join(directory, history.DEFAULT_SUMMARY_FILE_NAME),
+                                          capacity=args.history_capacity)
+            for timestamp, distance, x, y, z in jumps:
+                records.add(distance, x, y, z, "Benchmark", timestamp)
+            return records
+
+        start = time.perf_counter()
+        record_all().close()
+        elapsed = time.perf_counter() - start
+        os.remove(os.path.join(directory, history.DEFAULT_FILE_NAME))
+        os.remove(os.path.join(directory, history.DEFAULT_SUMMARY_FILE_NAME))
+
+        tracemalloc.start()
+        records = record_all()
+        history_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        array_bytes = sum(len(a) * a.itemsize for a in (records.timestamps, records.distances, records.x, records.y, records.z, records.commander_numbers))
+
+        tracemalloc.start()
+        tuples = [(timestamp, distance, x, y, z, "Benchmark") for timestamp, distance, x, y, z in jumps[-args.history_capacity:]]
+        tuple_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        window = [jump for jump in jumps if jump[0] >= jumps[-1][0] - history.RATE_WINDOW][-args.history_capacity:]
+        assert records.window_jumps == len(window)
+        assert abs(records.window_distance - sum(jump[1] for jump in window)) < 1e-3 * len(window)
+        assert abs(records.window_longest - max(jump[1] for jump in window)) < 1e-4
+        assert abs(records.session_longest - max(jump[1] for jump in jumps)) < 1e-9
+        records.close()
+        file_size = os.path.getsize(records.path)
+        assert file_size == len(jumps) * history.JumpHistory.RECORD.size and sum(1 for _ in records.read_file()) == len(jumps)
+
+        print(f"jump_history: {len(jumps)} jumps, {elapsed / len(jumps) * 1e6:.1f} us per jump, {args.history_capacity} in memory: "
+              f"{array_bytes / args.history_capacity:.0f} bytes per jump in the arrays, {history_bytes / 1024:.0f} KiB for the whole history, "
+              f"{tuple_bytes / len(tuples):.0f} bytes per jump as tuples, history file {file_size / len(jumps):.0f} bytes per jump")
+    finally:
+        shutil.rmtree(directory)
+
+
+@benchmark
+def instrumentation(args: argparse.Namespace):
+    """
+    Cost of @timed: an empty function called plain and timed with the statistics enabled and disabled. Journal events
+    are processed timed as well to show the percentiles the preferences display.
+    """
+    calls = args.repeat * 5000
+
+    def empty():
+        pass
+
+    timed_empty = stats.timed("benchmark.empty")(empty)
+    enabled = stats.STATS.enabled
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    distance_core = core.DistanceCore(core.MemoryConfig(), os.path.join(directory, "travelled.log"))
+    try:
+        plain = time_per_call(empty, calls)
+        stats.STATS.enabled = True
+        with_stats = time_per_call(timed_empty, calls)
+        stats.STATS.enabled = False
+        without_stats = time_per_call(timed_empty, calls)
+
+        stats.STATS.enabled = True
+        distance_core.set_targets(random_targets(args.event_targets))
+        timed_entry = stats.timed("benchmark.journal_entry")(distance_core.journal_entry)
+        for entry in synthetic_journal_events(args.repeat * 100):
+            timed_entry(entry)
+        snapshot = stats.STATS.snapshot()
+        assert snapshot["timers"]["benchmark.empty"]["count"] == calls
+        events = snapshot["timers"]["benchmark.journal_entry"]
+    finally:
+        stats.STATS.enabled = enabled
+        stats.STATS.reset()
+        distance_core.close()
+        shutil.rmtree(directory)
+    print(f"instrumentation: {calls} calls, plain {plain * 1e9:.0f} ns, timed {with_stats * 1e9:.0f} ns, disabled {without_stats * 1e9:.0f} ns; "
+          f"{events['count']} journal events, mean {events['mean_ms'] * 1000:.1f} us, p50 {events['p50_ms'] * 1000:.0f} us, "
+          f"p99 {events['p99_ms'] * 1000:.0f} us")
+
+
+@benchmark
+def target_editor(args: argparse.Namespace):
+    """
+    The work behind the list of targets in the settings: opening it with all targets, filtering while typing, moving
+    a block of targets, deleting targets and getting the list to save. The list itself only ever has the rows on
+    screen, so the time of Tk doesn't depend on the number of targets.
+    """
+    systems = random_targets(args.targets)
+    systems.extend({"system": f"Unresolved {i}", "x": None, "y": None, "z": None} for i in range(args.targets // 100))
+    lines = list()
+
+    start = time.perf_counter()
+    editor = targets.TargetEditor(systems)
+    lines.append(f"open {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    typed = "target 12"
+    start = time.perf_counter()
+    for i in range(1, len(typed) + 1):
+        editor.set_filter(typed[:i])
+    keystroke = (time.perf_counter() - start) / len(typed)
+    assert all(typed in editor.targets[number]["system"].lower() for number in editor.visible) and editor.visible
+    editor.set_filter("")
+    assert editor.visible == editor.order
+    lines.append(f"filter {keystroke * 1000:.2f} ms per keystroke")
+
+    block = editor.order[10:20]
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        editor.move(block, editor.order[-1], after=True)
+        editor.move(block, editor.order[0])
+    move = (time.perf_counter() - start) / (2 * args.repeat)
+    assert editor.order[:10] == block
+    lines.append(f"move {move * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    editor.remove(editor.order[::2])
+    lines.append(f"delete half {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    saved = editor.get_targets()
+    lines.append(f"save {(time.perf_counter() - start) * 1000:.1f} ms")
+    assert len(saved) == len(editor) and sum(1 for target in saved if target["x"] is None) == len(editor.unresolved())
+    print(f"target_editor: {len(systems)} targets, " + ", ".join(lines))
+
+
+@benchmark
+def target_store(args: argparse.Namespace):
+    """
+    Loading and saving the targets: the JSON string in the config used before against the target store, changing the
+    coordinates of one target (written in place) and moving the targets over from the config on the first start.
+    """
+    systems = random_targets(args.targets)
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        store = targetstore.TargetStore(os.path.join(directory, targetstore.DEFAULT_FILE_NAME))
+        text = json.dumps(systems)
+        json_save = time_per_call(lambda: json.dumps(systems), 20)
+        json_load = time_per_call(lambda: json.loads(text), 20)
+
+        store.save(systems)
+        assert store.load() == systems
+        store.names = list()  # rewrite the file every time
+        store_save = time_per_call(lambda: (store.save(systems), setattr(store, "names", list())), 20)
+        store_load = time_per_call(store.load, 20)
+        file_size = os.path.getsize(store.path)
+
+        def move_one():
+            systems[len(systems) // 2]["x"] += 1.0
+            store.save(systems)
+
+        store.load()
+        rewrites = store.rewrites
+        in_place = time_per_call(move_one, 20)
+        assert store.rewrites == rewrites and store.load() == systems
+
+        config = core.MemoryConfig()
+        config.set(core.TARGETS_KEY, text)
+        os.remove(store.path)
+        start = time.perf_counter()
+        engine = core.DistanceCore(config, os.path.join(directory, "travelled.log"), target_store=targetstore.TargetStore(store.path))
+        engine.get_displayed_targets()  # the targets are loaded on first use
+        migration = time.perf_counter() - start
+        engine.close()
+        assert not config.get_str(core.TARGETS_KEY) and targetstore.TargetStore(store.path).load() == json.loads(text)
+
+        print(f"target_store: {len(systems)} targets, JSON {len(text) / 1024:.0f} KiB save {json_save * 1000:.1f} ms load {json_load * 1000:.1f} ms, "
+              f"store {file_size / 1024:.0f} KiB save {store_save * 1000:.1f} ms load {store_load * 1000:.1f} ms, "
+              f"one target changed {in_place * 1000:.2f} ms, first start with migration {migration * 1000:.0f} ms")
+    finally:
+        shutil.rmtree(directory)
+
+
+def read_snapshots(path: str, port: int, count: int, results: multiprocessing.Queue):
+    """
+    Reader process of the publish benchmark: waits for count snapshots and reports the latency of each one and the
+    number of inconsistent snapshots. The writer sets the distances to the sequence plus the number of the target.
+    """
+    reader = publish.SnapshotReader(path, port)
+    latencies = list()
+    torn = 0
+    results.put("ready")
+    try:
+        while len(latencies) < count:
+            snapshot = reader.wait(5.0)
+            if snapshot is None:
+                break
+            latencies.append(time.time() - snapshot.timestamp)
+            if any(distance != snapshot.sequence + i for i, (_, distance) in enumerate(snapshot.targets)):
+                torn += 1
+    finally:
+        reader.close()
+    results.put((latencies, torn))
+
+
+def hammer_snapshots(path: str, seconds: float, results: multiprocessing.Queue):
+    """
+    Reader process reading as fast as it can while the writer does the same.
+    """
+    reader = publish.SnapshotReader(path)
+    reads = torn = 0
+    results.put("ready")
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        snapshot = reader.read()
+        if snapshot is None:
+            continue
+        reads += 1
+        if any(distance != snapshot.sequence + i for i, (_, distance) in enumerate(snapshot.targets)):
+            torn += 1
+    reader.close()
+    results.put((reads, torn))
+
+
+@benchmark
+def snapshot_publish(args: argparse.Namespace):
+    """
+    Publishing the distances for overlays: the time to write a snapshot and to read it, the latency until a reader in
+    another process has it with notifications and with polling, and whether readers ever see half written snapshots.
+    """
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    path = os.path.join(directory, publish.SNAPSHOT_FILE_NAME)
+    with socket.socket() as s:
+        s.bind((publish.NOTIFY_HOST, 0))
+        port = s.getsockname()[1]
+    writer = publish.SnapshotWriter(path, port=port)
+    names = [f"Target {i}" for i in range(publish.CAPACITY)]
+    position = (12.5, -3.25, 25000.0)
+
+    def publish_next(count: int):
+        sequence = writer.sequence + 2
+        writer.publish(position, [(name, float(sequence + i)) for i, name in enumerate(names[:count])], 1234.5, 67.8)
+
+    try:
+        lines = list()
+        reader = publish.SnapshotReader(path)
+        for count in (10, publish.CAPACITY):
+            write_time = time_per_call(lambda: publish_next(count), args.repeat * 10)
+            read_time = time_per_call(reader.read, args.repeat * 10)
+            lines.append(f"{count} targets: write {write_time * 1e6:.1f} us, read {read_time * 1e6:.1f} us")
+        poll_time = time_per_call(lambda: reader.sequence, args.repeat * 100)
+        reader.close()
+
+        context = multiprocessing.get_context("spawn")
+        for mode, reader_port, interval in (("notified", port, 0.002), ("polling", 0, 0.01)):
+            results = context.Queue()
+            process = context.Process(target=read_snapshots, args=(path, reader_port, args.snapshots, results))
+            process.start()
+            results.get(timeout=30)
+            time.sleep(0.2)  # until it's connected
+            for _ in range(args.snapshots):
+                publish_next(10)
+                time.sleep(interval)
+            latencies, torn = results.get(timeout=30)
+            process.join()
+            latencies.sort()
+            assert latencies and not torn
+            lines.append(f"{mode}: {len(latencies)}/{args.snapshots} snapshots seen, latency p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+                         f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+
+        results = context.Queue()
+        process = context.Process(target=hammer_snapshots, args=(path, 2.0, results))
+        process.start()
+        results.get(timeout=30)
+        writes = 0
+        end = time.monotonic() + 2.0
+        while time.monotonic() < end:
+            publish_next(publish.CAPACITY)
+            writes += 1
+        reads, torn = results.get(timeout=30)
+        process.join()
+        assert not torn
+        lines.append(f"concurrent: {writes} writes, {reads} consistent reads, {torn} torn")
+        print(f"snapshot_publish: sequence check {poll_time * 1e9:.0f} ns; " + "; ".join(lines))
+    finally:
+        writer.close()
+        shutil.rmtree(directory)
+
+
+def write_bursts(directory: str, bursts: int, rng: random.Random):
+    """
+    Writer thread of the tail benchmark: the game writing a few events at once, with pauses in between. Halfway
+    through, it starts a new journal. Each event carries the time it was written.
+    """
+    name = "Journal.2026-01-01T100000.01.log"
+    for burst in range(bursts):
+        if burst == bursts // 2:
+            name = "Journal.2026-01-01T110000.01.log"
+        with open(os.path.join(directory, name), "a") as f:
+            for _ in range(rng.randint(1, 5)):
+                f.write(json.dumps({"event": "FSDJump", "StarPos": [0.0, 0.0, 0.0], "JumpDist": 1.0, "written": time.perf_counter()}) + "\n")
+                f.flush()
+        time.sleep(rng.uniform(0.0, 0.2))
+
+
+@benchmark
+def journal_tail(args: argparse.Namespace):
+    """
+    Headless journal tail: time from the game writing an event until the tail has read it, with inotify and by
+    polling, and the CPU time used while the game doesn't write anything.
+    """
+    lines = list()
+    for use_inotify in (True, False):
+        directory = tempfile.mkdtemp(prefix="distancecalc_")
+        try:
+            with open(os.path.join(directory, "Journal.2026-01-01T090000.01.log"), "w") as f:
+                f.write(json.dumps({"event": "Fileheader"}) + "\n")
+            follower = tail.JournalTail(directory, use_inotify=use_inotify)
+            mode = "inotify" if follower.inotify else "polling"
+            if use_inotify and not follower.inotify:
+                follower.close()
+                continue
+            next(follower.entries())  # catch up with the existing journal
+
+            start = time.process_time()
+            for _ in follower.entries(stop_after=2.0):
+                pass
+            idle_cpu = (time.process_time() - start) / 2.0
+
+            writer = threading.Thread(target=write_bursts, args=(directory, args.bursts, random.Random(9)), daemon=True)
+            writer.start()
+            latencies = list()
+            for entries in follower.entries(stop_after=args.bursts * 0.2 + 5.0):
+                now = time.perf_counter()
+                latencies.extend(now - entry["written"] for entry in entries if "written" in entry)
+                if not writer.is_alive() and not entries:
+                    break
+            writer.join()
+            rotations = follower.rotations
+            follower.close()
+            latencies.sort()
+            assert rotations == 2 and latencies  # to the journal of the writer and the one it starts halfway
+            lines.append(f"{mode} {len(latencies)} events p50 {latencies[len(latencies) // 2] * 1000:.1f} ms "
+                         f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms max {latencies[-1] * 1000:.1f} ms, "
+                         f"idle CPU {idle_cpu * 100:.2f} %")
+        finally:
+            shutil.rmtree(directory)
+    print(f"journal_tail: {args.bursts} bursts; " + "; ".join(lines))
+
+
+@benchmark
+def proximity_alerts(args: argparse.Namespace):
+    """
+    Proximity alerts: building the buckets for the points of interest, the time per jump of a commander moving through a
+    crowded bubble (restarting from Sol every 1000 jumps) and a check against calculating all distances. Also checks
+    that moving back and forth over the edge of a radius alerts only once.
+    """
+    rng = random.Random(11)
+    points = [dict(target, radius=rng.uniform(10, 50)) for target in random_targets(args.pois // 2)]
+    points.extend({"system": f"Bubble {i}", "x": rng.gauss(0, 300), "y": rng.gauss(0, 100), "z": rng.gauss(0, 300), "radius": rng.uniform(10, 50)}
+                  for i in range(args.pois - args.pois // 2))
+    points.append({"system": "Colonia", "x": -9530.5, "y": -910.28, "z": 19808.125, "radius": 500.0})
+    points.append({"system": "Sol", "x": 0.0, "y": 0.0, "z": 0.0, "radius": 1000.0})
+
+    start = time.perf_counter()
+    alerts = proximity.create_alerts(points)
+    build_time = time.perf_counter() - start
+
+    jumps = min(args.jumps, 100000)
+    positions = list()
+    x = y = z = 0.0
+    for i in range(jumps):
+        if i % 1000 == 0:
+            x = y = z = 0.0
+        dx, dy, dz = rng.gauss(0, 1), rng.gauss(0, 1), rng.gauss(0, 1)
+        length = math.sqrt(dx * dx + dy * dy + dz * dz) or 1.0
+        x, y, z = x + dx / length * 40, y + dy / length * 40, z + dz / length * 40
+        positions.append((x, y, z))
+    count = 0
+    start = time.perf_counter()
+    for position in positions:
+        count += len(alerts.move(*position))
+    jump_time = (time.perf_counter() - start) / jumps
+
+    check = proximity.create_alerts(points)
+    linear_time = 0.0
+    for position in positions[:200]:
+        check.move(*position)
+        start = time.perf_counter()
+        within = set(i for i, point in enumerate(points) if math.dist((point["x"], point["y"], point["z"]), position) <= point["radius"])
+        linear_time += time.perf_counter() - start
+        assert within <= check.inside, "an alert was missed"
+        assert all(math.dist(check.coordinates[i], position) <= check.radii[i] * (1 + proximity.HYSTERESIS) + proximity.MIN_HYSTERESIS for i in check.inside)
+    linear_time /= 200
+
+    edge = proximity.ProximityAlerts()
+    edge.add("Edge", 100.0, 0.0, 0.0, 20.0)
+    edge.move(0.0, 0.0, 0.0)
+    flaps = sum(len(edge.move(80.0 + (0.2 if i % 2 else -0.2), 0.0, 0.0)) for i in range(100))
+    assert flaps == 1, f"{flaps} alerts at the edge of the radius"
+
+    summary = alerts.stats()
+    print(f"proximity_alerts: {len(points)} points, {summary['buckets']} buckets in {summary['levels']} levels built in {build_time * 1000:.0f} ms; "
+          f"{jumps} jumps {jump_time * 1e6:.1f} us per jump ({1 / jump_time:,.0f} jumps/s), {summary['checked_per_jump']} distances per jump, {count} alerts; "
+          f"all distances {linear_time * 1000:.1f} ms per jump")
+
+
+# What load.py does while EDMC starts, without Tk: its imports and the parts of plugin_start3 that don't create
+# widgets. Runs in a new interpreter so nothing is imported already. With "eager", the modules that are only imported on
+# first use are imported as well, as they were before.
+STARTUP_SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+from distcalc.targets import TargetEditor, has_coordinates, load_targets
+from distcalc.targetstore import TargetStore
+from distcalc.persistence import FLUSH_INTERVAL
+from distcalc.core import DistanceCore, MemoryConfig
+from distcalc.stats import STATS, Profiler, timed
+from distcalc.history import JumpHistory
+from distcalc.proximity import Alert, load_points_of_interest
+if sys.argv[2] == "eager":
+    import json, threading, concurrent.futures, cProfile, pstats
+    import distcalc.systemindex, distcalc.backfill, distcalc.edsmcache, distcalc.edsm, distcalc.publish, distcalc.typeahead, distcalc.route
+imported = time.perf_counter()
+directory = sys.argv[1]
+engine = DistanceCore(MemoryConfig(), directory + "/travelled.log", 10, directory, JumpHistory(directory + "/history.bin", directory + "/history.json"),
+                      TargetStore(directory + "/targets.bin"))
+started = time.perf_counter()
+engine.get_displayed_targets()  # the first update of the main window
+first_update = time.perf_counter()
+# the updates after the first jump show the jumps to each target, that mustn't import anything either
+engine.journal_entry({"event": "Location", "StarSystem": "Sol", "StarPos": [0.0, 0.0, 0.0]})
+engine.journal_entry({"event": "Loadout", "MaxJumpRange": 50.0})
+jumps = [engine.estimate_jumps(distance) for _, distance in engine.get_displayed_targets() if distance is not None]
+engine.close()
+heavy = [name for name in {deferred!r} if name in sys.modules]
+print(json.dumps({"imports": imported - start, "start": started - imported, "first_update": first_update - started, "heavy": heavy}))
+"""
+
+
+@benchmark
+def startup(args: argparse.Namespace):
+    """
+    Time until the plugin has started, in a new interpreter each run, with the modules imported on first use and all of
+    them imported up front. Fails if the median start takes longer than --startup-budget or the first update of the main
+    window (which reads the targets) takes longer than --update-budget.
+    """
+    import subprocess
+    import statistics
+    directory = tempfile.mkdtemp(prefix="distancecalc_")
+    try:
+        targetstore.TargetStore(os.path.join(directory, targetstore.DEFAULT_FILE_NAME)).save(random_targets(args.targets))
+        environment = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        results = dict()
+        for mode in ("lazy", "eager"):
+            runs = list()
+            for _ in range(11):
+                output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT.replace("{deferred!r}", repr(core.STARTUP_DEFERRED_MODULES)), directory, mode], env=environment, check=True, capture_output=True, text=True).stdout
+                runs.append(json.loads(output))
+            results[mode] = dict((key, statistics.median(run[key] for run in runs)) for key in ("imports", "start", "first_update"))
+            results[mode]["heavy"] = runs[0]["heavy"]
+        lazy, eager = results["lazy"], results["eager"]
+        startup_time = lazy["imports"] + lazy["start"]
+        print(f"startup: {args.targets} targets, start {startup_time * 1000:.1f} ms (imports {lazy['imports'] * 1000:.1f} ms), first update "
+              f"{lazy['first_update'] * 1000:.1f} ms, not imported yet: {', '.join(name for name in core.STARTUP_DEFERRED_MODULES if name not in lazy['heavy'])}; "
+              f"importing everything up front {(eager['imports'] + eager['start']) * 1000:.1f} ms (imports {eager['imports'] * 1000:.1f} ms)")
+        if startup_time > args.startup_budget / 1000 or lazy["first_update"] > args.update_budget / 1000:
+            sys.exit(f"startup: over the budget of {args.startup_budget} ms to start and {args.update_budget} ms for the first update")
+    finally:
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m distcalc.benchmark", description="Benchmarks for DistanceCalc.")
+    parser.add_argument("names", nargs="*", metavar="name", help="benchmarks to run: {0} (default: all)".format(", ".join(sorted(BENCHMARKS))))
+    parser.add_argument("--targets", type=int, default=10000, help="number of targets (default: 10000)")
+    parser.add_argument("--nearest", type=int, default=10, help="number of nearest targets to query (default: 10)")
+    parser.add_argument("--journals", type=int, default=40, help="number of synthetic journal files (default: 40)")
+    parser.add_argument("--journal-size", type=int, default=5, help="size of each synthetic journal file in MB (default: 5)")
+    parser.add_argument("--systems", type=int, default=1000000, help="number of systems in the synthetic system index (default: 1000000)")
+    parser.add_argument("--stars", type=int, default=100000, help="number of stars to plot routes over (default: 100000)")
+    parser.add_argument("--routes", type=int, default=10, help="number of routes to plot (default: 10)")
+    parser.add_argument("--jump-range", type=float, default=50.0, help="jump range in Ly for the routes (default: 50)")
+    parser.add_argument("--hops", type=int, default=20000, help="number of systems in the plotted route (default: 20000)")
+    parser.add_argument("--jumps", type=int, default=200000, help="number of jumps recorded in the jump history (default: 200000)")
+    parser.add_argument("--history-capacity", type=int, default=history.CAPACITY, help=f"jumps the history keeps in memory (default: {history.CAPACITY})")
+    parser.add_argument("--events", type=int, default=1000000, help="number of synthetic journal events (default: 1000000)")
+    parser.add_argument("--event-targets", type=int, default=100, help="number of targets while processing journal events (default: 100)")
+    parser.add_argument("--pois", type=int, default=100000, help="number of points of interest for proximity alerts (default: 100000)")
+    parser.add_argument("--snapshots", type=int, default=1000, help="number of snapshots sent to the reader process (default: 1000)")
+    parser.add_argument("--bursts", type=int, default=100, help="number of bursts of events written to the tailed journal (default: 100)")
+    parser.add_argument("--startup-budget", type=float, default=60.0, help="milliseconds the plugin may take to start (default: 60)")
+    parser.add_argument("--update-budget", type=float, default=100.0, help="milliseconds the first update of the main window may take (default: 100)")
+    parser.add_argument("--repeat", type=int, default=200, help="repetitions per measurement (default: 200)")
+    args = parser.parse_args(argv)
+    for name in args.names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name}")
+    for name in args.names or sorted(BENCHMARKS):
+        BENCHMARKS[name](args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import json
+import math
+import heapq
+import logging
+from typing import Dict, Iterable, List, Tuple, Union
+
+from distcalc.persistence import TravelledDistance
+from distcalc.navroute import NavRoute, NAVROUTE_FILE_NAME, parse_timestamp
+from distcalc.history import JumpHistory
+from distcalc.proximity import Alert, ProximityAlerts, create_alerts
+from distcalc.spatial import SectorGrid
+from distcalc.targets import TargetList, has_coordinates
+from distcalc.targetstore import TargetStore
+
+logger = logging.getLogger(__name__)
+
+TARGETS_KEY = "DistanceCalc"  # JSON list of the targets if there is no target store, moved to the store otherwise
+OPTIONS_KEY = "DistanceCalc_options"
+JUMP_RANGE_KEY = "DistanceCalc_jump_range"  # in 1/100 Ly
+POSITION_EVENTS = ("FSDJump", "Location", "CarrierJump", "StartUp")
+JUMP_EVENTS = ("FSDJump", "CarrierJump")  # the others of POSITION_EVENTS only tell where the commander is
+DISPLAYED_TARGETS = 10
+LINEAR_SCAN_TARGETS = 500  # below this, calculating all distances is faster than asking the spatial index
+# imported on first use and not while EDMC starts the plugin, neither by load.py nor by the core
+STARTUP_DEFERRED_MODULES = ("http.client", "urllib.request", "sqlite3", "socket", "concurrent.futures", "difflib", "cProfile",
+                            "distcalc.systemindex", "distcalc.backfill", "distcalc.edsmcache", "distcalc.edsm", "distcalc.publish",
+                            "distcalc.typeahead", "distcalc.route")
+
+
+def estimate_jumps(distance: float, jump_range: float) -> int:
+    """
+    Lower bound of the number of jumps for distance without neutron stars. Here and not in distcalc.route, which pulls in
+    the system index, because the main window shows it for every target.
+    """
+    return math.ceil(distance / jump_range - 1e-9) if distance > 0 else 0
+
+
+class MemoryConfig(dict):
+    """
+    Config store for running without EDMC. Implements the parts of EDMC's config the core uses.
+    """
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        return int(self.get(key, default))
+
+    def get_str(self, key: str, default: str = None) -> Union[str, None]:
+        return self.get(key, default)
+
+    def set(self, key: str, value: Union[int, str]):
+        self[key] = value
+
+
+class DistanceCore(object):
+    """
+    Everything the plugin calculates, without any user interface: the targets, the current position and the
+    travelled distances. config is EDMC's config or anything else with get_int, get_str and set. The plotted route is read
+    from NavRoute.json in journal_dir if the NavRoute event doesn't contain it. Jumps are recorded in history, which
+    keeps them in memory only if it has no file paths. The targets are kept in target_store if there is one, in the
+    config otherwise. They are only read when they are first needed, which keeps them out of the start of EDMC. Without a
+    travelled_log_path the travelled total is only kept in the config, see TravelledDistance.
+    """
+
+    def __init__(self, config, travelled_log_path: Union[str, None], displayed_targets: int = DISPLAYED_TARGETS, journal_dir: Union[str, None] = None,
+                 history: Union[JumpHistory, None] = None, target_store: Union[TargetStore, None] = None):
+        self.config = config
+        self.target_store = target_store
+        self.journal_dir = journal_dir
+        self.history = history if history is not None else JumpHistory(None)
+        self.commander = ""
+        self.displayed_targets = displayed_targets
+        self._distances: Union[List[Dict], None] = None  # not loaded yet
+        self._targets = TargetList()
+        self._spatial_index = SectorGrid()
+        self.coordinates: Union[Tuple[float, float, float], None] = None
+        self.travelled = TravelledDistance(config, travelled_log_path)  # total distance, written to the config in the background
+        self.distance_session: float = 0.0
+        self.travelled_total_enabled, self.travelled_session_enabled, self.session_per_game = self.parse_options(config.get_int(OPTIONS_KEY))
+        self.jump_range: Union[float, None] = (config.get_int(JUMP_RANGE_KEY) / 100.0) or None  # of the current ship, from the last Loadout event
+        self.navroute = NavRoute()
+        self.proximity: Union[ProximityAlerts, None] = None  # see set_points_of_interest
+        self.alerts: List[Alert] = list()  # of the last jump, for the user interface to pick up
+
+    @property
+    def distance_total(self) -> float:
+        return self.travelled.total
+
+    @property
+    def distances(self) -> List[Dict]:
+        if self._distances is None:
+            self.set_targets(self.load_targets())
+        return self._distances
+
+    @property
+    def targets(self) -> TargetList:
+        if self._distances is None:
+            self.set_targets(self.load_targets())
+        return self._targets
+
+    @property
+    def spatial_index(self) -> SectorGrid:
+        if self._distances is None:
+            self.set_targets(self.load_targets())
+        return self._spatial_index
+
+    # region static and helper methods
+    @staticmethod
+    def parse_options(settings: int) -> Tuple[bool, bool, bool]:
+        setting_total = bool(settings & 1)  # calculate total distance travelled
+        setting_session = bool((settings >> 1) & 1)  # calculate for session only
+        setting_session_option = bool((settings >> 2) & 1)  # 1 = calculate for ED session; 0 = calculate for EDMC session
+        return setting_total, setting_session, setting_session_option
+
+    @staticmethod
+    def target_keys(targets: Iterable[Dict]) -> List[Tuple[str, float, float, float, int]]:
+        # a target can be in the list more than once, the number of its occurrence keeps them apart in the spatial index
+        occurrences = dict()
+        keys = list()
+        for target in targets:
+            key = (target["system"], target["x"], target["y"], target["z"])
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            keys.append(key + (occurrence,))
+        return keys
+
+    @staticmethod
+    def calculate_distance(x1: Union[int, float], y1: Union[int, float], z1: Union[int, float], x2: Union[int, float], y2: Union[int, float], z2: Union[int, float]):
+        return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
+    # endregion
+
+    # region settings
+    def set_options(self, travelled_total: bool, travelled_session: bool, session_per_game: bool):
+        self.travelled_total_enabled = travelled_total
+        self.travelled_session_enabled = travelled_session
+        self.session_per_game = session_per_game
+        self.config.set(OPTIONS_KEY, int(travelled_total) | (int(travelled_session) << 1) | (int(session_per_game) << 2))
+
+    def set_targets(self, distances: List[Dict]):
+        # targets without coordinates are kept and saved until they are looked up, there are no distances to them
+        resolved = [target for target in distances if has_coordinates(target)]
+        # only insert and remove the targets that changed instead of rebuilding the spatial index. The index is empty if
+        # nothing was loaded yet
+        old_keys = set(self.target_keys(target for target in self._distances or () if has_coordinates(target)))
+        new_keys = set(self.target_keys(resolved))
+        for key in old_keys - new_keys:
+            self._spatial_index.remove(key)
+        for key in new_keys - old_keys:
+            self._spatial_index.insert(key, *key[1:4])
+        self._distances = distances
+        self._targets = TargetList(resolved)
+
+    def load_targets(self) -> List[Dict]:
+        targets = json.loads(self.config.get_str(TARGETS_KEY) or "[]")
+        if self.target_store is None:
+            return targets
+        if targets:
+            # targets in the config are either from before the store existed or from a failed save, move them over.
+            # Reading the store first moves an unreadable file aside instead of overwriting it
+            self.target_store.load()
+            if self.target_store.save(targets):
+                logger.info(f"Moved {len(targets)} targets from the config to {self.target_store.path}")
+                self.config.set(TARGETS_KEY, "")
+            return targets
+        return self.target_store.load()
+
+    def save_targets(self):
+        if self.target_store is None or not self.target_store.save(self.distances):
+            self.config.set(TARGETS_KEY, json.dumps(self.distances))
+    # endregion
+
+    def set_points_of_interest(self, points: List[Dict]):
+        """
+        Alert when a jump gets within the radius of one of points ({"system", "x", "y", "z", "radius"}). No alerts
+        if it is empty.
+        """
+        self.set_proximity_alerts(create_alerts(points) if points else None)
+
+    def set_proximity_alerts(self, proximity: Union[ProximityAlerts, None]):
+        """
+        Like set_points_of_interest with the alerts already built, e.g. by a worker thread.
+        """
+        self.proximity = proximity
+        self.alerts = list()
+        if self.proximity is not None and self.coordinates:
+            self.proximity.move(*self.coordinates)  # already being close to a point isn't news
+
+    def get_target_coordinates(self, system_name: str) -> Union[Tuple[float, float, float], None]:
+        for i, name in enumerate(self.targets.names):
+            if name == system_name:
+                return self.targets.get_coordinates(i)
+        return None
+
+    def estimate_jumps(self, distance: float) -> Union[int, None]:
+        """
+        Lower bound of the jumps needed for distance with the current jump range or None if the range is unknown.
+        """
+        return estimate_jumps(distance, self.jump_range) if self.jump_range else None
+
+    def get_displayed_targets(self, count: Union[int, None] = None) -> List[Tuple[str, Union[float, None]]]:
+        """
+        Returns (system name, distance) of the targets to display. If there are more targets than count (default:
+        displayed_targets), the nearest ones are returned. Distance is None if the current position is unknown.
+        """
+        count = self.displayed_targets if count is None else count
+        if not self.coordinates:
+            return [(system_name, None) for system_name in self.targets.names[:count]]
+        if len(self.targets) <= count:
+            return list(zip(self.targets.names, self.targets.distances(*self.coordinates)))  # keep the order of the settings
+        if len(self.targets) < LINEAR_SCAN_TARGETS:
+            nearest = heapq.nsmallest(count, zip(self.targets.distances(*self.coordinates), range(len(self.targets))))
+            return [(self.targets.names[i], distance) for distance, i in nearest]
+        return [(key[0], distance) for distance, key in self.spatial_index.nearest(*self.coordinates, count)]
+
+    def journal_entry(self, entry: Dict, commander: Union[str, None] = None) -> bool:
+        """
+        Process a journal event. Returns True if the position, a travelled distance, the jump range or the plotted route
+        changed. Proximity alerts caused by a jump are put into alerts.
+        """
+        event = entry["event"]
+        if commander is not None:
+            self.commander = commander
+        elif event == "LoadGame" and "Commander" in entry:
+            self.commander = entry["Commander"]
+        if event in POSITION_EVENTS:
+            # We arrived at a new system!
+            if "StarPos" in entry:
+                self.coordinates = tuple(entry["StarPos"])
+                if self.proximity is not None:
+                    self.alerts = self.proximity.move(*self.coordinates)
+            self.navroute.arrive(entry.get("SystemAddress"), self.coordinates, entry.get("timestamp"), event in JUMP_EVENTS)
+            if "JumpDist" in entry:
+                distance = entry["JumpDist"]
+                if self.travelled_total_enabled:
+                    self.travelled.add(distance)
+                if self.travelled_session_enabled:
+                    self.distance_session += distance
+                if self.coordinates:
+                    self.history.add(distance, *self.coordinates, self.commander, parse_timestamp(entry.get("timestamp")))
+            return True
+        if event == "LoadGame" and self.travelled_session_enabled and self.session_per_game:
+            self.distance_session = 0.0
+            self.history.reset_session()
+            return True
+        if event == "NavRoute":
+            if entry.get("Route"):
+                self.navroute.load(entry["Route"])
+            elif self.journal_dir:
+                self.navroute.load_file(os.path.join(self.journal_dir, NAVROUTE_FILE_NAME))
+            return True
+        if event == "NavRouteClear":
+            self.navroute.clear()
+            return True
+        if event == "Loadout" and entry.get("MaxJumpRange"):
+            jump_range = float(entry["MaxJumpRange"])
+            if jump_range != self.jump_range:
+                self.jump_range = jump_range
+                self.config.set(JUMP_RANGE_KEY, int(round(jump_range * 100)))
+                return True
+        return False
+
+    def close(self):
+        self.travelled.close()
+        self.history.close()
@@ -0,0 +1,264 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import json
+import time
+import queue
+import logging
+import threading
+import http.client
+from urllib import parse
+from concurrent.futures import CancelledError, Future
+from typing import Dict, Iterable, List, Union
+
+from distcalc.edsmcache import CachedSystem, EdsmCache
+from distcalc.systemindex import normalize_name
+from distcalc.stats import STATS
+
+logger = logging.getLogger(__name__)
+
+EDSM_URL = "https://www.edsm.net"
+USER_AGENT = "EDMC-DistanceCalc"
+RETRY_STATUS = (429, 500, 502, 503, 504)
+MAX_URL_LENGTH = 2000  # stay below the limits of common servers and proxies
+
+
+class EdsmError(Exception):
+    pass
+
+
+class _Job(object):
+    def __init__(self, key: str, system_names: List[str], batch: bool = False):
+        self.key = key
+        self.system_names = system_names
+        self.batch = batch
+        self.future: Future = Future()
+        self.cancelled = threading.Event()
+
+
+class EdsmClient(object):
+    """
+    Long lived client for the EDSM API. A small pool of worker threads processes the requests, each worker keeps its
+    HTTP connection open between requests. Requests for a system that is already requested share the same future.
+    Failed requests are retried with exponential backoff. Results come from the cache if one is given.
+    """
+
+    def __init__(self, base_url: str = EDSM_URL, workers: int = 2, timeout: float = 15, retries: int = 3, backoff: float = 1.0,
+                 cache: Union[EdsmCache, None] = None, user_agent: str = USER_AGENT):
+        url = parse.urlsplit(base_url)
+        self.scheme = url.scheme
+        self.host = url.netloc
+        self.path = url.path.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache = cache
+        self.user_agent = user_agent
+        self.requests = 0  # HTTP requests sent, including retries
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, _Job] = dict()  # jobs which are queued or running by normalized system name
+        self._batch_jobs: List[_Job] = list()
+        self._queue: "queue.Queue[Union[_Job, None]]" = queue.Queue()
+        self._closed = False
+        self._workers = [threading.Thread(name=f"DistanceCalc_EDSM_{i}", target=self._work, daemon=True) for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def lookup(self, system_name: str) -> Future:
+        """
+        Look up a system. The future resolves to a CachedSystem, found is False if EDSM doesn't know the system.
+        It raises EdsmError if EDSM couldn't be reached and CancelledError if the request was cancelled.
+        Callbacks added to the future run on a worker thread.
+        """
+        key = normalize_name(system_name)
+        with self._lock:
+            if self._closed:
+                raise EdsmError("The EDSM client is closed")
+            job = self._jobs.get(key)
+            if job is not None:
+                return job.future
+            job = _Job(key, [system_name])
+            self._jobs[key] = job
+        self._queue.put(job)
+        return job.future
+
+    def lookup_many(self, system_names: Iterable[str]) -> Future:
+        """
+        Look up many systems with as few requests as possible. The names are sent to EDSM's systems endpoint in chunks
+        that keep the URLs short enough. The future resolves to a dict of normalized system name to CachedSystem.
+        """
+        system_names = list(dict((normalize_name(system_name), system_name) for system_name in system_names).values())
+        job = _Job("", system_names, batch=True)
+        with self._lock:
+            if self._closed:
+                raise EdsmError("The EDSM client is closed")
+            self._batch_jobs.append(job)
+        self._queue.put(job)
+        return job.future
+
+    def cancel_all(self):
+        """
+        Cancel all queued and running requests. Responses that arrive after this are still cached but not reported.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values()) + self._batch_jobs
+            self._jobs.clear()
+            self._batch_jobs = list()
+        for job in jobs:
+            job.cancelled.set()
+            job.future.cancel()
+
+    def close(self):
+        self.cancel_all()
+        with self._lock:
+            self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def _finish(self, job: _Job):
+        with self._lock:
+            if job.batch:
+                if job in self._batch_jobs:
+                    self._batch_jobs.remove(job)
+            elif self._jobs.get(job.key) is job:
+                del self._jobs[job.key]
+
+    def _work(self):
+        connection = None
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if not job.future.set_running_or_notify_cancel():
+                continue  # cancelled while queued
+            try:
+                if job.batch:
+                    connection, result = self._lookup_many(connection, job)
+                else:
+                    connection, result = self._lookup(connection, job)
+                self._finish(job)
+                if job.cancelled.is_set():
+                    job.future.set_exception(CancelledError())
+                else:
+                    job.future.set_result(result)
+            except BaseException as e:
+                self._finish(job)
+                job.future.set_exception(e)
+        if connection:
+            connection.close()
+
+    def _lookup(self, connection: Union[http.client.HTTPConnection, None], job: _Job):
+        system_name = job.system_names[0]
+        system = self.cache.get(system_name) if self.cache is not None else None
+        if system is None:
+            path = f"{self.path}/api-v1/system?systemName={parse.quote(system_name)}&showCoordinates=1"
+            connection, data = self._request_with_retries(connection, job, path)
+            system = self.parse_system(data)
+            if self.cache is not None:
+                self.cache.put(system_name, system)
+        return connection, system
+
+    def _lookup_many(self, connection: Union[http.client.HTTPConnection, None], job: _Job):
+        result: Dict[str, CachedSystem] = dict()
+        missing = list()
+        for system_name in job.system_names:
+            system = self.cache.get(system_name) if self.cache is not None else None
+            if system is None:
+                missing.append(system_name)
+            else:
+                result[normalize_name(system_name)] = system
+
+        for chunk in self.chunk_names(missing, MAX_URL_LENGTH - len(self.host) - len(self.path) - 50):
+            query = "&".join("systemName[]=" + parse.quote(system_name) for system_name in chunk)
+            connection, data = self._request_with_retries(connection, job, f"{self.path}/api-v1/systems?{query}&showCoordinates=1")
+            found = dict()
+            for entry in data if isinstance(data, list) else list():
+                system = self.parse_system(entry)
+                if system.found:
+                    found[normalize_name(system.name)] = system
+            for system_name in chunk:
+                key = normalize_name(system_name)
+                system = found.get(key, CachedSystem(False))
+                result[key] = system
+                if self.cache is not None:
+                    self.cache.put(system_name, system)
+        return connection, result
+
+    @staticmethod
+    def chunk_names(system_names: List[str], max_length: int) -> List[List[str]]:
+        chunks = list()
+        chunk = list()
+        length = 0
+        for system_name in system_names:
+            parameter_length = len("systemName[]=&") + len(parse.quote(system_name))
+            if chunk and length + parameter_length > max_length:
+                chunks.append(chunk)
+                chunk = list()
+                length = 0
+            chunk.append(system_name)
+            length += parameter_length
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def _request_with_retries(self, connection: Union[http.client.HTTPConnection, None], job: _Job, path: str):
+        attempt = 0
+        while True:
+            if job.cancelled.is_set():
+                raise CancelledError()
+            try:
+                if connection is None:
+                    connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+                    connection = connection_class(self.host, timeout=self.timeout)
+                self.requests += 1
+                start = time.perf_counter()
+                connection.request("GET", path, headers={"User-Agent": self.user_agent, "Accept": "application/json"})
+                response = connection.getresponse()
+                body = response.read()  # always read the whole body, otherwise the connection can't be reused
+                STATS.observe("edsm.request", time.perf_counter() - start)
+                if response.will_close:
+                    connection.close()
+                    connection = None
+                if response.status == 200:
+                    return connection, json.loads(body)
+                if response.status not in RETRY_STATUS:
+                    STATS.count("edsm.errors")
+                    raise EdsmError(f"EDSM answered with HTTP status {response.status}")
+                error: Exception = EdsmError(f"EDSM answered with HTTP status {response.status}")
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                if connection:
+                    connection.close()
+                    connection = None
+                error = e
+
+            if attempt >= self.retries:
+                STATS.count("edsm.errors")
+                raise EdsmError(f"Could not get system information from EDSM: {error}")
+            STATS.count("edsm.retries")
+            # wait before trying again, waking up early if the request gets cancelled
+            job.cancelled.wait(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    @staticmethod
+    def parse_system(data) -> CachedSystem:
+        # EDSM returns an empty list for systems it doesn't know
+        if isinstance(data, dict) and "name" in data and "coords" in data:
+            coords = data["coords"]
+            return CachedSystem(True, data["name"], coords["x"], coords["y"], coords["z"])
+        return CachedSystem(False)
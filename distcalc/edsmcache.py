@@ -0,0 +1,112 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import time
+import sqlite3
+import threading
+from typing import Dict, NamedTuple, Union
+
+from distcalc.systemindex import normalize_name
+
+DEFAULT_FILE_NAME = "edsm_cache.sqlite"
+HIT_TTL = 90 * 24 * 3600  # coordinates of a system don't change
+MISS_TTL = 3600  # unknown systems might be added to EDSM at any time
+MAX_ENTRIES = 20000
+
+
+class CachedSystem(NamedTuple):
+    found: bool
+    name: str = ""
+    x: float = 0.0
+    y: float = 0.0
+    z: float = 0.0
+
+
+class EdsmCache(object):
+    """
+    Disk backed cache of EDSM responses keyed by the normalized system name. Systems that EDSM doesn't know are cached
+    as well but expire a lot sooner. If there are more than max_entries, the least recently used entries are removed.
+    All methods can be called from any thread.
+    """
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES, hit_ttl: float = HIT_TTL, miss_ttl: float = MISS_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.hit_ttl = hit_ttl
+        self.miss_ttl = miss_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS systems (key TEXT PRIMARY KEY, found INTEGER NOT NULL, name TEXT NOT NULL, "
+                                 "x REAL NOT NULL, y REAL NOT NULL, z REAL NOT NULL, expires REAL NOT NULL, last_used REAL NOT NULL)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS systems_last_used ON systems (last_used)")
+        self._count = self._connection.execute("SELECT COUNT(*) FROM systems").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def get(self, system_name: str) -> Union[CachedSystem, None]:
+        """
+        Returns the cached response for the system or None if it isn't cached or has expired.
+        """
+        key = normalize_name(system_name)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute("SELECT found, name, x, y, z FROM systems WHERE key = ? AND expires > ?", (key, now)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE systems SET last_used = ? WHERE key = ?", (now, key))
+        return CachedSystem(bool(row[0]), *row[1:])
+
+    def put(self, system_name: str, system: CachedSystem):
+        key = normalize_name(system_name)
+        now = time.time()
+        expires = now + (self.hit_ttl if system.found else self.miss_ttl)
+        with self._lock:
+            cursor = self._connection.execute("UPDATE systems SET found = ?, name = ?, x = ?, y = ?, z = ?, expires = ?, last_used = ? WHERE key = ?",
+                                              (int(system.found), system.name, system.x, system.y, system.z, expires, now, key))
+            if cursor.rowcount == 0:
+                self._connection.execute("INSERT INTO systems VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                         (key, int(system.found), system.name, system.x, system.y, system.z, expires, now))
+                self._count += 1
+            if self._count > self.max_entries:
+                self.evict(self._count - self.max_entries)
+
+    def evict(self, count: int):
+        # expired entries go first, then the least recently used ones. Call with the lock held
+        now = time.time()
+        cursor = self._connection.execute("DELETE FROM systems WHERE expires <= ?", (now,))
+        removed = max(cursor.rowcount, 0)
+        if removed < count:
+            cursor = self._connection.execute("DELETE FROM systems WHERE key IN (SELECT key FROM systems ORDER BY last_used LIMIT ?)", (count - removed,))
+            removed += max(cursor.rowcount, 0)
+        self._count -= removed
+        self.evictions += removed
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": self._count, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,252 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import json
+import time
+import struct
+import logging
+from array import array
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILE_NAME = "history.bin"
+DEFAULT_SUMMARY_FILE_NAME = "history.json"
+CAPACITY = 4096  # jumps kept in memory
+RATE_WINDOW = 3600.0  # seconds of the rolling rate
+
+Jump = Tuple[float, float, float, float, float, str]  # timestamp, distance, x, y, z, commander
+
+
+class JumpHistory(object):
+    """
+    Every jump in a ring buffer of parallel typed arrays: timestamp, distance, float32 coordinates and the number of
+    the commander. That's 26 bytes per jump and the buffer never grows beyond capacity. Jumps are appended to a binary
+    file when they are about to be overwritten and on flush, the file only ever grows at the end.
+
+    The statistics are updated with every jump, so reading them never goes through the history:
+    * the session: jumps, distance, longest jump and Ly/hour since reset_session
+    * a rolling window of the last hour: jumps, distance, longest jump, Ly/hour
+    * distance and jumps per commander and day, stored in a small summary file next to the history
+    """
+    RECORD = struct.Struct("<dffffH")
+
+    def __init__(self, path: Union[str, None], summary_path: Union[str, None] = None, capacity: int = CAPACITY, rate_window: float = RATE_WINDOW):
+        self.path = path
+        self.summary_path = summary_path
+        self.capacity = capacity
+        self.rate_window = rate_window
+        self.timestamps = array("d", bytes(8 * capacity))
+        self.distances = array("f", bytes(4 * capacity))
+        self.x = array("f", bytes(4 * capacity))
+        self.y = array("f", bytes(4 * capacity))
+        self.z = array("f", bytes(4 * capacity))
+        self.commander_numbers = array("H", bytes(2 * capacity))
+        self.total_jumps = 0  # jumps ever added, the newest is at (total_jumps - 1) % capacity
+        self.spilled = 0  # jumps written to the file
+        self.commanders: List[str] = list()
+        self.days: Dict[str, Dict[str, List[float]]] = dict()  # commander -> day -> [distance, jumps]
+        self._commander_numbers: Dict[str, int] = dict()
+        self._summary_dirty = False
+        self._file = None
+        self.reset_session()
+        # rolling window
+        self._window_start = 0  # oldest jump in the window, as in total_jumps
+        self._window_distance = 0.0
+        self._window_max: deque = deque()  # jump numbers with decreasing distances, the first one is the longest jump
+        self.load_summary()
+
+    def __len__(self):
+        return min(self.total_jumps, self.capacity)
+
+    # region statistics
+    def reset_session(self):
+        self.session_jumps = 0
+        self.session_distance = 0.0
+        self.session_longest = 0.0
+        self.session_start: Union[float, None] = None
+        self.session_end: Union[float, None] = None
+
+    @property
+    def session_rate(self) -> Union[float, None]:
+        """
+        Ly per hour of the session or None if there isn't enough data.
+        """
+        if self.session_start is None or self.session_end is None or self.session_end <= self.session_start:
+            return None
+        return self.session_distance / (self.session_end - self.session_start) * 3600
+
+    @property
+    def session_average(self) -> float:
+        return self.session_distance / self.session_jumps if self.session_jumps else 0.0
+
+    @property
+    def window_jumps(self) -> int:
+        return self.total_jumps - self._window_start
+
+    @property
+    def window_distance(self) -> float:
+        return self._window_distance
+
+    @property
+    def window_longest(self) -> float:
+        return self.distances[self._window_max[0] % self.capacity] if self._window_max else 0.0
+
+    @property
+    def window_rate(self) -> Union[float, None]:
+        if self.window_jumps < 2:
+            return None
+        first = self.timestamps[self._window_start % self.capacity]
+        last = self.timestamps[(self.total_jumps - 1) % self.capacity]
+        return self._window_distance / (last - first) * 3600 if last > first else None
+
+    def daily(self, commander: str) -> Dict[str, Tuple[float, int]]:
+        """
+        Distance and jumps per day (UTC, YYYY-MM-DD) of the commander.
+        """
+        return dict((day, (distance, int(jumps))) for day, (distance, jumps) in self.days.get(commander, dict()).items())
+    # endregion
+
+    def add(self, distance: float, x: float, y: float, z: float, commander: str = "", timestamp: Union[float, None] = None):
+        if timestamp is None:
+            timestamp = time.time()
+        if self.total_jumps - self.spilled >= self.capacity:
+            self.flush()  # the oldest jump is overwritten now, make sure it's on disk
+        if self.total_jumps - self._window_start >= self.capacity:
+            self._drop_from_window()
+
+        number = self._commander_numbers.get(commander)
+        if number is None:
+            number = len(self.commanders)
+            self.commanders.append(commander)
+            self._commander_numbers[commander] = number
+            self._summary_dirty = True
+
+        i = self.total_jumps % self.capacity
+        self.timestamps[i] = timestamp
+        self.distances[i] = distance
+        self.x[i] = x
+        self.y[i] = y
+        self.z[i] = z
+        self.commander_numbers[i] = number
+        self.total_jumps += 1
+        stored = self.distances[i]  # compare float32 to float32 in the rolling maximum
+
+        self.session_jumps += 1
+        self.session_distance += distance
+        self.session_longest = max(self.session_longest, distance)
+        if self.session_start is None:
+            self.session_start = timestamp
+        self.session_end = timestamp
+
+        # rolling window: add the new jump and drop the ones that are too old
+        self._window_distance += stored
+        while self._window_max and self.distances[self._window_max[-1] % self.capacity] <= stored:
+            self._window_max.pop()
+        self._window_max.append(self.total_jumps - 1)
+        while self._window_start < self.total_jumps - 1 and timestamp - self.timestamps[self._window_start % self.capacity] > self.rate_window:
+            self._drop_from_window()
+
+        day = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d")
+        totals = self.days.setdefault(commander, dict()).setdefault(day, [0.0, 0])
+        totals[0] += distance
+        totals[1] += 1
+        self._summary_dirty = True
+
+    def _drop_from_window(self):
+        self._window_distance -= self.distances[self._window_start % self.capacity]
+        if self._window_max and self._window_max[0] == self._window_start:
+            self._window_max.popleft()
+        self._window_start += 1
+
+    def recent(self, count: int = None) -> Iterator[Jump]:
+        """
+        The jumps in memory, newest first.
+        """
+        count = len(self) if count is None else min(count, len(self))
+        for n in range(self.total_jumps - 1, self.total_jumps - 1 - count, -1):
+            i = n % self.capacity
+            yield self.timestamps[i], self.distances[i], self.x[i], self.y[i], self.z[i], self.commanders[self.commander_numbers[i]]
+
+    # region files
+    def flush(self):
+        if self.path and self.spilled < self.total_jumps:
+            try:
+                if self._file is None:
+                    self._file = open(self.path, "ab")
+                pack = self.RECORD.pack
+                self._file.write(b"".join(pack(self.timestamps[n % self.capacity], self.distances[n % self.capacity], self.x[n % self.capacity],
+                                               self.y[n % self.capacity], self.z[n % self.capacity], self.commander_numbers[n % self.capacity])
+                                          for n in range(self.spilled, self.total_jumps)))
+                self._file.flush()
+            except OSError:
+                logger.exception(f"Could not write the jump history to {self.path}")
+        self.spilled = self.total_jumps  # don't try again and again, the statistics don't depend on it
+        if self.summary_path and self._summary_dirty:
+            self.save_summary()
+
+    def read_file(self) -> Iterator[Jump]:
+        """
+        All jumps written to the history file, oldest first. Jumps still in memory only are not included.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            while True:
+                data = f.read(self.RECORD.size * 4096)
+                usable = len(data) - len(data) % self.RECORD.size
+                for timestamp, distance, x, y, z, number in self.RECORD.iter_unpack(data[:usable]):
+                    yield timestamp, distance, x, y, z, self.commanders[number] if number < len(self.commanders) else ""
+                if len(data) < self.RECORD.size * 4096:
+                    break
+
+    def load_summary(self):
+        if not self.summary_path:
+            return
+        try:
+            with open(self.summary_path, "r", encoding="utf-8") as f:
+                summary = json.load(f)
+            self.commanders = list(summary.get("commanders", list()))
+            self.days = summary.get("days", dict())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, AttributeError):
+            logger.exception(f"Could not read the summary of the jump history from {self.summary_path}")
+            return
+        self._commander_numbers = dict((commander, number) for number, commander in enumerate(self.commanders))
+
+    def save_summary(self):
+        tmp_path = self.summary_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"commanders": self.commanders, "days": self.days}, f)
+            os.replace(tmp_path, self.summary_path)
+            self._summary_dirty = False
+        except OSError:
+            logger.exception(f"Could not write the summary of the jump history to {self.summary_path}")
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+    # endregion
@@ -0,0 +1,177 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import json
+import math
+import logging
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+NAVROUTE_FILE_NAME = "NavRoute.json"
+MAX_JUMP_INTERVAL = 600.0  # seconds, longer breaks between jumps don't count for the time per jump
+SMOOTHING = 0.3  # weight of the latest jump in the time per jump
+
+
+def parse_timestamp(timestamp: str) -> Union[float, None]:
+    try:
+        return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class NavRoute(object):
+    """
+    Progress along the route plotted in the galaxy map. The route is read once and the distances of its legs are summed
+    up, so after that each jump only moves an index: remaining distance, jumps left and the estimated time are O(1).
+    Jumping to a system that isn't the next one on the route looks the system up in a dict, which handles skipped
+    and repeated systems as well as leaving the route and coming back later.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.systems: List[str] = list()
+        self.coordinates = array("d")
+        self.cumulative = array("d")  # distance from the start of the route to each system
+        self._positions: Dict[int, int] = dict()  # system address -> position in the route
+        self.position = 0  # last system of the route we've been to
+        self.off_route: Union[Tuple[float, float, float], None] = None  # coordinates if we've left the route
+        self.seconds_per_jump: Union[float, None] = None
+        self._last_jump: Union[float, None] = None
+        self.resyncs = 0
+
+    def __len__(self):
+        return len(self.systems)
+
+    @property
+    def active(self) -> bool:
+        return len(self.systems) > 1
+
+    def load(self, route: Sequence[Dict]):
+        """
+        Load the "Route" list of NavRoute.json or of the NavRoute event. The first system is where the route starts.
+        """
+        self.clear()
+        total = 0.0
+        previous = None
+        for hop in route:
+            try:
+                x, y, z = (float(c) for c in hop["StarPos"])
+                system_address = int(hop["SystemAddress"])
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping broken system {hop} of the route")
+                continue
+            if previous is not None:
+                total += math.sqrt((x - previous[0]) ** 2 + (y - previous[1]) ** 2 + (z - previous[2]) ** 2)
+            previous = (x, y, z)
+            self._positions.setdefault(system_address, len(self.systems))
+            self.systems.append(hop.get("StarSystem", ""))
+            self.coordinates.extend((x, y, z))
+            self.cumulative.append(total)
+
+    def load_file(self, path: str) -> bool:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                route = json.load(f).get("Route", list())
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, AttributeError):
+            logger.exception(f"Could not read the route from {path}")
+            return False
+        self.load(route)
+        return True
+
+    def get_coordinates(self, position: int) -> Tuple[float, float, float]:
+        return self.coordinates[position * 3], self.coordinates[position * 3 + 1], self.coordinates[position * 3 + 2]
+
+    def arrive(self, system_address: Union[int, None], coordinates: Union[Tuple[float, float, float], None], timestamp: Union[str, None] = None,
+               jumped: bool = True):
+        """
+        Track a jump or, with jumped False, a Location or StartUp event. These only tell where the commander is, they
+        don't count for the time per jump.
+        """
+        if not self.active:
+            return
+        if jumped and system_address is not None and self.position + 1 < len(self.systems) and self._positions.get(system_address) == self.position + 1:
+            self.position += 1  # the next system, the common case
+            self.off_route = None
+            self._count_jump(timestamp)
+            return
+        position = self._positions.get(system_address) if system_address is not None else None
+        if position is not None and position == self.position and self.off_route is None:
+            if not jumped:
+                self._last_jump = None  # still there after logging in again, the time in between is no jump
+            return
+        self.resyncs += 1
+        if position is not None:
+            self.position = position
+            self.off_route = None
+            if jumped:
+                self._count_jump(timestamp)
+            else:
+                self._last_jump = None
+        elif coordinates is not None and self.position + 1 < len(self.systems):
+            self.off_route = coordinates
+            self._last_jump = None
+
+    def _count_jump(self, timestamp: Union[str, None]):
+        now = parse_timestamp(timestamp) if timestamp else None
+        if now is not None and self._last_jump is not None and 0 < now - self._last_jump <= MAX_JUMP_INTERVAL:
+            interval = now - self._last_jump
+            if self.seconds_per_jump is None:
+                self.seconds_per_jump = interval
+            else:
+                self.seconds_per_jump += SMOOTHING * (interval - self.seconds_per_jump)
+        self._last_jump = now
+
+    @property
+    def finished(self) -> bool:
+        return self.active and self.off_route is None and self.position == len(self.systems) - 1
+
+    @property
+    def remaining_distance(self) -> float:
+        if not self.active:
+            return 0.0
+        if self.off_route is not None:
+            # back to the next system of the route, the rest as planned
+            x, y, z = self.off_route
+            a, b, c = self.get_coordinates(self.position + 1)
+            return math.sqrt((x - a) ** 2 + (y - b) ** 2 + (z - c) ** 2) + self.cumulative[-1] - self.cumulative[self.position + 1]
+        return self.cumulative[-1] - self.cumulative[self.position]
+
+    @property
+    def jumps_left(self) -> int:
+        if not self.active:
+            return 0
+        if self.off_route is not None:
+            return len(self.systems) - self.position  # one jump back to the next system of the route
+        return len(self.systems) - 1 - self.position
+
+    @property
+    def eta(self) -> Union[float, None]:
+        """
+        Estimated seconds until the end of the route or None if the time per jump isn't known yet.
+        """
+        if self.seconds_per_jump is None:
+            return None
+        return self.seconds_per_jump * self.jumps_left
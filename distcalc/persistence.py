@@ -0,0 +1,129 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import time
+import struct
+import logging
+from typing import BinaryIO, Union
+
+logger = logging.getLogger(__name__)
+
+TRAVELLED_KEY = "DistanceCalc_travelled"
+DEFAULT_LOG_FILE_NAME = "travelled.log"
+FLUSH_JUMPS = 25
+FLUSH_INTERVAL = 120.0  # seconds
+
+
+class TravelledDistance(object):
+    """
+    Total travelled distance that is written to the config behind the scenes: after a number of jumps, when flush is
+    called by a timer or on shutdown. Until then each change appends the new total to a small log file which is
+    truncated after every write to the config. If EDMC gets killed, the last total in the log is restored on the next
+    start. Without a log_path nothing is logged, the caller has to save the config right after each flush like
+    distcalc.tail, which keeps the total in the same file as its position in the journal.
+
+    config is anything with EDMC's get_int(key) and set(key, value).
+    """
+    RECORD = struct.Struct("<d")
+
+    def __init__(self, config, log_path: Union[str, None], key: str = TRAVELLED_KEY, flush_jumps: int = FLUSH_JUMPS, flush_interval: float = FLUSH_INTERVAL):
+        self.config = config
+        self.log_path = log_path
+        self.key = key
+        self.flush_jumps = flush_jumps
+        self.flush_interval = flush_interval
+        self.total: float = float(config.get_int(key) or 0) / 1000.0
+        self.writes = 0  # writes to the config
+        self._dirty = False
+        self._pending_jumps = 0
+        self._last_flush = time.monotonic()
+        self._log: Union[BinaryIO, None] = None
+
+        recovered = self.read_log()
+        if recovered is not None and int(recovered * 1000) != int(self.total * 1000):
+            logger.info(f"Restored travelled distance of {recovered:.2f} Ly from {log_path}, the config had {self.total:.2f} Ly")
+            self.total = recovered
+            self._dirty = True
+            self.flush()
+
+    def read_log(self) -> Union[float, None]:
+        if self.log_path is None:
+            return None
+        try:
+            with open(self.log_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        usable = len(data) - len(data) % self.RECORD.size  # the last record might be incomplete
+        if usable == 0:
+            return None
+        return self.RECORD.unpack_from(data, usable - self.RECORD.size)[0]
+
+    def _append(self):
+        if self.log_path is None:
+            return
+        try:
+            if self._log is None:
+                self._log = open(self.log_path, "ab")
+            self._log.write(self.RECORD.pack(self.total))
+            self._log.flush()  # in the hands of the OS now, that's enough to survive EDMC being killed
+        except OSError:
+            logger.exception(f"Could not write to {self.log_path}")
+
+    def add(self, distance: float):
+        self.total += distance
+        self._dirty = True
+        self._pending_jumps += 1
+        self._append()
+        if self._pending_jumps >= self.flush_jumps:
+            self.flush()
+
+    def set(self, total: float):
+        self.total = total
+        self._dirty = True
+        self._append()
+        self.flush()
+
+    def flush_if_due(self) -> bool:
+        if self._dirty and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if self._dirty:
+            self.config.set(self.key, int(self.total * 1000))
+            self.writes += 1
+            try:
+                if self._log is not None:
+                    self._log.truncate(0)
+                elif self.log_path is not None and os.path.exists(self.log_path):
+                    os.remove(self.log_path)
+            except OSError:
+                logger.exception(f"Could not truncate {self.log_path}")
+        self._dirty = False
+        self._pending_jumps = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
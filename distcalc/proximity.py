@@ -0,0 +1,164 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import math
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from distcalc.targets import parse_number, read_rows, target_from_dict
+
+# Alerts when a jump brings the commander within the radius of a point of interest (POI). Each POI is put into the
+# buckets of all cells of a grid that its sphere touches. There is a grid per level, the cells of each level are
+# LEVEL_FACTOR times as large as the ones below and a POI goes into the lowest level with cells at least as large as its
+# radius, so it touches at most 27 cells. A jump only looks at one bucket per level and at the POIs the commander is
+# inside of, no matter how many POIs there are or how large their radii are (e.g. "500 Ly from Colonia").
+
+CELL_SIZE = 64.0  # Ly, of the lowest level
+LEVEL_FACTOR = 8  # 64, 512, 4096, ... Ly
+HYSTERESIS = 0.1  # leaving counts once the distance is this fraction of the radius beyond it
+MIN_HYSTERESIS = 1.0  # Ly
+
+Cell = Tuple[int, int, int, int]  # level, x, y, z
+
+
+class Alert(NamedTuple):
+    name: str
+    distance: float
+    radius: float
+    entered: bool  # False when leaving the radius
+
+
+class ProximityAlerts(object):
+    def __init__(self, cell_size: float = CELL_SIZE, hysteresis: float = HYSTERESIS):
+        self.cell_size = cell_size
+        self.hysteresis = hysteresis
+        self.names: List[str] = list()
+        self.coordinates: List[Tuple[float, float, float]] = list()
+        self.radii: List[float] = list()
+        self.buckets: Dict[Cell, List[int]] = dict()  # cell -> numbers of the POIs whose sphere touches it
+        self.levels: Dict[int, float] = dict()  # level -> cell size, of the levels with POIs
+        self.inside: Set[int] = set()
+        self.position = None
+        self.moves = 0
+        self.checked = 0  # distances calculated, to see that it doesn't scale with the number of POIs
+
+    def __len__(self):
+        return len(self.names)
+
+    def level(self, radius: float) -> Tuple[int, float]:
+        """
+        Level and cell size for a POI with radius.
+        """
+        level, size = 0, self.cell_size
+        while size < radius:
+            level, size = level + 1, size * LEVEL_FACTOR
+        return level, size
+
+    @staticmethod
+    def cell(level: int, size: float, x: float, y: float, z: float) -> Cell:
+        return level, math.floor(x / size), math.floor(y / size), math.floor(z / size)
+
+    def add(self, name: str, x: float, y: float, z: float, radius: float):
+        if not 0.0 <= radius < math.inf:
+            raise ValueError(f"Invalid radius {radius} of {name}")
+        number = len(self.names)
+        self.names.append(name)
+        self.coordinates.append((x, y, z))
+        self.radii.append(radius)
+        level, size = self.level(radius)
+        self.levels[level] = size
+        low, high = self.cell(level, size, x - radius, y - radius, z - radius), self.cell(level, size, x + radius, y + radius, z + radius)
+        # squared distance from the POI to the nearest point of each row of cells, per axis
+        axes = [[(c, max(c * size - value, 0.0, value - (c + 1) * size) ** 2) for c in range(low[i + 1], high[i + 1] + 1)] for i, value in enumerate((x, y, z))]
+        buckets = self.buckets
+        rest = radius * radius
+        for cx, dx in axes[0]:
+            for cy, dy in axes[1]:
+                if dx + dy > rest:
+                    continue
+                for cz, dz in axes[2]:
+                    if dx + dy + dz <= rest:
+                        bucket = buckets.get((level, cx, cy, cz))
+                        if bucket is None:
+                            buckets[(level, cx, cy, cz)] = [number]
+                        else:
+                            bucket.append(number)
+        if self.position is not None and math.dist(self.position, (x, y, z)) <= radius:
+            self.inside.add(number)  # no alert for being there already
+
+    def move(self, x: float, y: float, z: float) -> List[Alert]:
+        """
+        Alerts for the radii entered and left since the last position, nearest first. There are none for the first
+        position, it only sets where the commander is.
+        """
+        first = self.position is None
+        self.position = (x, y, z)
+        self.moves += 1
+        alerts = list()
+        names, coordinates, radii, inside = self.names, self.coordinates, self.radii, self.inside
+        for number in list(inside):
+            distance = math.dist(coordinates[number], (x, y, z))
+            radius = radii[number]
+            if distance > radius + max(MIN_HYSTERESIS, radius * self.hysteresis):
+                inside.discard(number)
+                alerts.append(Alert(names[number], distance, radius, False))
+        checked = len(inside)
+        for level, size in self.levels.items():
+            for number in self.buckets.get(self.cell(level, size, x, y, z), ()):
+                if number in inside:
+                    continue
+                checked += 1
+                distance = math.dist(coordinates[number], (x, y, z))
+                if distance <= radii[number]:
+                    inside.add(number)
+                    alerts.append(Alert(names[number], distance, radii[number], True))
+        self.checked += checked
+        if first:
+            return list()
+        alerts.sort(key=lambda alert: alert.distance)
+        return alerts
+
+    def stats(self) -> Dict[str, int]:
+        return {"pois": len(self), "levels": len(self.levels), "buckets": len(self.buckets), "inside": len(self.inside),
+                "checked_per_jump": round(self.checked / self.moves) if self.moves else 0}
+
+
+def load_points_of_interest(path: str, radius: float) -> List[Dict]:
+    """
+    POIs from a JSON or CSV file in the same formats as the targets. A radius column sets the radius of the POI,
+    otherwise it's radius. Entries without coordinates or with an invalid radius are skipped.
+    """
+    points = list()
+    for row in read_rows(path):
+        try:
+            point = target_from_dict(row)
+            point["radius"] = parse_number(row["radius"]) if row.get("radius") not in (None, "") else radius
+            if not 0.0 <= point["radius"] < math.inf:
+                raise ValueError(point["radius"])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if point["system"] and point["x"] is not None:
+            points.append(point)
+    return points
+
+
+def create_alerts(points: Iterable[Dict]) -> ProximityAlerts:
+    alerts = ProximityAlerts()
+    for point in points:
+        alerts.add(point["system"], point["x"], point["y"], point["z"], point["radius"])
+    return alerts
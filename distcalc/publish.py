@@ -0,0 +1,391 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import sys
+import math
+import mmap
+import time
+import socket
+import struct
+import functools
+import logging
+import argparse
+import threading
+from itertools import chain
+from typing import Dict, List, NamedTuple, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# The distances the plugin shows, published for overlays and other tools in a memory mapped file with a fixed layout
+# (little endian, all offsets in bytes):
+#
+#     0   4s  magic "DCSN"
+#     4   H   layout version
+#     6   H   size of a target name
+#     8   I   capacity, the number of target slots
+#     12  4x
+#     16  Q   sequence, odd while the snapshot is being written
+#     24  d   time of the snapshot (seconds since the epoch)
+#     32  3d  current coordinates, NaN if unknown
+#     56  d   travelled distance, total
+#     64  d   travelled distance, session
+#     72  I   flags, see FLAG_*
+#     76  I   number of targets
+#     80      targets: name (UTF-8, NUL padded) and distance (d, NaN if unknown) each
+#
+# Readers don't lock anything: they read the sequence, the snapshot and the sequence again and try again if the
+# sequence was odd or has changed in between (a seqlock). With notifications enabled, the plugin also sends the new
+# sequence (Q) to every connection on a local TCP port after each snapshot.
+
+SNAPSHOT_FILE_NAME = "snapshot.bin"
+MAGIC = b"DCSN"
+LAYOUT_VERSION = 1
+NAME_SIZE = 64
+CAPACITY = 256  # targets in the snapshot, the nearest ones if there are more
+HEADER = struct.Struct("<4sHHI4x")
+SEQUENCE = struct.Struct("<Q")
+SEQUENCE_OFFSET = 16
+BODY = struct.Struct("<ddddddII")
+BODY_OFFSET = 24
+TARGET = struct.Struct(f"<{NAME_SIZE}sd")
+TARGETS_OFFSET = BODY_OFFSET + BODY.size
+FLAG_POSITION = 1  # the coordinates are known
+FLAG_TRAVELLED_TOTAL = 2
+FLAG_TRAVELLED_SESSION = 4
+FLAG_RUNNING = 8  # cleared when the plugin stops
+NOTIFY_HOST = "127.0.0.1"
+READ_ATTEMPTS = 1000
+POLL_INTERVAL = 0.05  # seconds
+
+
+def snapshot_size(capacity: int) -> int:
+    return TARGETS_OFFSET + capacity * TARGET.size
+
+
+@functools.lru_cache(maxsize=16)
+def targets_struct(count: int) -> struct.Struct:
+    """
+    All targets of a snapshot in one struct, packing and unpacking them at once is about twice as fast.
+    """
+    return struct.Struct("<" + f"{NAME_SIZE}sd" * count)
+
+
+class Snapshot(NamedTuple):
+    sequence: int
+    timestamp: float
+    coordinates: Union[Tuple[float, float, float], None]
+    travelled_total: Union[float, None]
+    travelled_session: Union[float, None]
+    targets: List[Tuple[str, Union[float, None]]]
+    running: bool
+
+
+class SnapshotWriter(object):
+    """
+    Publishes snapshots into the file at path. The file keeps its size, so readers can map it once and keep it mapped.
+    If port isn't 0, connections to it on localhost are notified of every snapshot.
+    """
+
+    def __init__(self, path: str, capacity: int = CAPACITY, port: int = 0):
+        self.path = path
+        self.capacity = capacity
+        self.sequence = 0
+        self.notifications_dropped = 0  # connections closed because they didn't keep up
+        size = snapshot_size(capacity)
+        self._file = open(path, "a+b")
+        try:
+            if os.path.getsize(path) >= SEQUENCE_OFFSET + SEQUENCE.size:
+                # continue the sequence of the last run, so readers that kept the file open see the change
+                self._file.seek(SEQUENCE_OFFSET)
+                self.sequence = (SEQUENCE.unpack(self._file.read(SEQUENCE.size))[0] + 1) & ~1
+            if os.path.getsize(path) != size:
+                self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        except (OSError, ValueError):
+            self._file.close()
+            raise
+        HEADER.pack_into(self._map, 0, MAGIC, LAYOUT_VERSION, NAME_SIZE, capacity)
+        self._names: Dict[str, bytes] = dict()  # name -> encoded name, the same targets are published again and again
+        self._clients: List[socket.socket] = list()
+        self._clients_lock = threading.Lock()
+        self._server: Union[socket.socket, None] = None
+        if port:
+            try:
+                self._server = socket.create_server((NOTIFY_HOST, port))
+            except OSError:
+                self._map.close()
+                self._file.close()
+                raise
+            threading.Thread(name="DistanceCalc_Publish", target=self._accept, daemon=True).start()
+
+    def _encode(self, name: str) -> bytes:
+        encoded = self._names.get(name)
+        if encoded is None:
+            encoded = name.encode("utf-8")[:NAME_SIZE]
+            # don't cut a character in half
+            encoded = encoded.decode("utf-8", "ignore").encode("utf-8")
+            if len(self._names) > 4 * self.capacity:
+                self._names.clear()
+            self._names[name] = encoded
+        return encoded
+
+    def publish(self, coordinates: Union[Sequence[float], None], targets: Sequence[Tuple[str, Union[float, None]]],
+                travelled_total: Union[float, None] = None, travelled_session: Union[float, None] = None, running: bool = True) -> int:
+        """
+        Write a snapshot and notify the connected readers. targets are (name, distance), only the first capacity ones are
+        published. Returns the sequence of the snapshot.
+        """
+        count = min(len(targets), self.capacity)
+        flags = (FLAG_RUNNING if running else 0) | (FLAG_POSITION if coordinates else 0) | \
+            (FLAG_TRAVELLED_TOTAL if travelled_total is not None else 0) | (FLAG_TRAVELLED_SESSION if travelled_session is not None else 0)
+        x, y, z = coordinates if coordinates else (math.nan, math.nan, math.nan)
+        body = BODY.pack(time.time(), x, y, z, math.nan if travelled_total is None else travelled_total,
+                         math.nan if travelled_session is None else travelled_session, flags, count)
+        encode = self._encode
+        data = targets_struct(count).pack(*chain.from_iterable((encode(name), math.nan if distance is None else distance) for name, distance in targets[:count]))
+
+        data_map = self._map
+        SEQUENCE.pack_into(data_map, SEQUENCE_OFFSET, self.sequence + 1)  # odd: readers wait until it's even again
+        data_map[BODY_OFFSET:TARGETS_OFFSET] = body
+        data_map[TARGETS_OFFSET:TARGETS_OFFSET + len(data)] = data
+        self.sequence += 2
+        SEQUENCE.pack_into(data_map, SEQUENCE_OFFSET, self.sequence)
+        if self._clients:
+            self._notify()
+        return self.sequence
+
+    def _accept(self):
+        server = self._server
+        while True:
+            try:
+                client, _ = server.accept()
+            except OSError:
+                return  # closed
+            client.setblocking(False)
+            with self._clients_lock:
+                self._clients.append(client)
+
+    def _notify(self):
+        message = SEQUENCE.pack(self.sequence)
+        with self._clients_lock:
+            clients = list()
+            for client in self._clients:
+                try:
+                    client.send(message)
+                    clients.append(client)
+                except OSError:  # gone or not reading, it can still poll the file
+                    self.notifications_dropped += 1
+                    client.close()
+            self._clients = clients
+
+    @property
+    def connections(self) -> int:
+        return len(self._clients)
+
+    def close(self):
+        """
+        Publish that the plugin isn't running anymore and release the file. The last snapshot stays readable.
+        """
+        if self._map.closed:
+            return
+        flags_offset = BODY_OFFSET + BODY.size - 8
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self.sequence + 1)
+        flags = struct.unpack_from("<I", self._map, flags_offset)[0]
+        struct.pack_into("<I", self._map, flags_offset, flags & ~FLAG_RUNNING)
+        self.sequence += 2
+        SEQUENCE.pack_into(self._map, SEQUENCE_OFFSET, self.sequence)
+        if self._server:
+            self._notify()
+            self._server.close()
+            with self._clients_lock:
+                for client in self._clients:
+                    client.close()
+                self._clients = list()
+        self._map.close()
+        self._file.close()
+
+
+class SnapshotReader(object):
+    """
+    Reads the snapshots of the plugin. Checking for a new snapshot reads 8 bytes of the mapped file, reading one parses
+    it straight from the map. With port, wait blocks until the plugin sends a notification instead of polling.
+
+        reader = SnapshotReader(os.path.join(plugin_dir, SNAPSHOT_FILE_NAME))
+        while True:
+            snapshot = reader.wait()
+            ...
+    """
+
+    def __init__(self, path: str, port: int = 0):
+        self.path = path
+        self.port = port
+        self.last_sequence = 0
+        self._file = None
+        self._map: Union[mmap.mmap, None] = None
+        self._socket: Union[socket.socket, None] = None
+        self._names: Dict[bytes, str] = dict()  # the same targets are published again and again
+
+    def _open(self) -> bool:
+        if self._map is not None:
+            return True
+        try:
+            self._file = open(self.path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # not there yet or still empty
+            if self._file:
+                self._file.close()
+                self._file = None
+            return False
+        magic, version, name_size, capacity = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or name_size != NAME_SIZE or len(self._map) < snapshot_size(capacity):
+            logger.error(f"{self.path} is not a snapshot of this version")
+            self.close()
+            return False
+        return True
+
+    @property
+    def sequence(self) -> int:
+        """
+        Sequence of the current snapshot, 0 if there is none. Odd while the plugin is writing.
+        """
+        if not self._open():
+            return 0
+        return SEQUENCE.unpack_from(self._map, SEQUENCE_OFFSET)[0]
+
+    def changed(self) -> bool:
+        return self.sequence != self.last_sequence
+
+    def read(self) -> Union[Snapshot, None]:
+        """
+        The current snapshot or None if there is none. Never returns a snapshot that was being written while reading.
+        """
+        if not self._open():
+            return None
+        data_map = self._map
+        unpack_sequence = SEQUENCE.unpack_from
+        for _ in range(READ_ATTEMPTS):
+            before = unpack_sequence(data_map, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                time.sleep(0)  # the plugin is writing, let it finish
+                continue
+            timestamp, x, y, z, total, session, flags, count = BODY.unpack_from(data_map, BODY_OFFSET)
+            count = min(count, (len(data_map) - TARGETS_OFFSET) // TARGET.size)
+            values = targets_struct(count).unpack_from(data_map, TARGETS_OFFSET)
+            if unpack_sequence(data_map, SEQUENCE_OFFSET)[0] != before:
+                continue  # changed while reading
+            self.last_sequence = before
+            if before == 0:
+                return None
+            names = self._names
+            if len(names) > 4 * CAPACITY:
+                names.clear()
+            targets = list()
+            for i in range(0, len(values), 2):
+                name = names.get(values[i])
+                if name is None:
+                    name = names[values[i]] = values[i].rstrip(b"\0").decode("utf-8", "ignore")
+                distance = values[i + 1]
+                targets.append((name, distance if distance == distance else None))  # NaN if unknown
+            return Snapshot(before, timestamp, (x, y, z) if flags & FLAG_POSITION else None,
+                            total if flags & FLAG_TRAVELLED_TOTAL else None, session if flags & FLAG_TRAVELLED_SESSION else None,
+                            targets, bool(flags & FLAG_RUNNING))
+        logger.warning(f"Gave up reading {self.path} after {READ_ATTEMPTS} attempts")
+        return None
+
+    def _connect(self) -> bool:
+        if self._socket is None:
+            try:
+                self._socket = socket.create_connection((NOTIFY_HOST, self.port), timeout=1.0)
+            except OSError:
+                return False
+        return True
+
+    def wait(self, timeout: Union[float, None] = None) -> Union[Snapshot, None]:
+        """
+        Wait for a snapshot newer than the last one read and return it, None on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.changed():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            if self.port and self._connect():
+                self._socket.settimeout(remaining)
+                try:
+                    if not self._socket.recv(4096):
+                        raise ConnectionError("closed")  # the plugin stopped, poll until it's back
+                except socket.timeout:
+                    return None
+                except OSError:
+                    self._socket.close()
+                    self._socket = None
+                    time.sleep(POLL_INTERVAL)
+            else:
+                time.sleep(POLL_INTERVAL if remaining is None else min(POLL_INTERVAL, remaining))
+        return self.read()
+
+    def close(self):
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def main(argv=None):
+    default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), SNAPSHOT_FILE_NAME)
+    parser = argparse.ArgumentParser(prog="python -m distcalc.publish", description="Show the distances published by DistanceCalc.")
+    parser.add_argument("--snapshot", default=default_path, help=f"path of the snapshot file (default: {default_path})")
+    parser.add_argument("--port", type=int, default=0, help="port the plugin notifies on (default: poll the file)")
+    parser.add_argument("--follow", action="store_true", help="keep showing new snapshots")
+    args = parser.parse_args(argv)
+
+    reader = SnapshotReader(args.snapshot, args.port)
+    try:
+        snapshot = reader.read()
+        if snapshot is None and not args.follow:
+            print(f"No snapshot in {args.snapshot}")
+            return 1
+        while True:
+            if snapshot is not None:
+                position = "unknown" if snapshot.coordinates is None else " / ".join(f"{c:.2f}" for c in snapshot.coordinates)
+                print(f"#{snapshot.sequence} {time.strftime('%H:%M:%S', time.localtime(snapshot.timestamp))} position {position}"
+                      f"{'' if snapshot.running else ' (plugin stopped)'}")
+                for name, distance in snapshot.targets:
+                    print(f"    {name}: {'?' if distance is None else f'{distance:.2f}'} Ly")
+                if snapshot.travelled_total is not None:
+                    print(f"    Travelled (total): {snapshot.travelled_total:.2f} Ly")
+                if snapshot.travelled_session is not None:
+                    print(f"    Travelled (session): {snapshot.travelled_session:.2f} Ly")
+            if not args.follow:
+                return 0
+            snapshot = reader.wait()
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
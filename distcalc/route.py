@@ -0,0 +1,254 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import csv
+import math
+import heapq
+import logging
+from array import array
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Set, Tuple, Union
+
+from distcalc.systemindex import SystemIndex, normalize_name
+
+logger = logging.getLogger(__name__)
+
+Coordinates = Tuple[float, float, float]
+Cell = Tuple[int, int, int]
+
+NEUTRON_BOOST = 4.0  # a supercharged frame shift drive jumps four times as far
+CORRIDOR_RADIUS = 100.0  # stars further away from the straight line to the target are not considered
+CORRIDOR_SLICES = 4.0  # length of the slices the corridor is read in, in radii
+MAX_EXPANSIONS = 500000
+HEURISTIC_WEIGHT = 1.5  # 1.0 finds the shortest route without neutron stars but takes up to a hundred times longer
+NEUTRON_FILE_NAMES = ("neutron_stars.txt", "neutron_stars.csv")  # looked for in the plugin folder
+
+
+def load_neutron_names(path: str) -> Set[str]:
+    """
+    Normalized names of neutron stars from a text file with one name per line or a CSV file with the name in the first
+    column (e.g. exported from Spansh). A header line does no harm, there is no system called "name".
+    """
+    names = set()
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            rows: Iterable = (row[0] for row in csv.reader(f) if row)
+        else:
+            rows = f
+        for name in rows:
+            name = normalize_name(name)
+            if name:
+                names.add(name)
+    return names
+
+
+def corridor_boxes(start: Coordinates, end: Coordinates, radius: float, slice_length: float = math.inf) -> Iterator[Tuple[Coordinates, Coordinates]]:
+    """
+    (lower, upper) corners of boxes covering everything within radius of the line from start to end. The boxes are
+    slices of up to slice_length along the axis the line goes furthest in and don't overlap.
+    """
+    axis = max(range(3), key=lambda i: abs(end[i] - start[i]))
+    a0, a1 = start[axis], end[axis]
+    low, high = min(a0, a1) - radius, max(a0, a1) + radius
+    slices = 1 if a0 == a1 or slice_length == math.inf else math.ceil((high - low) / slice_length)
+    for i in range(slices):
+        a = low + (high - low) * i / slices
+        b = low + (high - low) * (i + 1) / slices if i < slices - 1 else high
+        # the part of the line within radius of the slice
+        t0, t1 = 0.0, 1.0
+        if slices > 1:
+            t0, t1 = sorted(((a - radius - a0) / (a1 - a0), (b + radius - a0) / (a1 - a0)))
+            t0, t1 = max(t0, 0.0), min(t1, 1.0)
+        points = [[s + t * (e - s) for s, e in zip(start, end)] for t in (t0, t1)]
+        lower = [min(p[j] for p in points) - radius for j in range(3)]
+        upper = [max(p[j] for p in points) + radius for j in range(3)]
+        lower[axis], upper[axis] = math.nextafter(a, math.inf) if i else a, b  # a is in the previous slice
+        yield tuple(lower), tuple(upper)
+
+
+class Route(NamedTuple):
+    jumps: int
+    systems: List[str]  # stars to stop at on the way, the last jump goes from the last one to the target
+    neutron_jumps: int  # jumps with a boost from a neutron star
+    expansions: int  # stars expanded by the search
+
+
+class StarMap(object):
+    """
+    Stars to plot routes over. The stars are kept in a uniform grid with cells as big as the jump range, so all stars
+    in range of a jump are found in the neighbouring cells.
+    """
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.names: List[str] = list()
+        self.coordinates = array("d")
+        self.neutron = bytearray()
+        self._cells: Dict[Cell, List[int]] = dict()
+
+    def __len__(self):
+        return len(self.names)
+
+    def cell(self, x: float, y: float, z: float) -> Cell:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size), math.floor(z / self.cell_size)
+
+    def add(self, name: str, x: float, y: float, z: float, neutron: bool = False) -> int:
+        number = len(self.names)
+        self.names.append(name)
+        self.coordinates.extend((x, y, z))
+        self.neutron.append(neutron)
+        self._cells.setdefault(self.cell(x, y, z), list()).append(number)
+        return number
+
+    def get_coordinates(self, number: int) -> Coordinates:
+        return self.coordinates[number * 3], self.coordinates[number * 3 + 1], self.coordinates[number * 3 + 2]
+
+    def within(self, x: float, y: float, z: float, radius: float) -> Iterator[Tuple[int, float]]:
+        """
+        (star number, distance) of all stars within radius of (x, y, z), in no particular order.
+        """
+        cx, cy, cz = self.cell(x, y, z)
+        reach = math.ceil(radius / self.cell_size)
+        coordinates = self.coordinates
+        cells = self._cells
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for dz in range(-reach, reach + 1):
+                    stars = cells.get((cx + dx, cy + dy, cz + dz))
+                    if stars is None:
+                        continue
+                    for number in stars:
+                        i = number * 3
+                        distance = math.sqrt((coordinates[i] - x) ** 2 + (coordinates[i + 1] - y) ** 2 + (coordinates[i + 2] - z) ** 2)
+                        if distance <= radius:
+                            yield number, distance
+
+    @classmethod
+    def from_system_index(cls, system_index: SystemIndex, start: Coordinates, end: Coordinates, cell_size: float,
+                          neutron_names: Union[Set[str], None] = None, radius: float = CORRIDOR_RADIUS) -> "StarMap":
+        """
+        Stars of the system index in a corridor of radius around the straight line from start to end.
+        """
+        star_map = cls(cell_size)
+        neutron_names = neutron_names or set()
+        direction = tuple(b - a for a, b in zip(start, end))
+        length_squared = sum(d * d for d in direction) or 1.0
+        # an index with cells only reads the stars of the boxes, so thin slices along the route read far fewer stars
+        # than one box around a diagonal route. Without cells every box reads all stars
+        slice_length = CORRIDOR_SLICES * radius if system_index.cell_size else math.inf
+        boxes = corridor_boxes(start, end, radius, slice_length)
+        for name, x, y, z in chain.from_iterable(system_index.records_in_box(lower, upper) for lower, upper in boxes):
+            # distance to the closest point of the line segment
+            t = max(0.0, min(1.0, ((x - start[0]) * direction[0] + (y - start[1]) * direction[1] + (z - start[2]) * direction[2]) / length_squared))
+            if (x - start[0] - t * direction[0]) ** 2 + (y - start[1] - t * direction[1]) ** 2 + (z - start[2] - t * direction[2]) ** 2 <= radius * radius:
+                star_map.add(name, x, y, z, normalize_name(name) in neutron_names)
+        return star_map
+
+
+class RoutePlanner(object):
+    """
+    Weighted A* search for the route with the fewest jumps. Jumps from a neutron star reach neutron_boost times as far.
+    The remaining jumps are estimated with the regular jump range, after the boosted jump if the star is a neutron star,
+    and weighted, which makes the search go for the target instead of expanding every star that might be on an equally
+    short route. A route has at most weight times the jumps of the shortest one, usually it is the shortest. With
+    neutron stars around, the estimate isn't a lower bound anymore, so there is no such guarantee.
+    """
+
+    def __init__(self, star_map: StarMap, jump_range: float, neutron_boost: float = NEUTRON_BOOST, max_expansions: int = MAX_EXPANSIONS,
+                 weight: float = HEURISTIC_WEIGHT):
+        self.star_map = star_map
+        self.jump_range = jump_range
+        self.neutron_boost = neutron_boost
+        self.max_expansions = max_expansions
+        self.weight = weight
+
+    def plot(self, start: Coordinates, end: Coordinates) -> Union[Route, None]:
+        """
+        Route from start to end. Neither has to be a star of the map. Returns None if there is no route over the
+        stars of the map.
+        """
+        star_map = self.star_map
+        jump_range = self.jump_range
+        ex, ey, ez = end
+
+        def range_from(node: int) -> float:
+            return jump_range * self.neutron_boost if node >= 0 and star_map.neutron[node] else jump_range
+
+        def remaining(x: float, y: float, z: float) -> float:
+            return math.sqrt((x - ex) ** 2 + (y - ey) ** 2 + (z - ez) ** 2)
+
+        def estimate(node: int, distance: float) -> float:
+            # jumps left, the first one from a neutron star is boosted. Without this a neutron star looks no better
+            # than any other star at the same distance and the search never expands it to see how far it gets
+            if star_map.neutron[node]:
+                return max(distance / jump_range - (self.neutron_boost - 1.0), 1.0)
+            return distance / jump_range
+
+        start_node = -1  # the start isn't necessarily a star
+        goal_node = -2
+        node_coordinates = {start_node: start}
+        jumps: Dict[int, int] = {start_node: 0}
+        previous: Dict[int, int] = dict()
+        closed = set()
+        counter = 0
+        # (estimated total jumps, remaining distance, tie breaker, node)
+        queue: List[Tuple[float, float, int, int]] = [(self.weight * remaining(*start) / jump_range, remaining(*start), counter, start_node)]
+        expansions = 0
+        while queue:
+            _, _, _, node = heapq.heappop(queue)
+            if node == goal_node:
+                return self._route(previous, jumps[goal_node], expansions)
+            if node in closed:
+                continue
+            closed.add(node)
+            expansions += 1
+            if expansions > self.max_expansions:
+                logger.warning(f"Giving up on the route after {expansions} stars")
+                return None
+
+            x, y, z = node_coordinates[node] if node < 0 else star_map.get_coordinates(node)
+            reach = range_from(node)
+            next_jumps = jumps[node] + 1
+            if remaining(x, y, z) <= reach:
+                if next_jumps < jumps.get(goal_node, math.inf):
+                    jumps[goal_node] = next_jumps
+                    previous[goal_node] = node
+                    counter += 1
+                    heapq.heappush(queue, (next_jumps, 0.0, counter, goal_node))
+                continue  # the target is in range, no stop on the way can be better
+            for neighbour, _ in star_map.within(x, y, z, reach):
+                if neighbour in closed or next_jumps >= jumps.get(neighbour, math.inf):
+                    continue
+                jumps[neighbour] = next_jumps
+                previous[neighbour] = node
+                distance = remaining(*star_map.get_coordinates(neighbour))
+                counter += 1
+                heapq.heappush(queue, (next_jumps + self.weight * estimate(neighbour, distance), distance, counter, neighbour))
+        return None
+
+    def _route(self, previous: Dict[int, int], jumps: int, expansions: int) -> Route:
+        nodes = list()
+        node = previous[-2]
+        while node >= 0:
+            nodes.append(node)
+            node = previous[node]
+        nodes.reverse()
+        neutron_jumps = sum(1 for node in nodes if self.star_map.neutron[node])
+        return Route(jumps, [self.star_map.names[node] for node in nodes], neutron_jumps, expansions)
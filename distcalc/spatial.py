@@ -0,0 +1,256 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import heapq
+import math
+from typing import Dict, Hashable, Iterator, List, Tuple, Union
+
+SECTOR_SIZE = 1280.0
+SECTOR_ORIGIN = (-49985.0, -40985.0, -24105.0)  # corner of the sector grid used by the game
+LEAF_SIZE = 16  # entries in a node before it is split into octants
+MIN_NODE_SIZE = 1.0  # nodes aren't split below this size to cope with many entries at the same position
+
+Cell = Tuple[int, int, int]
+Coordinates = Tuple[float, float, float]
+
+
+class _Node(object):
+    """
+    Node of the octree inside of a sector. Leaves hold the entries, inner nodes hold eight children.
+    """
+    __slots__ = ("x", "y", "z", "size", "count", "entries", "children")
+
+    def __init__(self, x: float, y: float, z: float, size: float):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.size = size
+        self.count = 0
+        self.entries: Union[Dict[Hashable, Coordinates], None] = dict()
+        self.children: Union[List["_Node"], None] = None
+
+    def distance(self, x: float, y: float, z: float) -> float:
+        # smallest distance between the point and the box of the node
+        total = 0.0
+        for value, low in ((x, self.x), (y, self.y), (z, self.z)):
+            if value < low:
+                total += (low - value) ** 2
+            elif value > low + self.size:
+                total += (value - low - self.size) ** 2
+        return math.sqrt(total)
+
+    def child(self, x: float, y: float, z: float) -> "_Node":
+        half = self.size / 2
+        return self.children[(x >= self.x + half) | ((y >= self.y + half) << 1) | ((z >= self.z + half) << 2)]
+
+    def insert(self, key: Hashable, coordinates: Coordinates):
+        node = self
+        while node.children is not None:
+            node.count += 1
+            node = node.child(*coordinates)
+        node.count += 1
+        node.entries[key] = coordinates
+        if len(node.entries) > LEAF_SIZE and node.size > MIN_NODE_SIZE:
+            node.split()
+
+    def split(self):
+        half = self.size / 2
+        self.children = [_Node(self.x + half * (i & 1), self.y + half * ((i >> 1) & 1), self.z + half * ((i >> 2) & 1), half) for i in range(8)]
+        entries = self.entries
+        self.entries = None
+        for key, coordinates in entries.items():
+            child = self.child(*coordinates)
+            child.count += 1
+            child.entries[key] = coordinates
+        for child in self.children:
+            if len(child.entries) > LEAF_SIZE and child.size > MIN_NODE_SIZE:
+                child.split()
+
+    def remove(self, key: Hashable, coordinates: Coordinates):
+        node = self
+        while node.children is not None:
+            node.count -= 1
+            if node.count <= LEAF_SIZE // 2:
+                node.collapse()
+                break
+            node = node.child(*coordinates)
+        else:
+            node.count -= 1
+        del node.entries[key]
+
+    def collapse(self):
+        entries = dict()
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                entries.update(node.entries)
+            else:
+                stack.extend(node.children)
+        self.entries = entries
+        self.children = None
+
+
+class SectorGrid(object):
+    """
+    Uniform grid over the galaxy. By default a cell matches one of Elite's 1280 Ly sectors. Only occupied cells are
+    stored, so sparse data spread over the whole galaxy costs nothing for the empty space in between. Each cell is an
+    octree which keeps crowded sectors like the bubble fast.
+    Entries are identified by a hashable key and can be inserted and removed at any time.
+    """
+
+    def __init__(self, cell_size: float = SECTOR_SIZE, origin: Coordinates = SECTOR_ORIGIN):
+        self.cell_size = cell_size
+        self.origin = origin
+        self._cells: Dict[Cell, _Node] = dict()
+        self._coordinates: Dict[Hashable, Coordinates] = dict()
+
+    def __len__(self):
+        return len(self._coordinates)
+
+    def __contains__(self, key: Hashable):
+        return key in self._coordinates
+
+    def cell(self, x: float, y: float, z: float) -> Cell:
+        size = self.cell_size
+        return (math.floor((x - self.origin[0]) / size), math.floor((y - self.origin[1]) / size),
+                math.floor((z - self.origin[2]) / size))
+
+    def insert(self, key: Hashable, x: float, y: float, z: float):
+        if key in self._coordinates:
+            self.remove(key)
+        cell = self.cell(x, y, z)
+        root = self._cells.get(cell)
+        if root is None:
+            root = _Node(self.origin[0] + cell[0] * self.cell_size, self.origin[1] + cell[1] * self.cell_size,
+                         self.origin[2] + cell[2] * self.cell_size, self.cell_size)
+            self._cells[cell] = root
+        root.insert(key, (x, y, z))
+        self._coordinates[key] = (x, y, z)
+
+    def remove(self, key: Hashable) -> bool:
+        coordinates = self._coordinates.pop(key, None)
+        if coordinates is None:
+            return False
+        cell = self.cell(*coordinates)
+        root = self._cells[cell]
+        root.remove(key, coordinates)
+        if root.count == 0:
+            del self._cells[cell]
+        return True
+
+    def clear(self):
+        self._cells = dict()
+        self._coordinates = dict()
+
+    @staticmethod
+    def _shell(center: Cell, radius: int) -> Iterator[Cell]:
+        # all cells with a Chebyshev distance of exactly radius to center
+        cx, cy, cz = center
+        if radius == 0:
+            yield center
+            return
+        full = range(-radius, radius + 1)
+        for dx in full:
+            for dy in full:
+                if abs(dx) == radius or abs(dy) == radius:
+                    for dz in full:
+                        yield cx + dx, cy + dy, cz + dz
+                else:
+                    yield cx + dx, cy + dy, cz - radius
+                    yield cx + dx, cy + dy, cz + radius
+
+    @staticmethod
+    def _shell_size(radius: int) -> int:
+        return (2 * radius + 1) ** 3 - (2 * radius - 1) ** 3 if radius > 0 else 1
+
+    def nearest(self, x: float, y: float, z: float, k: int) -> List[Tuple[float, Hashable]]:
+        """
+        The k entries closest to (x, y, z) as (distance, key) sorted by distance.
+        Sectors are added in growing shells around the position and searched best first, until k entries are found
+        that are closer than anything in the sectors not added yet. If the shells get bigger than the number of
+        occupied sectors, all remaining sectors are added at once, so far away entries don't cause a walk through
+        empty space.
+        """
+        k = min(k, len(self))
+        result: List[Tuple[float, Hashable]] = list()
+        if k <= 0:
+            return result
+
+        queue: List[Tuple[float, int, bool, object]] = list()  # (distance, tie breaker, is entry, node or key)
+        counter = 0
+        center = self.cell(x, y, z)
+        radius = 0
+        bound = -1.0  # nothing of the sectors which haven't been added is closer than this
+        seeded = 0
+        while len(result) < k:
+            while seeded < len(self._cells) and (not queue or queue[0][0] > bound):
+                if self._shell_size(radius) + seeded <= len(self._cells):
+                    cells = (self._cells.get(cell) for cell in self._shell(center, radius))
+                    bound = radius * self.cell_size
+                    radius += 1
+                else:
+                    shells = set(cell for r in range(radius) for cell in self._shell(center, r))
+                    cells = (root for cell, root in self._cells.items() if cell not in shells)
+                    bound = math.inf
+                for root in cells:
+                    if root is not None:
+                        counter += 1
+                        seeded += 1
+                        heapq.heappush(queue, (root.distance(x, y, z), counter, False, root))
+
+            distance, _, is_entry, item = heapq.heappop(queue)
+            if is_entry:
+                result.append((distance, item))
+            elif item.children is None:
+                for key, (a, b, c) in item.entries.items():
+                    counter += 1
+                    heapq.heappush(queue, (math.sqrt((a - x) ** 2 + (b - y) ** 2 + (c - z) ** 2), counter, True, key))
+            else:
+                for child in item.children:
+                    if child.count:
+                        counter += 1
+                        heapq.heappush(queue, (child.distance(x, y, z), counter, False, child))
+        return result
+
+    def within(self, x: float, y: float, z: float, radius: float) -> List[Tuple[float, Hashable]]:
+        """
+        All entries within radius of (x, y, z) as (distance, key) sorted by distance.
+        """
+        low = self.cell(x - radius, y - radius, z - radius)
+        high = self.cell(x + radius, y + radius, z + radius)
+        if (high[0] - low[0] + 1) * (high[1] - low[1] + 1) * (high[2] - low[2] + 1) <= len(self._cells):
+            roots = [self._cells[cell] for cell in ((i, j, l) for i in range(low[0], high[0] + 1) for j in range(low[1], high[1] + 1)
+                                                    for l in range(low[2], high[2] + 1)) if cell in self._cells]
+        else:
+            roots = [root for cell, root in self._cells.items() if all(low[i] <= cell[i] <= high[i] for i in range(3))]
+
+        result = list()
+        stack = [root for root in roots if root.distance(x, y, z) <= radius]
+        while stack:
+            node = stack.pop()
+            if node.children is None:
+                for key, (a, b, c) in node.entries.items():
+                    distance = math.sqrt((a - x) ** 2 + (b - y) ** 2 + (c - z) ** 2)
+                    if distance <= radius:
+                        result.append((distance, key))
+            else:
+                stack.extend(child for child in node.children if child.count and child.distance(x, y, z) <= radius)
+        result.sort(key=lambda entry: entry[0])
+        return result
@@ -0,0 +1,197 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import time
+import functools
+import threading
+from array import array
+from typing import Callable, Dict, List, Union
+
+# Counters, timers and gauges for the hot paths. Everything goes through the module level STATS, so instrumenting a
+# function is a decorator or a single call:
+#
+#     @timed("journal_entry")
+#     def journal_entry(...): ...
+#
+#     STATS.count("edsm.retries")
+#     STATS.observe("edsm.request", seconds)
+#
+# When STATS is disabled, timed functions cost one attribute lookup and nothing is recorded.
+
+BUCKETS = 28  # bucket b holds durations below 2 ** b microseconds, the last one everything longer (> 2 minutes)
+
+
+class Histogram(object):
+    """
+    Durations in buckets of powers of two microseconds. Percentiles are the upper bound of their bucket, which is
+    precise enough to see regressions and costs a fixed amount of memory.
+    """
+
+    def __init__(self):
+        self.buckets = array("Q", bytes(8 * BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = p * self.count
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {"count": self.count, "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+                "p50_ms": round(self.percentile(0.5) * 1000, 3), "p99_ms": round(self.percentile(0.99) * 1000, 3),
+                "max_ms": round(self.max * 1000, 3)}
+
+
+class Stats(object):
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.counters: Dict[str, int] = dict()
+        self.histograms: Dict[str, Histogram] = dict()
+        self.gauges: Dict[str, Callable[[], Union[int, float, Dict]]] = dict()
+        self.started = time.time()
+        self._lock = threading.Lock()  # counters and histograms are updated from worker threads as well
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        if self.enabled:
+            with self._lock:
+                histogram = self.histograms.get(name)
+                if histogram is None:
+                    histogram = self.histograms[name] = Histogram()
+                histogram.add(seconds)
+
+    def gauge(self, name: str, function: Callable[[], Union[int, float, Dict]]):
+        """
+        Register a function returning a value that is read when a snapshot is taken, e.g. the statistics of a cache.
+        """
+        self.gauges[name] = function
+
+    def reset(self):
+        with self._lock:
+            self.counters = dict()
+            self.histograms = dict()
+            self.started = time.time()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            result = {"seconds": round(time.time() - self.started), "counters": dict(self.counters),
+                      "timers": dict((name, histogram.summary()) for name, histogram in sorted(self.histograms.items()))}
+        gauges = dict()
+        for name, function in self.gauges.items():
+            try:
+                gauges[name] = function()
+            except Exception as e:  # a gauge of something that has been closed
+                gauges[name] = repr(e)
+        result["gauges"] = gauges
+        return result
+
+    def format(self) -> str:
+        """
+        Human readable snapshot, one line per value.
+        """
+        snapshot = self.snapshot()
+        lines: List[str] = list()
+        for name, summary in snapshot["timers"].items():
+            lines.append(f"{name}: {summary['count']} calls, mean {summary['mean_ms']:.3f} ms, p50 {summary['p50_ms']:.3f} ms, "
+                         f"p99 {summary['p99_ms']:.3f} ms, max {summary['max_ms']:.3f} ms")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"{name}: {value}")
+        for name, value in sorted(snapshot["gauges"].items()):
+            if isinstance(value, dict):
+                value = ", ".join(f"{k} {v}" for k, v in value.items())
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+
+STATS = Stats()
+
+
+def timed(name: str):
+    """
+    Decorator recording the duration of each call in the histogram name.
+    """
+    def decorator(function: Callable):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not STATS.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                STATS.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class Profiler(object):
+    """
+    cProfile capture that can be switched on and off at runtime. It only sees the thread it was started on, which is
+    the Tk main thread inside EDMC.
+    """
+
+    def __init__(self):
+        self._profile = None  # cProfile.Profile while running, imported then because it's rarely used
+
+    @property
+    def running(self) -> bool:
+        return self._profile is not None
+
+    def start(self):
+        if self._profile is None:
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self, path: Union[str, None] = None, limit: int = 25) -> str:
+        """
+        Stop profiling and return the functions with the most cumulative time. The raw data is saved to path for
+        tools like snakeviz if it is given.
+        """
+        if self._profile is None:
+            return ""
+        import io
+        import pstats
+        profile = self._profile
+        self._profile = None
+        profile.disable()
+        if path:
+            profile.dump_stats(path)
+        output = io.StringIO()
+        pstats.Stats(profile, stream=output).sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+        return output.getvalue()
@@ -0,0 +1,541 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import sys
+import gzip
+import json
+import math
+import mmap
+import struct
+import heapq
+import bisect
+import difflib
+import shutil
+import hashlib
+import argparse
+import tempfile
+from array import array
+from typing import BinaryIO, Iterator, List, Sequence, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # EDMC doesn't ship numpy, the pure python path has to work on its own
+    numpy = None
+
+# Offline index of system names and coordinates built from the EDSM dump of systems with coordinates.
+#
+# File layout (little endian):
+#   header
+#   sorted       uint64 offset of the sorted section (version 2 and later)
+#   spatial      uint64 offset of the cell table, number of cells, offset of the cell records, float64 cell size
+#                (version 3 and later)
+#   records      one RECORD per system: float32 x, y, z, offset and length of the name in the name section
+#   names        utf-8 encoded names without separators
+#   buckets      (2 ** bucket_bits) + 1 uint64 slot numbers. Bucket b holds the slots [buckets[b], buckets[b + 1])
+#   slots        one SLOT per system sorted by name hash: uint64 hash of the normalized name, uint32 record number
+#   sorted       one uint32 record number per system sorted by normalized name
+#   cells        one CELL per cube of the grid with systems in it sorted by cell key: uint64 key, uint32 position of its
+#                first system in the cell records
+#   cell records one uint32 record number per system sorted by cell key
+#
+# A lookup hashes the name, picks the bucket using the upper bits of the hash and does a binary search within the
+# bucket. Completions do a binary search in the sorted section for the first name starting with the prefix. Either
+# way only a few pages of the memory mapped file are touched, so nothing has to be loaded up front.
+# The cell key orders the cells by x, y and then z, so the cells of a box along z are next to each other. Finding the
+# systems in a box takes a binary search per column of cells along z and reads only the systems of those cells.
+
+MAGIC = b"DCSI"
+FORMAT_VERSION = 3
+READABLE_VERSIONS = (1, 2, 3)  # version 1 has no sorted section and can't complete names, before 3 boxes scan everything
+HEADER = struct.Struct("<4sIQQQQQI")  # magic, version, count, records, names, buckets, slots offset, bucket bits
+SORTED_OFFSET = struct.Struct("<Q")
+SPATIAL = struct.Struct("<QQQd")
+RECORD = struct.Struct("<fffIH")
+COORDINATES = struct.Struct("<fff")
+CELL = struct.Struct("<QI")
+SLOT = struct.Struct("<QI")
+BUCKET = struct.Struct("<QQ")
+HASH = struct.Struct("<Q")
+UINT32 = struct.Struct("<I")
+RECORD_DTYPE = numpy.dtype([("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("name_offset", "<u4"), ("name_length", "<u2")]) if numpy is not None else None
+BUCKET_BITS = 16
+SCAN_CHUNK = 1 << 16  # records unpacked at once when scanning all records
+PARTITION_BITS = 8  # must not be bigger than BUCKET_BITS
+SORT_RUN_SIZE = 1000000  # names sorted in memory at once while building the sorted section
+CELL_SIZE = 200.0  # Ly, about the width of a route corridor
+CELL_BITS = 21  # per axis of the cell key
+CELL_BIAS = 1 << (CELL_BITS - 1)
+
+DEFAULT_FILE_NAME = "systems.dcsi"
+DEFAULT_SOURCE = "https://www.edsm.net/dump/systemsWithCoordinates.json.gz"
+
+
+def normalize_name(system_name: str) -> str:
+    return " ".join(system_name.split()).casefold()
+
+
+def name_hash(normalized_name: str) -> int:
+    return HASH.unpack(hashlib.blake2b(normalized_name.encode("utf-8"), digest_size=8).digest())[0]
+
+
+def cell_key(cx: int, cy: int, cz: int) -> int:
+    return (cx << (2 * CELL_BITS)) | (cy << CELL_BITS) | cz
+
+
+def cell_of(value: float, cell_size: float) -> int:
+    # coordinates outside of the grid end up in the cells at its border
+    return min(max(math.floor(value / cell_size) + CELL_BIAS, 0), (1 << CELL_BITS) - 1)
+
+
+def open_source(source: str) -> BinaryIO:
+    if source.startswith("http://") or source.startswith("https://"):
+        from urllib import request
+        stream = request.urlopen(source, timeout=60)
+        if source.endswith(".gz"):
+            return gzip.GzipFile(fileobj=stream)
+        return stream
+    with open(source, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    return gzip.open(source, "rb") if gzipped else open(source, "rb")
+
+
+def iter_dump(stream: BinaryIO) -> Iterator[Tuple[str, float, float, float]]:
+    """
+    Stream systems out of an EDSM dump. The dump is a JSON array with one system per line which allows parsing it line
+    by line. JSON lines files are accepted as well.
+    """
+    for line in stream:
+        line = line.strip().rstrip(b",")
+        if not line or line == b"[" or line == b"]":
+            continue
+        try:
+            system = json.loads(line)
+            coords = system["coords"]
+            yield system["name"], coords["x"], coords["y"], coords["z"]
+        except (ValueError, KeyError, TypeError):
+            continue
+
+
+class _SortedRecords(object):
+    """
+    Sequence of the normalized names in the sorted section, so bisect can search it without loading anything.
+    """
+
+    def __init__(self, index: "SystemIndex"):
+        self.index = index
+
+    def __len__(self):
+        return self.index.count
+
+    def __getitem__(self, position: int) -> str:
+        return normalize_name(self.index.get_record(self.index.sorted_record_number(position))[0])
+
+
+class _CellKeys(object):
+    """
+    Sequence of the keys in the cell table for bisect.
+    """
+
+    def __init__(self, index: "SystemIndex"):
+        self.index = index
+
+    def __len__(self):
+        return self.index.cell_count
+
+    def __getitem__(self, position: int) -> int:
+        return CELL.unpack_from(self.index._mm, self.index._cells + position * CELL.size)[0]
+
+
+def _write_sorted_run(lines: List[bytes]) -> BinaryIO:
+    lines.sort()
+    run = tempfile.TemporaryFile()
+    run.writelines(lines)
+    run.seek(0)
+    return run
+
+
+def _write_cell_run(cells: List[Tuple[int, int]]) -> BinaryIO:
+    cells.sort()
+    run = tempfile.TemporaryFile()
+    run.write(b"".join(CELL.pack(*cell) for cell in cells))
+    run.seek(0)
+    return run
+
+
+def _read_cell_run(run: BinaryIO) -> Iterator[Tuple[int, int]]:
+    while True:
+        chunk = run.read(CELL.size * SCAN_CHUNK)
+        if not chunk:
+            break
+        yield from CELL.iter_unpack(chunk)
+
+
+def _write_uint32(out: BinaryIO, values: array):
+    if sys.byteorder != "little":
+        values.byteswap()
+    out.write(values.tobytes())
+
+
+def build_index(source: str, path: str, bucket_bits: int = BUCKET_BITS, cell_size: float = CELL_SIZE) -> int:
+    """
+    Build the index from a dump at source (file path or URL) and atomically replace the file at path.
+    The dump is streamed and the hash table is sorted in partitions, so memory usage stays low even for the full
+    galaxy. Returns the number of indexed systems.
+    """
+    tmp_path = path + ".tmp"
+    partitions = [tempfile.TemporaryFile() for _ in range(1 << PARTITION_BITS)]
+    partition_shift = 64 - PARTITION_BITS
+    # For the sorted section the normalized names are sorted in runs which are merged afterwards (external merge sort).
+    # Normalized names contain neither NUL nor line breaks, so each run is a file of "name\0record number\n" lines.
+    runs: List[BinaryIO] = list()
+    run: List[bytes] = list()
+    # the cell section is sorted the same way, in runs of (cell key, record number)
+    cell_runs: List[BinaryIO] = list()
+    cell_run: List[Tuple[int, int]] = list()
+    count = 0
+    try:
+        with open_source(source) as stream, tempfile.TemporaryFile() as names, open(tmp_path, "wb") as out:
+            out.write(b"\0" * (HEADER.size + SORTED_OFFSET.size + SPATIAL.size))
+            name_offset = 0
+            for system_name, x, y, z in iter_dump(stream):
+                encoded = system_name.encode("utf-8")[:0xFFFF]
+                normalized = normalize_name(system_name)
+                h = name_hash(normalized)
+                record = RECORD.pack(x, y, z, name_offset, len(encoded))
+                out.write(record)
+                names.write(encoded)
+                partitions[h >> partition_shift].write(SLOT.pack(h, count))
+                run.append(b"%s\0%d\n" % (normalized.encode("utf-8"), count))
+                if len(run) >= SORT_RUN_SIZE:
+                    runs.append(_write_sorted_run(run))
+                    run = list()
+                # the cell of the coordinates as stored, rounding to float32 may move a system into the next cell
+                x, y, z = COORDINATES.unpack_from(record)
+                cell_run.append((cell_key(cell_of(x, cell_size), cell_of(y, cell_size), cell_of(z, cell_size)), count))
+                if len(cell_run) >= SORT_RUN_SIZE:
+                    cell_runs.append(_write_cell_run(cell_run))
+                    cell_run = list()
+                name_offset += len(encoded)
+                count += 1
+            if run:
+                runs.append(_write_sorted_run(run))
+                run = list()
+            if cell_run:
+                cell_runs.append(_write_cell_run(cell_run))
+                cell_run = list()
+
+            names_offset = out.tell()
+            names.seek(0)
+            shutil.copyfileobj(names, out)
+            buckets_offset = out.tell() + (-out.tell() % 8)
+            slots_offset = buckets_offset + ((1 << bucket_bits) + 1) * 8
+
+            bucket_shift = 64 - bucket_bits
+            bucket_counts = array("Q", bytes(8 * (1 << bucket_bits)))
+            out.seek(slots_offset)
+            for partition in partitions:
+                partition.seek(0)
+                slots = sorted(SLOT.iter_unpack(partition.read()))
+                for h, _ in slots:
+                    bucket_counts[h >> bucket_shift] += 1
+                out.write(b"".join(SLOT.pack(*slot) for slot in slots))
+                partition.close()
+
+            sorted_offset = out.tell()  # slots are 12 bytes and start 8 byte aligned, so this is 4 byte aligned
+            record_numbers = array("I")
+            for line in heapq.merge(*runs):
+                record_numbers.append(int(line[line.rindex(b"\0") + 1:]))
+                if len(record_numbers) >= SORT_RUN_SIZE:
+                    _write_uint32(out, record_numbers)
+                    record_numbers = array("I")
+            _write_uint32(out, record_numbers)
+
+            # the cell table is collected while writing the cell records and appended after them
+            cell_records_offset = out.tell()
+            cell_count = 0
+            with tempfile.TemporaryFile() as cells:
+                record_numbers = array("I")
+                previous_key = -1
+                for position, (key, record_number) in enumerate(heapq.merge(*(_read_cell_run(cell_run) for cell_run in cell_runs))):
+                    if key != previous_key:
+                        cells.write(CELL.pack(key, position))
+                        cell_count += 1
+                        previous_key = key
+                    record_numbers.append(record_number)
+                    if len(record_numbers) >= SORT_RUN_SIZE:
+                        _write_uint32(out, record_numbers)
+                        record_numbers = array("I")
+                _write_uint32(out, record_numbers)
+                cells_offset = out.tell()
+                cells.seek(0)
+                shutil.copyfileobj(cells, out)
+
+            buckets = array("Q", [0])
+            for bucket_count in bucket_counts:
+                buckets.append(buckets[-1] + bucket_count)
+            if sys.byteorder != "little":
+                buckets.byteswap()
+            out.seek(buckets_offset)
+            out.write(buckets.tobytes())
+
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, FORMAT_VERSION, count, HEADER.size + SORTED_OFFSET.size + SPATIAL.size, names_offset, buckets_offset, slots_offset, bucket_bits))
+            out.write(SORTED_OFFSET.pack(sorted_offset))
+            out.write(SPATIAL.pack(cells_offset, cell_count, cell_records_offset, cell_size))
+        os.replace(tmp_path, path)
+    finally:
+        for partition in partitions:
+            partition.close()
+        for sorted_run in runs + cell_runs:
+            sorted_run.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+class SystemIndex(object):
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self._records, self._names, self._buckets, self._slots, bucket_bits = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version not in READABLE_VERSIONS:
+            self._mm.close()
+            raise ValueError(f"{path} is not a system index of version {FORMAT_VERSION}")
+        self._bucket_shift = 64 - bucket_bits
+        self._sorted = SORTED_OFFSET.unpack_from(self._mm, HEADER.size)[0] if version >= 2 else 0
+        self._sorted_records = _SortedRecords(self)
+        if version >= 3:
+            self._cells, self.cell_count, self._cell_records, self.cell_size = SPATIAL.unpack_from(self._mm, HEADER.size + SORTED_OFFSET.size)
+        else:
+            self._cells, self.cell_count, self._cell_records, self.cell_size = 0, 0, 0, 0.0
+        self._cell_keys = _CellKeys(self)
+
+    @property
+    def can_complete(self) -> bool:
+        return self._sorted != 0
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, system_name: str):
+        return self.lookup(system_name) is not None
+
+    def close(self):
+        self._mm.close()
+
+    def get_record(self, record_number: int) -> Tuple[str, float, float, float]:
+        x, y, z, name_offset, name_length = RECORD.unpack_from(self._mm, self._records + record_number * RECORD.size)
+        start = self._names + name_offset
+        return self._mm[start:start + name_length].decode("utf-8"), x, y, z
+
+    def records_in_box(self, lower: Sequence[float], upper: Sequence[float]) -> Iterator[Tuple[str, float, float, float]]:
+        """
+        (name, x, y, z) of all systems with lower <= coordinates <= upper. Only the systems in the cells the box
+        touches are read. Indexes of older versions have no cells, all records are read then.
+        """
+        if not self.cell_size:
+            yield from self._scan_box(lower, upper)
+            return
+        size = self.cell_size
+        (cx0, cy0, cz0), (cx1, cy1, cz1) = [[cell_of(value, size) for value in corner] for corner in (lower, upper)]
+        if cx0 > cx1 or cy0 > cy1 or cz0 > cz1:
+            return
+        first = bisect.bisect_left(self._cell_keys, cell_key(cx0, cy0, cz0))
+        last = bisect.bisect_left(self._cell_keys, cell_key(cx1, cy1, cz1) + 1, first)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) * max(self.cell_count, 1).bit_length() > last - first:
+            # a huge box, reading the table is faster than searching it for each column
+            yield from self._records_in_table(first, last, (cx0, cy0, cz0), (cx1, cy1, cz1), lower, upper)
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                first = bisect.bisect_left(self._cell_keys, cell_key(cx, cy, cz0), first)
+                column_end = bisect.bisect_left(self._cell_keys, cell_key(cx, cy, cz1) + 1, first, last)
+                if first < column_end:
+                    yield from self._records_in_cells(self._cell_position(first), self._cell_position(column_end), lower, upper)
+                first = column_end
+
+    def _records_in_table(self, first: int, last: int, low: Sequence[int], high: Sequence[int], lower: Sequence[float],
+                          upper: Sequence[float]) -> Iterator[Tuple[str, float, float, float]]:
+        # the cells between first and last which are inside of the cells from low to high, adjacent ones read at once
+        (cx0, cy0, cz0), (cx1, cy1, cz1) = low, high
+        mask = (1 << CELL_BITS) - 1
+        start = None
+        table = self._mm[self._cells + first * CELL.size:self._cells + last * CELL.size]
+        for key, position in CELL.iter_unpack(table):
+            cx, cy, cz = key >> (2 * CELL_BITS), (key >> CELL_BITS) & mask, key & mask
+            if cx0 <= cx <= cx1 and cy0 <= cy <= cy1 and cz0 <= cz <= cz1:
+                if start is None:
+                    start = position
+            elif start is not None:
+                yield from self._records_in_cells(start, position, lower, upper)
+                start = None
+        if start is not None:
+            yield from self._records_in_cells(start, self._cell_position(last), lower, upper)
+
+    def _cell_position(self, cell_number: int) -> int:
+        if cell_number >= self.cell_count:
+            return self.count
+        return CELL.unpack_from(self._mm, self._cells + cell_number * CELL.size)[1]
+
+    def _records_in_cells(self, start: int, end: int, lower: Sequence[float], upper: Sequence[float]) -> Iterator[Tuple[str, float, float, float]]:
+        (x0, y0, z0), (x1, y1, z1) = lower, upper
+        offset = self._cell_records + start * UINT32.size
+        if numpy is not None:
+            record_numbers = numpy.frombuffer(self._mm, dtype="<u4", count=end - start, offset=offset)
+            records = numpy.frombuffer(self._mm, dtype=RECORD_DTYPE, count=self.count, offset=self._records)[record_numbers]
+            x, y, z = records["x"], records["y"], records["z"]
+            for record_number in record_numbers[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1) & (z >= z0) & (z <= z1)]:
+                yield self.get_record(int(record_number))
+            return
+        record_numbers = array("I", self._mm[offset:offset + (end - start) * UINT32.size])
+        if sys.byteorder != "little":
+            record_numbers.byteswap()
+        mm, records = self._mm, self._records
+        for record_number in record_numbers:
+            x, y, z = COORDINATES.unpack_from(mm, records + record_number * RECORD.size)
+            if x0 <= x <= x1 and y0 <= y <= y1 and z0 <= z <= z1:
+                yield self.get_record(record_number)
+
+    def _scan_box(self, lower: Sequence[float], upper: Sequence[float]) -> Iterator[Tuple[str, float, float, float]]:
+        # all records, with numpy they are filtered a lot faster
+        (x0, y0, z0), (x1, y1, z1) = lower, upper
+        for start in range(0, self.count, SCAN_CHUNK):
+            chunk = min(SCAN_CHUNK, self.count - start)
+            offset = self._records + start * RECORD.size
+            if numpy is not None:
+                records = numpy.frombuffer(self._mm, dtype=RECORD_DTYPE, count=chunk, offset=offset)
+                x, y, z = records["x"], records["y"], records["z"]
+                matches = numpy.nonzero((x >= x0) & (x <= x1) & (y >= y0) & (y <= y1) & (z >= z0) & (z <= z1))[0]
+                for record_number in matches:
+                    yield self.get_record(start + int(record_number))
+            else:
+                for i, (x, y, z, _, _) in enumerate(RECORD.iter_unpack(self._mm[offset:offset + chunk * RECORD.size])):
+                    if x0 <= x <= x1 and y0 <= y <= y1 and z0 <= z <= z1:
+                        yield self.get_record(start + i)
+
+    def sorted_record_number(self, position: int) -> int:
+        return UINT32.unpack_from(self._mm, self._sorted + position * UINT32.size)[0]
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, float, float, float]]:
+        """
+        Returns (name, x, y, z) of up to limit systems whose name starts with prefix (case insensitive), sorted by name.
+        """
+        key = normalize_name(prefix)
+        if not self.can_complete or not key:
+            return list()
+        result = list()
+        position = bisect.bisect_left(self._sorted_records, key)
+        while position < self.count and len(result) < limit:
+            record = self.get_record(self.sorted_record_number(position))
+            if not normalize_name(record[0]).startswith(key):
+                break
+            result.append(record)
+            position += 1
+        return result
+
+    def suggest(self, text: str, limit: int = 10, cutoff: float = 0.75) -> List[Tuple[str, float, float, float]]:
+        """
+        Names similar to text for when there is no completion, e.g. because of a typo. Only names sorted close to text
+        or to shorter prefixes of it are considered, so typos near the start of a name are not corrected.
+        """
+        key = normalize_name(text)
+        if not self.can_complete or not key:
+            return list()
+        candidates = dict()
+        position = bisect.bisect_left(self._sorted_records, key)
+        for neighbour in range(max(position - limit, 0), min(position + limit, self.count)):
+            record = self.get_record(self.sorted_record_number(neighbour))
+            candidates[normalize_name(record[0])] = record
+        for length in range(len(key) - 1, max(len(key) - 5, 0), -1):
+            for record in self.complete(key[:length], limit * 5):
+                candidates[normalize_name(record[0])] = record
+        return [candidates[name] for name in difflib.get_close_matches(key, list(candidates), limit, cutoff)]
+
+    def lookup(self, system_name: str) -> Union[Tuple[str, float, float, float], None]:
+        """
+        Returns (name, x, y, z) of the system with the given name (case insensitive) or None if it isn't indexed.
+        """
+        key = normalize_name(system_name)
+        h = name_hash(key)
+        mm = self._mm
+        lo, hi = BUCKET.unpack_from(mm, self._buckets + (h >> self._bucket_shift) * 8)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if HASH.unpack_from(mm, self._slots + mid * SLOT.size)[0] < h:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self.count:
+            slot_hash, record_number = SLOT.unpack_from(mm, self._slots + lo * SLOT.size)
+            if slot_hash != h:
+                break
+            record = self.get_record(record_number)
+            if normalize_name(record[0]) == key:
+                return record
+            lo += 1
+        return None
+
+
+def main(argv=None):
+    default_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), DEFAULT_FILE_NAME)
+    parser = argparse.ArgumentParser(prog="python -m distcalc.systemindex", description="Build or query the offline system index of DistanceCalc.")
+    parser.add_argument("--index", default=default_path, help=f"path of the index file (default: {default_path})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build or refresh the index from an EDSM dump")
+    build.add_argument("source", nargs="?", default=DEFAULT_SOURCE, help=f"dump file or URL, optionally gzipped (default: {DEFAULT_SOURCE})")
+    lookup = commands.add_parser("lookup", help="look up system names")
+    lookup.add_argument("names", nargs="+")
+    complete = commands.add_parser("complete", help="list systems starting with a prefix or similar names if there are none")
+    complete.add_argument("prefix")
+    complete.add_argument("--limit", type=int, default=10, help="maximum number of systems (default: 10)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_index(args.source, args.index)
+        print(f"Indexed {count} systems into {args.index}")
+        return 0
+
+    index = SystemIndex(args.index)
+    try:
+        if args.command == "complete":
+            if not index.can_complete:
+                print(f"{args.index} was built by an older version, build it again to complete names")
+                return 1
+            results = index.complete(args.prefix, args.limit) or index.suggest(args.prefix, args.limit)
+            for result in results:
+                print("{0}: {1} / {2} / {3}".format(*result))
+            return 0 if results else 1
+
+        status = 0
+        for system_name in args.names:
+            result = index.lookup(system_name)
+            if result:
+                print("{0}: {1} / {2} / {3}".format(*result))
+            else:
+                print(f"{system_name}: not found")
+                status = 1
+        return status
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
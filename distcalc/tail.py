@@ -0,0 +1,391 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import errno
+import select
+import struct
+import logging
+import argparse
+from typing import Dict, Iterator, List, Union
+
+from distcalc.backfill import JOURNAL_PATTERN
+from distcalc.core import DistanceCore, MemoryConfig
+from distcalc.history import JumpHistory
+from distcalc.targetstore import TargetStore, DEFAULT_FILE_NAME as TARGET_STORE_FILE_NAME
+
+logger = logging.getLogger(__name__)
+
+# Follows the journal of the game without EDMC, e.g. on a machine without a display:
+#     python -m distcalc.tail --journal-dir <folder with the journals>
+
+POLL_INTERVAL = 0.01  # seconds, right after the game wrote something
+MAX_POLL_INTERVAL = 0.08  # seconds, while the game is quiet. Stays below 100 ms from a write to the distances
+SAVE_INTERVAL = 5.0  # seconds between saving the position in the journal while the travelled distance doesn't change
+DEFAULT_STATE_FILE_NAME = "tail.json"
+JOURNAL_KEY = "DistanceCalc_tail_journal"
+OFFSET_KEY = "DistanceCalc_tail_offset"
+
+
+class FileConfig(MemoryConfig):
+    """
+    Config stored in a JSON file, instead of EDMC's config when running on our own.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self.dirty = False
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            logger.exception(f"Could not read {path}, starting over")
+
+    def set(self, key: str, value: Union[int, str]):
+        if self.get(key) != value:
+            super().set(key, value)
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except OSError:
+            logger.exception(f"Could not write {self.path}")
+
+
+class Inotify(object):
+    """
+    Changes in a folder from Linux' inotify, through ctypes so nothing has to be installed. Raises OSError if inotify
+    isn't available.
+    """
+    IN_MODIFY = 0x2
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    EVENT = struct.Struct("iIII")  # watch descriptor, mask, cookie, length of the name that follows
+
+    def __init__(self, path: str):
+        import ctypes
+        import ctypes.util
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+        except (OSError, AttributeError):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self.fd = init(Inotify.IN_NONBLOCK | Inotify.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if add_watch(self.fd, os.fsencode(path), Inotify.IN_MODIFY | Inotify.IN_CREATE | Inotify.IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Could not watch {path}")
+
+    def wait(self, timeout: Union[float, None]) -> Union[int, None]:
+        """
+        Wait for changes. Returns the combined mask of all events so far or None on timeout.
+        """
+        readable, _, _ = select.select((self.fd,), (), (), timeout)
+        if not readable:
+            return None
+        mask = 0
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return mask
+            position = 0
+            while position + Inotify.EVENT.size <= len(data):
+                _, event_mask, _, length = Inotify.EVENT.unpack_from(data, position)
+                mask |= event_mask
+                position += Inotify.EVENT.size + length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class JournalTail(object):
+    """
+    New lines of the newest journal. Only the bytes after offset are read, an incomplete last line is kept until the
+    game has written the rest of it. When the game starts a new journal, the rest of the current one is read before
+    switching over.
+    Waiting for the game uses inotify if possible and polls otherwise: every POLL_INTERVAL right after a change, slowing
+    down to MAX_POLL_INTERVAL while nothing happens.
+    """
+
+    def __init__(self, journal_dir: str, journal: Union[str, None] = None, offset: int = 0, use_inotify: bool = True,
+                 poll_interval: float = POLL_INTERVAL, max_poll_interval: float = MAX_POLL_INTERVAL):
+        self.journal_dir = journal_dir
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.journal: Union[str, None] = None  # file name of the journal that is followed
+        self.offset = 0  # after the last complete line
+        self.rotations = 0
+        self._file = None
+        self._partial = b""
+        self._interval = poll_interval
+        self._directory_changed = True
+        self._directory_mtime = None
+        self.inotify: Union[Inotify, None] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self.inotify = Inotify(journal_dir)
+            except OSError as e:
+                logger.warning(f"Polling {journal_dir} because inotify isn't available: {e}")
+        if journal and os.path.isfile(os.path.join(journal_dir, journal)):
+            self._open(journal, offset)
+
+    def newest_journal(self) -> Union[str, None]:
+        newest = None
+        for path in glob.glob(os.path.join(self.journal_dir, JOURNAL_PATTERN)):
+            try:
+                key = (os.path.getmtime(path), os.path.basename(path))
+            except OSError:  # deleted in the meantime
+                continue
+            if newest is None or key > newest:
+                newest = key
+        return newest[1] if newest else None
+
+    def _open(self, journal: str, offset: int):
+        if self._file:
+            self._file.close()
+        self._file = open(os.path.join(self.journal_dir, journal), "rb", buffering=0)
+        self._file.seek(offset)
+        self.journal = journal
+        self.offset = offset
+        self._partial = b""
+
+    def _read_current(self) -> List[Dict]:
+        if self._file is None:
+            return list()
+        if os.fstat(self._file.fileno()).st_size < self.offset + len(self._partial):
+            logger.warning(f"{self.journal} got shorter, reading it again from the start")
+            self._open(self.journal, 0)
+        data = self._file.read()
+        if not data:
+            return list()
+        data = self._partial + data
+        end = data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        entries = list()
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Skipping broken line in {self.journal}: {line[:100]}")
+        self.offset += end
+        return entries
+
+    def _check_directory(self) -> bool:
+        if self.inotify is None:
+            # a new file changes the modification time of the folder, that's one stat instead of listing the folder
+            try:
+                mtime = os.stat(self.journal_dir).st_mtime_ns
+            except OSError:
+                return False
+            if mtime != self._directory_mtime:
+                self._directory_mtime = mtime
+                self._directory_changed = True
+        changed = self._directory_changed
+        self._directory_changed = False
+        return changed
+
+    def read(self) -> List[Dict]:
+        """
+        Journal entries written since the last call.
+        """
+        entries = self._read_current()
+        if self._check_directory():
+            newest = self.newest_journal()
+            if newest is not None and newest != self.journal:
+                entries.extend(self._read_current())  # the rest of the old one
+                if self.journal is not None:
+                    self.rotations += 1
+                    logger.info(f"Following {newest} instead of {self.journal}")
+                self._open(newest, 0)
+                entries.extend(self._read_current())
+        return entries
+
+    def wait(self, timeout: Union[float, None] = None):
+        """
+        Sleep until the journals might have changed or timeout seconds have passed.
+        """
+        if self.inotify is not None:
+            mask = self.inotify.wait(timeout)
+            if mask and mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO):
+                self._directory_changed = True
+            return
+        time.sleep(self._interval if timeout is None else min(self._interval, timeout))
+
+    def entries(self, stop_after: Union[float, None] = None) -> Iterator[List[Dict]]:
+        """
+        Batches of new journal entries, forever or until stop_after seconds have passed.
+        """
+        end = None if stop_after is None else time.monotonic() + stop_after
+        while end is None or time.monotonic() < end:
+            entries = self.read()
+            if entries:
+                self._interval = self.poll_interval
+                yield entries
+            else:
+                self._interval = min(self._interval * 2, self.max_poll_interval)
+                yield entries  # give the caller a chance to do its periodic work
+                self.wait(SAVE_INTERVAL if end is None else max(0.0, min(SAVE_INTERVAL, end - time.monotonic())))
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        if self.inotify:
+            self.inotify.close()
+            self.inotify = None
+
+
+def default_journal_dir() -> Union[str, None]:
+    if sys.platform == "win32" and os.environ.get("USERPROFILE"):
+        return os.path.join(os.environ["USERPROFILE"], "Saved Games", "Frontier Developments", "Elite Dangerous")
+    return None
+
+
+def format_distances(core: DistanceCore) -> str:
+    lines = list()
+    for system_name, distance in core.get_displayed_targets():
+        lines.append(f"    {system_name}: {'?' if distance is None else f'{distance:.2f}'} Ly")
+    if core.navroute.active:
+        lines.append(f"    Route: {core.navroute.remaining_distance:.2f} Ly, {core.navroute.jumps_left} jumps")
+    if core.travelled_total_enabled:
+        lines.append(f"    Travelled (total): {core.distance_total:.2f} Ly")
+    if core.travelled_session_enabled:
+        lines.append(f"    Travelled (session): {core.distance_session:.2f} Ly")
+    return "\n".join(lines)
+
+
+def save_state(config: FileConfig, core: DistanceCore, tail: JournalTail):
+    """
+    Write the position in the journal together with the travelled total, in one replace of the state file. After a crash
+    both are from the same point of the journal, no jump is counted twice.
+    """
+    core.travelled.flush()
+    config.set(JOURNAL_KEY, tail.journal or "")
+    config.set(OFFSET_KEY, tail.offset)
+    config.save()
+
+
+def catch_up(core: DistanceCore, entries: List[Dict]):
+    """
+    Take the position, route and ship from the journal the game is writing right now, without counting its jumps. They
+    were made before the tail was started for the first time.
+    """
+    for entry in entries:
+        if "event" in entry:
+            entry.pop("JumpDist", None)
+            core.journal_entry(entry)
+    core.alerts = list()
+
+
+def main(argv=None):
+    plugin_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    journal_dir = default_journal_dir()
+    parser = argparse.ArgumentParser(prog="python -m distcalc.tail", description="Follow the journal of the game and show the distances without EDMC.")
+    parser.add_argument("--journal-dir", default=journal_dir, required=journal_dir is None,
+                        help="folder containing the journal files" + (f" (default: {journal_dir})" if journal_dir else ""))
+    parser.add_argument("--plugin-dir", default=plugin_dir, help=f"folder with the targets of the plugin (default: {plugin_dir})")
+    parser.add_argument("--state", default=None, help=f"file for the position in the journal and the travelled distance (default: {DEFAULT_STATE_FILE_NAME} in the plugin folder)")
+    parser.add_argument("--publish", action="store_true", help="publish the distances to the snapshot file of the plugin for overlays")
+    parser.add_argument("--port", type=int, default=0, help="notify readers of the snapshot on this port (default: don't)")
+    parser.add_argument("--alerts", default=None, help="alert when getting within the radius of the points of interest in this CSV or JSON file")
+    parser.add_argument("--alert-radius", type=float, default=20.0, help="radius of the points of interest without a radius column in Ly (default: 20)")
+    parser.add_argument("--replay", action="store_true", help="on the first start, add the jumps in the newest journal to the travelled distance (default: start at its end)")
+    parser.add_argument("--poll", action="store_true", help="poll the journals even if inotify is available")
+    parser.add_argument("--quiet", action="store_true", help="don't print the distances")
+    parser.add_argument("--for", dest="seconds", type=float, default=None, help="stop after this many seconds (default: run until interrupted)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    config = FileConfig(args.state or os.path.join(args.plugin_dir, DEFAULT_STATE_FILE_NAME))
+    if not config:
+        config.set("DistanceCalc_options", 0b011)  # total and session distance, like the plugin after installing it
+    core = DistanceCore(config, None, journal_dir=args.journal_dir,  # the travelled total is saved with the offset, see save_state
+                        history=JumpHistory(None), target_store=TargetStore(os.path.join(args.plugin_dir, TARGET_STORE_FILE_NAME)))
+    if args.alerts:
+        from distcalc.proximity import load_points_of_interest
+        core.set_points_of_interest(load_points_of_interest(args.alerts, args.alert_radius))
+    writer = None
+    if args.publish:
+        from distcalc.publish import CAPACITY, SNAPSHOT_FILE_NAME, SnapshotWriter
+        writer = SnapshotWriter(os.path.join(args.plugin_dir, SNAPSHOT_FILE_NAME), port=args.port)
+    first_start = not config.get_str(JOURNAL_KEY)
+    tail = JournalTail(args.journal_dir, config.get_str(JOURNAL_KEY), config.get_int(OFFSET_KEY), use_inotify=not args.poll)
+    logger.info(f"Following the journals in {args.journal_dir} {'with inotify' if tail.inotify else 'by polling'}")
+    if first_start and not args.replay:
+        catch_up(core, tail.read())
+        save_state(config, core, tail)
+    last_save = time.monotonic()
+    try:
+        for entries in tail.entries(args.seconds):
+            changed = False
+            travelled = core.distance_total
+            alerts = list()
+            for entry in entries:
+                if "event" in entry:
+                    changed = core.journal_entry(entry) or changed
+                    alerts.extend(core.alerts)
+                    core.alerts = list()
+            if changed:
+                if writer:
+                    writer.publish(core.coordinates, core.get_displayed_targets(CAPACITY),
+                                   core.distance_total if core.travelled_total_enabled else None,
+                                   core.distance_session if core.travelled_session_enabled else None)
+                if not args.quiet:
+                    position = "unknown" if core.coordinates is None else " / ".join(f"{c:.2f}" for c in core.coordinates)
+                    print(f"{time.strftime('%H:%M:%S')} {core.commander or 'Commander'} at {position}\n{format_distances(core)}", flush=True)
+                    for alert in alerts:
+                        print(f"    Alert: {alert.distance:.2f} Ly to {alert.name}" if alert.entered else f"    Alert: left {alert.name}", flush=True)
+            if core.distance_total != travelled or time.monotonic() - last_save >= SAVE_INTERVAL:
+                last_save = time.monotonic()
+                save_state(config, core, tail)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        save_state(config, core, tail)
+        tail.close()
+        core.close()
+        if writer:
+            writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
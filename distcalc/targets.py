@@ -0,0 +1,239 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import csv
+import json
+import math
+from array import array
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+try:
+    import numpy
+except ImportError:  # EDMC doesn't ship numpy, the pure python path has to work on its own
+    numpy = None
+
+
+class TargetList(object):
+    """
+    Names and coordinates of all targets. The coordinates are kept in one contiguous array (x0, y0, z0, x1, ...) so the
+    distances to all targets are calculated in a single pass.
+    """
+
+    def __init__(self, targets: Iterable[Dict] = ()):
+        self.names: List[str] = list()
+        self._coordinates = array("d")
+        self._matrix = None  # numpy copy of the coordinates, created on first use after a change
+        self.extend(targets)
+
+    def __len__(self):
+        return len(self.names)
+
+    def append(self, system_name: str, x: float, y: float, z: float):
+        self.names.append(system_name)
+        self._coordinates.extend((x, y, z))
+        self._matrix = None
+
+    def extend(self, targets: Iterable[Dict]):
+        for target in targets:
+            self.append(target["system"], target["x"], target["y"], target["z"])
+
+    def clear(self):
+        self.names = list()
+        self._coordinates = array("d")
+        self._matrix = None
+
+    def get_coordinates(self, index: int) -> Tuple[float, float, float]:
+        return self._coordinates[index * 3], self._coordinates[index * 3 + 1], self._coordinates[index * 3 + 2]
+
+    def distances(self, x: float, y: float, z: float) -> Sequence[float]:
+        """
+        Distances from (x, y, z) to all targets in the order they were added.
+        """
+        if numpy is not None:
+            if self._matrix is None:
+                self._matrix = numpy.array(self._coordinates, dtype=numpy.float64).reshape(-1, 3)
+            delta = self._matrix - (x, y, z)
+            return numpy.sqrt(numpy.einsum("ij,ij->i", delta, delta))
+
+        hypot = math.hypot
+        it = iter(self._coordinates)
+        return [hypot(a - x, b - y, c - z) for a, b, c in zip(it, it, it)]
+
+
+def has_coordinates(target: Dict) -> bool:
+    return target["x"] is not None and target["y"] is not None and target["z"] is not None
+
+
+class TargetEditor(object):
+    """
+    The targets while the settings are open. Every target gets a number that stays the same while targets are moved,
+    removed or filtered, so the list in the settings refers to targets by number instead of by position. Targets
+    without coordinates (x, y or z is None) are kept until they are looked up or all coordinates are entered.
+    """
+
+    def __init__(self, targets: Iterable[Dict] = ()):
+        self.targets: Dict[int, Dict] = dict()
+        self.order: List[int] = list()  # numbers of all targets in the order of the settings
+        self.visible: List[int] = list()  # numbers of the targets matching the filter, in the same order
+        self.filter_text = ""
+        self._keys: Dict[int, str] = dict()  # number -> lower case name for filtering
+        self._next_number = 0
+        self.extend(targets)
+
+    def __len__(self):
+        return len(self.order)
+
+    def extend(self, targets: Iterable[Dict]) -> List[int]:
+        numbers = list()
+        for target in targets:
+            number = self._next_number
+            self._next_number += 1
+            self.targets[number] = {"system": target["system"], "x": target["x"], "y": target["y"], "z": target["z"]}
+            self._keys[number] = target["system"].lower()
+            self.order.append(number)
+            numbers.append(number)
+        if numbers:
+            self._refilter()
+        return numbers
+
+    def set_filter(self, text: str):
+        text = text.strip().lower()
+        if text.startswith(self.filter_text):
+            # typing narrows the filter, only the targets that matched so far can match
+            keys = self._keys
+            self.visible = [number for number in self.visible if text in keys[number]]
+            self.filter_text = text
+        else:
+            self.filter_text = text
+            self._refilter()
+
+    def _refilter(self):
+        if not self.filter_text:
+            self.visible = list(self.order)
+        else:
+            text = self.filter_text
+            keys = self._keys
+            self.visible = [number for number in self.order if text in keys[number]]
+
+    def update(self, number: int, key: str, value: Union[str, float, None]):
+        self.targets[number][key] = value
+        if key == "system":
+            self._keys[number] = value.lower()
+            if self.filter_text:
+                self._refilter()
+
+    def remove(self, numbers: Iterable[int]):
+        numbers = set(numbers)
+        for number in numbers:
+            self.targets.pop(number, None)
+            self._keys.pop(number, None)
+        self.order = [number for number in self.order if number not in numbers]
+        self.visible = [number for number in self.visible if number not in numbers]
+
+    def move(self, numbers: Sequence[int], target: int, after: bool = False) -> bool:
+        """
+        Move the targets numbers, keeping their order, in front of target or after it. Returns False if target is one of
+        them.
+        """
+        moved = set(numbers)
+        if target in moved or target not in self.targets:
+            return False
+        block = [number for number in self.order if number in moved]
+        order = [number for number in self.order if number not in moved]
+        index = order.index(target) + (1 if after else 0)
+        order[index:index] = block
+        self.order = order
+        self._refilter()
+        return True
+
+    def position(self, number: int) -> int:
+        return self.order.index(number)
+
+    def unresolved(self) -> Dict[int, str]:
+        """
+        Number -> name of the targets without coordinates.
+        """
+        return dict((number, target["system"]) for number, target in self.targets.items() if not has_coordinates(target))
+
+    def get_targets(self) -> List[Dict]:
+        """
+        All targets in the order of the settings, the ones without coordinates as well.
+        """
+        return [dict(self.targets[number]) for number in self.order]
+
+
+def parse_number(value: Union[str, int, float]) -> float:
+    if isinstance(value, str):
+        return float(value.strip().replace(",", "."))
+    return float(value)
+
+
+def target_from_dict(data: Dict) -> Dict:
+    """
+    Accepts the format used by the plugin ({"system", "x", "y", "z"}) as well as EDSM's format ({"name", "coords"}).
+    If there are no coordinates at all, x, y and z are None.
+    """
+    system_name = data.get("system") or data.get("name") or data.get("systemName") or data.get("systemname")
+    coords = data.get("coords", data)
+    if all(coords.get(axis) in (None, "") for axis in "xyz"):
+        return {"system": str(system_name).strip(), "x": None, "y": None, "z": None}
+    return {
+        "system": str(system_name).strip(),
+        "x": parse_number(coords["x"]),
+        "y": parse_number(coords["y"]),
+        "z": parse_number(coords["z"])
+    }
+
+
+def read_rows(path: str) -> List[Dict]:
+    """
+    The entries of a JSON or CSV file as dicts, with lower case keys for CSV files.
+    """
+    if os.path.splitext(path)[1].lower() == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            rows = json.load(f)
+        if isinstance(rows, dict):
+            rows = rows.get("systems") or rows.get("targets") or list()
+    else:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            try:
+                dialect = csv.Sniffer().sniff(f.read(4096), delimiters=",;\t")
+            except csv.Error:  # a single column of names
+                dialect = csv.excel
+            f.seek(0)
+            rows = [{key.strip().lower(): value for key, value in row.items() if key} for row in csv.DictReader(f, dialect=dialect)]
+    return rows
+
+
+def load_targets(path: str) -> List[Dict]:
+    """
+    Read a list of targets from a JSON or CSV file. CSV files need a header with a system (or name) column and
+    optionally x, y, z columns. Entries without any coordinates are returned with None as x, y and z so they can be
+    looked up. Entries that can't be parsed are skipped.
+    """
+    targets = list()
+    for row in read_rows(path):
+        try:
+            target = target_from_dict(row)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue
+        if target["system"]:
+            targets.append(target)
+    return targets
@@ -0,0 +1,180 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import os
+import sys
+import math
+import mmap
+import struct
+import logging
+from array import array
+from typing import Dict, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# The targets in a file next to the plugin instead of a JSON string in EDMC's config (little endian):
+#
+#     header: magic "DCTG", version (H), flags (H, 0), number of targets (I), size of the string table (I)
+#     coordinates: x, y, z (d) of each target, NaN if unknown
+#     name ends: end of each name in the string table (I)
+#     string table: the names, UTF-8
+#
+# The coordinates have a fixed place, so changing only coordinates writes just those in place. Everything else
+# writes a new file and renames it over the old one.
+
+DEFAULT_FILE_NAME = "targets.bin"
+CORRUPT_SUFFIX = ".corrupt"  # unreadable files are renamed to this, so saving doesn't overwrite them
+MAGIC = b"DCTG"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHII")
+CHUNK = 3 * 256  # coordinates compared at once to find the changed targets
+
+
+class TargetStore(object):
+    def __init__(self, path: str):
+        self.path = path
+        self.names: List[str] = list()  # as last loaded or saved, to find out what changed
+        self.coordinates = array("d")
+        self.writes_in_place = 0
+        self.rewrites = 0
+        self.unreadable = False  # the file couldn't be read nor moved aside, saving would overwrite the targets in it
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> List[Dict]:
+        """
+        Targets in the format of the config ({"system", "x", "y", "z"}), unknown coordinates are None. Returns an empty
+        list if there is no file or it can't be read. A file that can't be read is renamed to end with CORRUPT_SUFFIX.
+        """
+        self.names = list()
+        self.coordinates = array("d")
+        self.unreadable = False
+        try:
+            with open(self.path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    names, coordinates = self._parse(data)
+        except FileNotFoundError:
+            return list()
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            logger.exception(f"Could not read the targets from {self.path}")
+            self._move_aside()
+            return list()
+        self.names = names
+        self.coordinates = coordinates
+        it = iter(coordinates)
+        if coordinates != coordinates:  # only NaN isn't equal to itself
+            it = (None if value != value else value for value in coordinates)
+        return [{"system": name, "x": x, "y": y, "z": z} for name, x, y, z in zip(names, it, it, it)]
+
+    def _move_aside(self):
+        try:
+            os.replace(self.path, self.path + CORRUPT_SUFFIX)
+            logger.warning(f"Moved the unreadable targets to {self.path + CORRUPT_SUFFIX}")
+        except OSError:
+            logger.exception(f"Could not move {self.path} aside, the targets won't be saved to it")
+            self.unreadable = True
+
+    def _parse(self, data: mmap.mmap):
+        magic, version, _, count, names_size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a target file of version {FORMAT_VERSION}")
+        coordinates_end = HEADER.size + count * 24
+        ends_end = coordinates_end + count * 4
+        if len(data) < ends_end + names_size:
+            raise ValueError(f"{self.path} is truncated")
+        coordinates = array("d")
+        coordinates.frombytes(data[HEADER.size:coordinates_end])
+        ends = array("I")
+        ends.frombytes(data[coordinates_end:ends_end])
+        if sys.byteorder == "big":
+            coordinates.byteswap()
+            ends.byteswap()
+        table = data[ends_end:ends_end + names_size]
+        names = list()
+        start = 0
+        for end in ends:
+            names.append(table[start:end].decode("utf-8"))
+            start = end
+        return names, coordinates
+
+    def save(self, targets: Sequence[Dict]) -> bool:
+        """
+        Store the targets. Returns False if they couldn't be written or the file couldn't be read and is still there.
+        """
+        if self.unreadable:
+            return False
+        names = [target["system"] for target in targets]
+        values = [value for target in targets for value in (target["x"], target["y"], target["z"])]
+        try:
+            coordinates = array("d", values)
+        except TypeError:  # some are unknown
+            coordinates = array("d", [math.nan if value is None else value for value in values])
+        try:
+            if names == self.names and self.exists():
+                self._write_coordinates(coordinates)
+            else:
+                self._write_file(names, coordinates)
+        except OSError:
+            logger.exception(f"Could not write the targets to {self.path}")
+            return False
+        self.names = names
+        self.coordinates = coordinates
+        return True
+
+    def _write_coordinates(self, coordinates: array):
+        # only the coordinates that changed, each target is 24 bytes
+        # compared as bytes, NaN of unknown coordinates isn't equal to itself
+        old = self.coordinates.tobytes()
+        new = coordinates.tobytes()
+        if new == old:
+            return
+        changed = list()
+        for start in range(0, len(coordinates), CHUNK):  # comparing slices runs in C, only look closer at chunks that differ
+            if new[start * 8:(start + CHUNK) * 8] != old[start * 8:(start + CHUNK) * 8]:
+                changed.extend(i for i in range(start, min(start + CHUNK, len(coordinates)), 3) if new[i * 8:(i + 3) * 8] != old[i * 8:(i + 3) * 8])
+        with open(self.path, "r+b") as f:
+            for i in changed:
+                f.seek(HEADER.size + i * 8)
+                f.write(struct.pack("<3d", *coordinates[i:i + 3]))
+            f.flush()
+            os.fsync(f.fileno())  # on the disk before returning, like a rewrite
+        self.writes_in_place += 1
+
+    def _write_file(self, names: List[str], coordinates: array):
+        encoded = [name.encode("utf-8") for name in names]
+        ends = array("I")
+        end = 0
+        for name in encoded:
+            end += len(name)
+            ends.append(end)
+        data = array("d", coordinates)
+        if sys.byteorder == "big":
+            data.byteswap()
+            ends.byteswap()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(names), end))
+            f.write(data.tobytes())
+            f.write(ends.tobytes())
+            f.write(b"".join(encoded))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)  # atomic, a crash leaves either the old or the new file
+        self.rewrites += 1
@@ -0,0 +1,92 @@
+"""
+DistanceCalc a plugin for EDMC
+Copyright (C) 2017 Sebastian Bauer
+
+This program is free software; you can redistribute it and/or
+modify it under the terms of the GNU General Public License
+as published by the Free Software Foundation; either version 2
+of the License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program; if not, write to the Free Software
+Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
+"""
+
+import logging
+import threading
+from typing import Callable, List, Tuple, Union
+
+from distcalc.systemindex import SystemIndex
+
+logger = logging.getLogger(__name__)
+
+Completion = Tuple[str, float, float, float]
+
+
+class Typeahead(object):
+    """
+    Completes system names on a worker thread. Only the latest query counts: queries that are still waiting when a new
+    one arrives are dropped and results of outdated queries are not reported. The callback runs on the worker thread
+    with (query number, text, completions) and should check is_current before showing anything.
+    """
+
+    def __init__(self, system_index: SystemIndex, limit: int = 10):
+        self.system_index = system_index
+        self.limit = limit
+        self.queries = 0  # number of the latest query
+        self.dropped = 0  # queries replaced by a newer one before the worker got to them
+        self._condition = threading.Condition()
+        self._pending: Union[Tuple[int, str, Callable[[int, str, List[Completion]], None]], None] = None
+        self._closed = False
+        self._worker = threading.Thread(name="DistanceCalc_Typeahead", target=self._work, daemon=True)
+        self._worker.start()
+
+    def query(self, text: str, callback: Callable[[int, str, List[Completion]], None]) -> int:
+        with self._condition:
+            self.queries += 1
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (self.queries, text, callback)
+            self._condition.notify()
+            return self.queries
+
+    def cancel(self):
+        """
+        Forget the pending query and make running ones outdated.
+        """
+        with self._condition:
+            self.queries += 1
+            self._pending = None
+
+    def is_current(self, query_number: int) -> bool:
+        return query_number == self.queries
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._pending = None
+            self._condition.notify()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                query_number, text, callback = self._pending
+                self._pending = None
+            try:
+                completions = self.system_index.complete(text, self.limit)
+                if not completions and self.is_current(query_number):
+                    completions = self.system_index.suggest(text, self.limit)
+            except Exception:
+                logger.exception(f"Could not complete {text}")
+                completions = list()
+            if self.is_current(query_number):
+                callback(query_number, text, completions)
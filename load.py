@@ -17,15 +17,13 @@ along with this program; if not, write to the Free Software
 Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA  02110-1301, USA.
 """
 
+from __future__ import annotations  # the types of the modules imported on first use are only needed by type checkers
+
 import sys
 import os
-import math
-import json
 import logging
-from urllib import request, parse
-from threading import Thread
 from functools import partial
-from typing import List, Tuple, Union
+from typing import TYPE_CHECKING, Dict, List, Tuple, Union
 
 from config import config, appname
 from l10n import Locale
@@ -34,11 +32,33 @@ import myNotebook as nb
 import tkinter as tk
 import tkinter.ttk as ttk
 
+if os.path.dirname(os.path.abspath(__file__)) not in sys.path:
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))  # helper modules are bundled in the plugin folder
+from distcalc.targets import TargetEditor, has_coordinates, load_targets
+from distcalc.targetstore import TargetStore, DEFAULT_FILE_NAME as TARGET_STORE_FILE_NAME
+from distcalc.persistence import FLUSH_INTERVAL, DEFAULT_LOG_FILE_NAME as TRAVELLED_LOG_FILE_NAME
+from distcalc.core import DistanceCore
+from distcalc.stats import STATS, Profiler, timed
+from distcalc.history import JumpHistory, DEFAULT_FILE_NAME as HISTORY_FILE_NAME, DEFAULT_SUMMARY_FILE_NAME as HISTORY_SUMMARY_FILE_NAME
+from distcalc.proximity import Alert, ProximityAlerts, create_alerts, load_points_of_interest
+
+# EDMC loads the plugins one after the other when it starts. Everything that isn't needed for the main window (EDSM,
+# the system index, routes, overlays, the backfill) is imported when it is first used.
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
+    from threading import Thread
+    from distcalc.systemindex import SystemIndex
+    from distcalc.edsmcache import CachedSystem
+    from distcalc.edsm import EdsmClient
+    from distcalc.publish import SnapshotWriter
+    from distcalc.typeahead import Typeahead, Completion
+    from distcalc.route import Route
+
 this = sys.modules[__name__]  # For holding module globals
 
 this.VERSION = "1.3"
 this.BG_UPDATE_JSON = "bg_update_json"
-this.NUMBER_OF_SYSTEMS = 10
+this.NUMBER_OF_SYSTEMS = 10  # rows in the main window. If there are more targets, it shows the nearest
 this.PADX = 5
 this.WIDTH = 10
 this.distanceCalc = None  # type DistanceCalc
@@ -54,6 +74,7 @@ if not logger.hasHandlers():
     logger_formatter.default_msec_format = "%s.%03d"
     logger_channel.setFormatter(logger_formatter)
     #logger.addHandler(this.logger_channel)
+logging.getLogger("distcalc").parent = logger  # messages of the helper modules go through the plugin's logger
 
 
 class SettingsUiElements(object):
@@ -84,26 +105,334 @@ class SettingsUiElements(object):
         self.status_text = ""
 
 
+class TargetListView(object):
+    """
+    List of the targets in the settings. Only the rows that fit into the Treeview are ever inserted, scrolling replaces
+    them with the next ones, so opening the settings takes the same time for ten targets as for ten thousand. The
+    selection is kept as target numbers of the TargetEditor because rows come and go while scrolling.
+    """
+    ROWS = 12
+    COLUMNS = ("position", "system", "x", "y", "z")
+
+    def __init__(self, parent: tk.Frame, editor: TargetEditor, on_change, on_error):
+        self.editor = editor
+        self.on_change = on_change  # called after targets were changed, moved or removed
+        self.on_error = on_error  # called with a text if an edited value isn't valid
+        self.offset = 0  # position of the first row in editor.visible
+        self.selected = set()
+        self.drag_number: Union[int, None] = None
+        self.cell_editor: Union[ttk.Entry, None] = None
+        self.frame = nb.Frame(parent)
+        self.tree = ttk.Treeview(self.frame, columns=TargetListView.COLUMNS, show="headings", height=TargetListView.ROWS, selectmode=tk.EXTENDED)
+        for column, text, width, anchor in (("position", "#", 50, tk.E), ("system", "System", 280, tk.W), ("x", "X", 90, tk.E),
+                                            ("y", "Y", 90, tk.E), ("z", "Z", 90, tk.E)):
+            self.tree.heading(column, text=text, anchor=anchor)
+            self.tree.column(column, width=width, anchor=anchor, stretch=column == "system")
+        self.scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.scroll)
+        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.frame.columnconfigure(0, weight=1)
+
+        tree = self.tree
+        tree.bind("<<TreeviewSelect>>", self.selection_changed)
+        tree.bind("<MouseWheel>", lambda event: self.scroll("scroll", -1 if event.delta > 0 else 1, "wheel"))
+        tree.bind("<Button-4>", lambda event: self.scroll("scroll", -1, "wheel"))
+        tree.bind("<Button-5>", lambda event: self.scroll("scroll", 1, "wheel"))
+        tree.bind("<Prior>", lambda event: self.scroll("scroll", -1, "pages"))
+        tree.bind("<Next>", lambda event: self.scroll("scroll", 1, "pages"))
+        tree.bind("<Up>", partial(self.move_focus, -1))
+        tree.bind("<Down>", partial(self.move_focus, 1))
+        tree.bind("<Delete>", lambda event: self.remove_selected())
+        tree.bind("<Control-a>", self.select_all)
+        tree.bind("<ButtonPress-1>", self.drag_start, add="+")
+        tree.bind("<B1-Motion>", self.drag_motion, add="+")
+        tree.bind("<ButtonRelease-1>", self.drag_end, add="+")
+        tree.bind("<Double-Button-1>", self.edit_cell)
+        self.render()
+
+    @staticmethod
+    def format_coordinate(value: Union[float, None]) -> str:
+        return "?" if value is None else Locale.string_from_number(value, 3)
+
+    # region scrolling
+    def render(self):
+        self.close_cell_editor()
+        visible = self.editor.visible
+        self.offset = max(0, min(self.offset, len(visible) - TargetListView.ROWS))
+        tree = self.tree
+        tree.delete(*tree.get_children())
+        targets = self.editor.targets
+        # positions are only needed for the rows on screen, looking them up one by one is O(n) each with a filter
+        first_position = self.offset if not self.editor.filter_text else None
+        for i, number in enumerate(visible[self.offset:self.offset + TargetListView.ROWS]):
+            target = targets[number]
+            position = first_position + i if first_position is not None else self.editor.position(number)
+            tree.insert("", tk.END, iid=str(number), values=(position + 1, target["system"], self.format_coordinate(target["x"]),
+                                                             self.format_coordinate(target["y"]), self.format_coordinate(target["z"])))
+        shown = [str(number) for number in visible[self.offset:self.offset + TargetListView.ROWS] if number in self.selected]
+        tree.selection_set(shown)
+        if visible:
+            self.scrollbar.set(self.offset / len(visible), min(1.0, (self.offset + TargetListView.ROWS) / len(visible)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, command: str, amount=None, unit: str = None):
+        # called by the scrollbar with ("moveto", fraction) or ("scroll", amount, "units" / "pages") and by the bindings
+        if command == "moveto":
+            self.offset = int(float(amount) * len(self.editor.visible))
+        elif unit == "pages":
+            self.offset += int(amount) * (TargetListView.ROWS - 1)
+        elif unit == "wheel":
+            self.offset += int(amount) * 3
+        else:
+            self.offset += int(amount)
+        self.render()
+        return "break"
+
+    def show(self, number: int):
+        # scroll the target into view
+        try:
+            index = self.editor.visible.index(number)
+        except ValueError:
+            return
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + TargetListView.ROWS:
+            self.offset = index - TargetListView.ROWS + 1
+        self.render()
+
+    def move_focus(self, step: int, event=None):
+        # the default bindings stop at the first and last row on screen
+        rows = self.tree.get_children()
+        focus = self.tree.focus()
+        if not rows or focus not in rows:
+            return None
+        index = rows.index(focus) + step
+        if 0 <= index < len(rows):
+            return None
+        visible = self.editor.visible
+        position = self.offset + index
+        if not 0 <= position < len(visible):
+            return "break"
+        number = visible[position]
+        self.selected = {number}
+        self.show(number)
+        self.tree.focus(str(number))
+        return "break"
+    # endregion
+
+    # region selection
+    def selection_changed(self, event=None):
+        rows = set(int(row) for row in self.tree.get_children())
+        self.selected = (self.selected - rows) | set(int(row) for row in self.tree.selection())
+
+    def set_filter(self, text: str):
+        self.editor.set_filter(text)
+        self.selected &= set(self.editor.visible)  # don't delete targets that can't be seen
+        self.offset = 0
+        self.render()
+
+    def select_all(self, event=None):
+        self.selected = set(self.editor.visible)
+        self.render()
+        return "break"
+
+    def remove_selected(self) -> int:
+        count = len(self.selected)
+        if count:
+            self.editor.remove(self.selected)
+            self.selected = set()
+            self.render()
+            self.on_change()
+        return count
+
+    def refresh(self, scroll_to_end: bool = False):
+        """
+        Show the targets again after the editor was changed from outside, e.g. by an import.
+        """
+        if scroll_to_end:
+            self.offset = len(self.editor.visible)
+        self.render()
+    # endregion
+
+    # region dragging
+    def drag_start(self, event):
+        row = self.tree.identify_row(event.y)
+        self.drag_number = int(row) if row and self.tree.identify_region(event.x, event.y) == "cell" else None
+
+    def drag_motion(self, event):
+        if self.drag_number is None:
+            return
+        if event.y < 0 or event.y > self.tree.winfo_height():
+            self.scroll("scroll", -1 if event.y < 0 else 1)  # keep going past the rows on screen
+        row = self.tree.identify_row(max(0, min(event.y, self.tree.winfo_height() - 1)))
+        if not row or int(row) == self.drag_number:
+            return
+        target = int(row)
+        numbers = [self.drag_number] if self.drag_number not in self.selected else self.selected
+        if self.editor.move(numbers, target, after=self.editor.position(target) > self.editor.position(self.drag_number)):
+            self.render()
+            self.on_change()
+
+    def drag_end(self, event=None):
+        self.drag_number = None
+    # endregion
+
+    # region editing
+    def edit_cell(self, event):
+        if self.tree.identify_region(event.x, event.y) != "cell":
+            return
+        row = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)  # "#1" is the position
+        key = TargetListView.COLUMNS[int(column[1:]) - 1]
+        if not row or key == "position":
+            return
+        self.drag_number = None
+        x, y, width, height = self.tree.bbox(row, column)
+        value = self.editor.targets[int(row)][key]
+        self.close_cell_editor()
+        self.cell_editor = ttk.Entry(self.tree)
+        self.cell_editor.insert(0, value if key == "system" else ("" if value is None else Locale.string_from_number(value, 3)))
+        self.cell_editor.select_range(0, tk.END)
+        self.cell_editor.place(x=x, y=y, width=width, height=height)
+        self.cell_editor.focus_set()
+        self.cell_editor.bind("<Return>", partial(self.commit_cell, int(row), key))
+        self.cell_editor.bind("<KP_Enter>", partial(self.commit_cell, int(row), key))
+        self.cell_editor.bind("<FocusOut>", partial(self.commit_cell, int(row), key))
+        self.cell_editor.bind("<Escape>", lambda event: self.close_cell_editor())
+        return "break"
+
+    def commit_cell(self, number: int, key: str, event=None):
+        if self.cell_editor is None:
+            return
+        text = self.cell_editor.get().strip()
+        self.close_cell_editor()
+        if number not in self.editor.targets:
+            return
+        if key == "system":
+            if not text:
+                self.on_error("The system name can't be empty.")
+                return
+            value = text
+        elif not text:
+            value = None  # no coordinates, resolve it later
+        else:
+            try:
+                value = float(Locale.number_from_string(text))
+            except (TypeError, ValueError):
+                self.on_error(f"{text} is not a valid coordinate.")
+                return
+        target = self.editor.targets[number]
+        self.editor.update(number, key, value)
+        self.render()
+        self.on_change()
+        missing = [axis.upper() for axis in "xyz" if target[axis] is None]
+        if key != "system" and value is not None and missing:
+            # the target stays without coordinates until all of them are entered, none of them is made up
+            self.on_error(f"Enter {' and '.join(missing)} as well, {target['system']} has no coordinates until then.")
+
+    def close_cell_editor(self):
+        if self.cell_editor is not None:
+            cell_editor = self.cell_editor
+            self.cell_editor = None  # before destroying it, that causes a FocusOut
+            cell_editor.destroy()
+            self.tree.focus_set()
+    # endregion
+
+
 class DistanceCalc(object):
     EVENT_EDSM_RESPONSE = "<<DistanceCalc-EDSM-Response>>"
-
-    def __init__(self):
-        distances = json.loads(config.get_str("DistanceCalc") or "[]")
-        self.distances = distances[:this.NUMBER_OF_SYSTEMS]
-        self.coordinates: Union[Tuple[float, float, float], None] = None
-        self.distance_total: float = float(config.get_int("DistanceCalc_travelled") or 0) / 1000.0
-        self.distance_session: float = 0.0
-        a, b, c = self.get_settings_travelled()
-        self.travelled_total_option: tk.IntVar = tk.IntVar(value=a and 1)
-        self.travelled_session_option: tk.IntVar = tk.IntVar(value=b and 1)
-        self.travelled_session_selected: tk.IntVar = tk.IntVar(value=c and 1)
+    EVENT_BACKFILL_DONE = "<<DistanceCalc-Backfill-Done>>"
+    EVENT_COMPLETIONS = "<<DistanceCalc-Completions>>"
+    EVENT_ROUTE_DONE = "<<DistanceCalc-Route-Done>>"
+    EVENT_POINTS_OF_INTEREST_DONE = "<<DistanceCalc-Points-Of-Interest-Done>>"
+    COMPLETION_MIN_LENGTH = 2
+    COMPLETION_IGNORED_KEYS = ("Up", "Down", "Left", "Right", "Return", "KP_Enter", "Escape", "Tab", "Home", "End",
+                               "Shift_L", "Shift_R", "Control_L", "Control_R", "Alt_L", "Alt_R")
+    BACKFILL_CHECKPOINT_FILE = "backfill.json"
+    PROFILE_FILE = "profile.pstats"
+    PUBLISH_KEY = "DistanceCalc_publish"
+    PUBLISH_PORT_KEY = "DistanceCalc_publish_port"
+    ALERT_FILE_KEY = "DistanceCalc_alert_file"
+    ALERT_RADIUS_KEY = "DistanceCalc_alert_radius"  # in Ly
+    DEFAULT_ALERT_RADIUS = 20
+    ALERT_DURATION = 30  # seconds the alerts are shown in the main window
+    STATS_LOG_INTERVAL = 900  # seconds
+
+    def __init__(self, plugin_dir: str):
+        self.plugin_dir = plugin_dir
+        history = JumpHistory(os.path.join(plugin_dir, HISTORY_FILE_NAME), os.path.join(plugin_dir, HISTORY_SUMMARY_FILE_NAME))
+        target_store = TargetStore(os.path.join(plugin_dir, TARGET_STORE_FILE_NAME))
+        self.core = DistanceCore(config, os.path.join(plugin_dir, TRAVELLED_LOG_FILE_NAME), this.NUMBER_OF_SYSTEMS,
+                                 config.get_str("journaldir") or config.default_journal_dir, history, target_store)  # everything that doesn't need the UI
+        self.travelled_total_option: tk.IntVar = tk.IntVar(value=int(self.core.travelled_total_enabled))
+        self.travelled_session_option: tk.IntVar = tk.IntVar(value=int(self.core.travelled_session_enabled))
+        self.travelled_session_selected: tk.IntVar = tk.IntVar(value=int(self.core.session_per_game))
         self.error_label: Union[tk.Label, None] = None
-        self.settings_ui_elements: List[SettingsUiElements] = list()
+        self.settings_ui_elements: List[SettingsUiElements] = list()  # the entries for a new target
+        self.target_editor = TargetEditor()  # the targets while the settings are open
+        self.target_list_view: Union[TargetListView, None] = None
+        self.target_count_label: Union[tk.Label, None] = None
+        self.resolve_all_button: Union[nb.Button, None] = None
+        self.resolve_all_result: Union[Tuple[Dict[int, str], Dict[str, CachedSystem], bool], None] = None
         self.distance_labels: List[Tuple[tk.Label, tk.Label]] = list()
         self.travelled_labels: List[tk.Label] = list()
+        self.navroute_labels: Union[Tuple[tk.Label, tk.Label], None] = None
+        self.label_texts: Dict[tk.Label, str] = dict()  # text currently shown by each label of the main window
+        self.ui_refresh_pending = False
+        self.ui_refresh_layout = False
+        self.ui_refreshes = 0
+        self.ui_refresh_requests_coalesced = 0
+        self.ui_updates_applied = 0
+        self.ui_updates_suppressed = 0
         self.empty_frame: Union[tk.Frame, None] = None
         self.update_notification_label: Union[HyperlinkLabel, None] = None
         self.prefs_frame: Union[tk.Frame, None] = None
+        self.system_index: Union[SystemIndex, None] = None
+        self.system_index_checked = False
+        self.edsm_client: Union[EdsmClient, None] = None
+        self.typeahead: Union[Typeahead, None] = None
+        self.completion_popup: Union[tk.Toplevel, None] = None
+        self.completion_listbox: Union[tk.Listbox, None] = None
+        self.completion_row = -1
+        self.completions: List[Completion] = list()
+        self.completion_result: Union[Tuple[int, int, List[Completion]], None] = None  # set by the typeahead worker
+        self.frame: Union[tk.Frame, None] = None
+        self.backfill_button: Union[nb.Button, None] = None
+        self.backfill_thread: Union[Thread, None] = None
+        self.backfill_result: Union[Tuple[float, int], None] = None
+        self.displayed_targets: List[Tuple[str, Union[float, None]]] = list()
+        self.routes: Dict[str, Tuple[Tuple[float, float, float], Union[Route, str]]] = dict()  # target -> (start, route or status text)
+        self.route_executor: Union[ThreadPoolExecutor, None] = None
+        self.route_future: Union[Future, None] = None
+        self.route_result: Union[Tuple[str, Tuple[float, float, float], Union[Route, str]], None] = None  # set by the route worker
+        self.neutron_names = None  # normalized names of neutron stars, loaded by the route worker
+        STATS.enabled = not config.get_int("DistanceCalc_stats_disabled")
+        self.stats_option: tk.IntVar = tk.IntVar(value=int(STATS.enabled))
+        self.profile_option: tk.IntVar = tk.IntVar(value=0)
+        self.profiler = Profiler()
+        self.stats_text: Union[tk.Text, None] = None
+        STATS.gauge("ui", lambda: {"refreshes": self.ui_refreshes, "requests_coalesced": self.ui_refresh_requests_coalesced,
+                                   "labels_updated": self.ui_updates_applied, "labels_unchanged": self.ui_updates_suppressed})
+        STATS.gauge("edsm", lambda: {"requests": self.edsm_client.requests} if self.edsm_client else dict())
+        STATS.gauge("edsm_cache", lambda: self.edsm_client.cache.stats() if self.edsm_client and self.edsm_client.cache is not None else dict())
+        STATS.gauge("history", lambda: {"jumps": self.core.history.total_jumps, "in_memory": len(self.core.history)})
+        self.publish_option: tk.IntVar = tk.IntVar(value=config.get_int(DistanceCalc.PUBLISH_KEY))
+        self.publish_port_option: tk.StringVar = tk.StringVar(value=str(config.get_int(DistanceCalc.PUBLISH_PORT_KEY) or ""))
+        self.snapshot_writer: Union[SnapshotWriter, None] = None
+        self.snapshot_port = 0
+        self.update_snapshot_writer()
+        self.alert_file_option: tk.StringVar = tk.StringVar(value=config.get_str(DistanceCalc.ALERT_FILE_KEY) or "")
+        self.alert_radius_option: tk.StringVar = tk.StringVar(value=str(config.get_int(DistanceCalc.ALERT_RADIUS_KEY) or DistanceCalc.DEFAULT_ALERT_RADIUS))
+        self.points_of_interest_loaded = False  # on the first journal event
+        self.points_of_interest_generation = 0  # only the last load counts
+        self.points_of_interest_results: Dict[int, Union[ProximityAlerts, None]] = dict()  # generation -> alerts, set by the workers
+        self.alert_label: Union[tk.Label, None] = None
+        self.alert_text = ""
+        self.alert_hide_job: Union[str, None] = None
+        STATS.gauge("proximity", lambda: self.core.proximity.stats() if self.core.proximity else dict())
+        STATS.gauge("publish", lambda: {"sequence": self.snapshot_writer.sequence, "connections": self.snapshot_writer.connections,
+                                        "dropped": self.snapshot_writer.notifications_dropped} if self.snapshot_writer else dict())
 
     # region static and helper methods
     @staticmethod
@@ -136,38 +465,35 @@ class DistanceCalc(object):
                 return False
         return False
 
-    @staticmethod
-    def get_settings_travelled():
-        settings = config.get_int("DistanceCalc_options")
-        setting_total = settings & 1  # calculate total distance travelled
-        setting_session = (settings >> 1) & 1  # calculate for session only
-        setting_session_option = (settings >> 2) & 1  # 1 = calculate for ED session; 0 = calculate for EDMC session
-        return setting_total, setting_session, setting_session_option
-
-    @staticmethod
-    def calculate_distance(x1: Union[int, float], y1: Union[int, float], z1: Union[int, float], x2: Union[int, float], y2: Union[int, float], z2: Union[int, float]):
-        return math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
     # endregion
 
     # region interface methods
     def plugin_app(self, parent: tk.Frame):
         frame = tk.Frame(parent)
+        self.frame = frame
+        frame.bind(DistanceCalc.EVENT_BACKFILL_DONE, self.finish_backfill)
+        frame.bind(DistanceCalc.EVENT_ROUTE_DONE, self.finish_route)
+        frame.bind(DistanceCalc.EVENT_POINTS_OF_INTEREST_DONE, self.finish_points_of_interest)
         self.empty_frame = tk.Frame(frame)
         frame.columnconfigure(1, weight=1)
-        for i in range(this.NUMBER_OF_SYSTEMS):
-            self.distance_labels.append((tk.Label(frame), tk.Label(frame)))
-
-            self.travelled_labels = list()
+        self.distance_labels = list()  # created by add_distance_labels once there are targets to show
+        self.travelled_labels = list()
         for i in range(2):  # total and session
             self.travelled_labels.append((tk.Label(frame), tk.Label(frame)))
+        self.navroute_labels = (tk.Label(frame, text="Route:"), tk.Label(frame))
+        self.alert_label = tk.Label(frame)
 
         self.update_notification_label = HyperlinkLabel(frame, text="Plugin update available", background=nb.Label().cget("background"),
                                                         url="https://github.com/Thurion/DistanceCalc/releases", underline=True)
 
-        self.update_main_ui()
+        self.request_ui_refresh(layout=True)  # loads the targets once EDMC is running instead of while it starts
+        frame.after(int(FLUSH_INTERVAL * 1000), self.flush_travelled_distance)
+        frame.after(DistanceCalc.STATS_LOG_INTERVAL * 1000, self.log_stats)
         return frame
 
+    @timed("ui.open_prefs")
     def open_prefs(self, parent, cmdr: str, is_beta: bool):
+        self.hide_completions()  # left over if the settings were closed without saving
         row_top = 0
 
         def next_row_top():
@@ -177,70 +503,80 @@ class DistanceCalc(object):
 
         self.prefs_frame = nb.Frame(parent)
         self.prefs_frame.bind_all(DistanceCalc.EVENT_EDSM_RESPONSE, self.update_prefs_ui)
+        self.prefs_frame.bind(DistanceCalc.EVENT_COMPLETIONS, self.show_completions)
         frame_top = nb.Frame(self.prefs_frame)
         frame_top.grid(row=0, column=0, sticky=tk.W)
         frame_bottom = nb.Frame(self.prefs_frame)
         frame_bottom.grid(row=1, column=0, sticky=tk.SW)
 
-        # headline
-        nb.Label(frame_top, text="Systems").grid(row=row_top, column=2, sticky=tk.EW)
-        nb.Label(frame_top, text="X").grid(row=row_top, column=3, sticky=tk.EW)
-        nb.Label(frame_top, text="Y").grid(row=row_top, column=4, sticky=tk.EW)
-        nb.Label(frame_top, text="Z").grid(row=row_top, column=5, sticky=tk.EW)
+        # list of targets
+        self.target_editor = TargetEditor(self.core.distances)
+        frame_filter = nb.Frame(frame_top)
+        frame_filter.grid(row=next_row_top(), column=0, padx=this.PADX * 2, pady=(5, 0), sticky=tk.EW)
+        nb.Label(frame_filter, text="Filter:").grid(row=0, column=0, sticky=tk.W)
+        filter_text = tk.StringVar()
+        filter_entry = nb.EntryMenu(frame_filter, textvariable=filter_text)
+        filter_entry.grid(row=0, column=1, padx=this.PADX, sticky=tk.W)
+        filter_entry.config(width=this.WIDTH * 3)
+        filter_text.trace_add("write", lambda *args: self.filter_targets(filter_text.get()))
+        self.target_count_label = nb.Label(frame_filter, text="")
+        self.target_count_label.grid(row=0, column=2, padx=this.PADX, sticky=tk.W)
 
         self.error_label = nb.Label(frame_top, text="")
-
-        self.settings_ui_elements = list()
-        vcmd = (frame_top.register(self.validate), '%d', '%i', '%P', '%s', '%S', '%v', '%V', '%W')
-
-        # create and add fields to enter systems
-        for i in range(this.NUMBER_OF_SYSTEMS):
-            next_row_top()
-
-            up_button = nb.Button(frame_top, text="\u25B2", command=partial(self.rearrange_order, i, i - 1))
-            up_button.grid(row=row_top, column=0, padx=(this.PADX * 2, 1), sticky=tk.W)
-            up_button.config(width=3)
-            if i == 0:
-                up_button["state"] = tk.DISABLED
-
-            down_button = nb.Button(frame_top, text="\u25BC", command=partial(self.rearrange_order, i, i + 1))
-            down_button.grid(row=row_top, column=1, padx=(1, this.PADX), sticky=tk.W)
-            down_button.config(width=3)
-            if i == this.NUMBER_OF_SYSTEMS - 1:
-                down_button["state"] = tk.DISABLED
-
-            system_entry = nb.EntryMenu(frame_top)
-            system_entry.grid(row=row_top, column=2, padx=this.PADX, sticky=tk.W)
-            system_entry.config(width=this.WIDTH * 4)  # set fixed width. columnconfigure doesn't work because it already fits
-
-            x_entry = nb.EntryMenu(frame_top, validate='key', validatecommand=vcmd)
-            x_entry.grid(row=row_top, column=3, padx=this.PADX, sticky=tk.W)
-            x_entry.config(width=this.WIDTH)  # set fixed width. columnconfigure doesn't work because it already fits
-
-            y_entry = nb.EntryMenu(frame_top, validate='key', validatecommand=vcmd)
-            y_entry.grid(row=row_top, column=4, padx=this.PADX, sticky=tk.W)
-            y_entry.config(width=this.WIDTH)  # set fixed width. columnconfigure doesn't work because it already fits
-
-            z_entry = nb.EntryMenu(frame_top, validate='key', validatecommand=vcmd)
-            z_entry.grid(row=row_top, column=5, padx=this.PADX, sticky=tk.W)
-            z_entry.config(width=this.WIDTH)  # set fixed width. columnconfigure doesn't work because it already fits
-
-            clear_button = nb.Button(frame_top, text="Clear", command=partial(self.clear_input_fields, i))
-            clear_button.grid(row=row_top, column=6, padx=this.PADX, sticky=tk.W)
-            clear_button.config(width=7)
-
-            edsm_button = nb.Button(frame_top, text="EDSM")
-            edsm_button.grid(row=row_top, column=7, padx=(this.PADX, this.PADX * 2), sticky=tk.W)
-            edsm_button.config(width=7, command=partial(self.fill_system_information_from_edsm_async, i, system_entry))
-
-            self.settings_ui_elements.append(SettingsUiElements(system_entry, x_entry, y_entry, z_entry, edsm_button))
+        self.target_list_view = TargetListView(frame_top, self.target_editor, self.update_target_count_label, self.show_target_error)
+        self.target_list_view.frame.grid(row=next_row_top(), column=0, padx=this.PADX * 2, pady=5, sticky=tk.EW)
+        nb.Label(frame_top, text="Double-click a cell to edit it, drag rows to reorder them, Delete removes the selected targets.").grid(
+            row=next_row_top(), column=0, padx=this.PADX * 2, sticky=tk.W)
+
+        frame_buttons = nb.Frame(frame_top)
+        frame_buttons.grid(row=next_row_top(), column=0, padx=this.PADX * 2, pady=(5, 0), sticky=tk.W)
+        nb.Button(frame_buttons, text="Delete selected", command=self.remove_selected_targets).grid(row=0, column=0, sticky=tk.W)
+        nb.Button(frame_buttons, text="Import...", command=self.import_targets).grid(row=0, column=1, padx=this.PADX, sticky=tk.W)
+        self.resolve_all_button = nb.Button(frame_buttons, text="Resolve all", command=self.resolve_all_targets)
+        self.resolve_all_button.grid(row=0, column=2, sticky=tk.W)
+
+        # a new target
+        frame_new = nb.Frame(frame_top)
+        frame_new.grid(row=next_row_top(), column=0, padx=this.PADX * 2, pady=(10, 0), sticky=tk.W)
+        nb.Label(frame_new, text="System").grid(row=0, column=0, sticky=tk.EW)
+        nb.Label(frame_new, text="X").grid(row=0, column=1, sticky=tk.EW)
+        nb.Label(frame_new, text="Y").grid(row=0, column=2, sticky=tk.EW)
+        nb.Label(frame_new, text="Z").grid(row=0, column=3, sticky=tk.EW)
+        vcmd = (frame_new.register(self.validate), '%d', '%i', '%P', '%s', '%S', '%v', '%V', '%W')
+
+        system_entry = nb.EntryMenu(frame_new)
+        system_entry.grid(row=1, column=0, padx=(0, this.PADX), sticky=tk.W)
+        system_entry.config(width=this.WIDTH * 4)  # set fixed width. columnconfigure doesn't work because it already fits
+        system_entry.bind("<KeyRelease>", partial(self.system_entry_key_released, 0))
+        system_entry.bind("<FocusOut>", self.system_entry_focus_lost)
+        system_entry.bind("<Return>", lambda event: self.add_target_from_entries())
+
+        coordinate_entries = list()
+        for column in range(1, 4):
+            entry = nb.EntryMenu(frame_new, validate='key', validatecommand=vcmd)
+            entry.grid(row=1, column=column, padx=this.PADX, sticky=tk.W)
+            entry.config(width=this.WIDTH)  # set fixed width. columnconfigure doesn't work because it already fits
+            entry.bind("<Return>", lambda event: self.add_target_from_entries())
+            coordinate_entries.append(entry)
+
+        add_button = nb.Button(frame_new, text="Add", command=self.add_target_from_entries)
+        add_button.grid(row=1, column=4, padx=this.PADX, sticky=tk.W)
+        add_button.config(width=7)
+
+        clear_button = nb.Button(frame_new, text="Clear", command=partial(self.clear_input_fields, 0))
+        clear_button.grid(row=1, column=5, padx=this.PADX, sticky=tk.W)
+        clear_button.config(width=7)
+
+        edsm_button = nb.Button(frame_new, text="EDSM")
+        edsm_button.grid(row=1, column=6, padx=(this.PADX, this.PADX * 2), sticky=tk.W)
+        edsm_button.config(width=7, command=partial(self.fill_system_information_from_edsm_async, 0, system_entry))
+        self.settings_ui_elements = [SettingsUiElements(system_entry, *coordinate_entries, edsm_button)]
 
         # EDSM result label and information about what coordinates can be entered
-        self.error_label.grid(row=next_row_top(), column=0, columnspan=6, padx=this.PADX * 2, sticky=tk.W)
-        nb.Label(frame_top, text="You can get coordinates from EDDB or EDSM or enter any valid coordinate.").grid(row=next_row_top(), column=0, columnspan=6,
-                                                                                                                 padx=this.PADX * 2,
+        self.error_label.grid(row=next_row_top(), column=0, padx=this.PADX * 2, sticky=tk.W)
+        nb.Label(frame_top, text="You can get coordinates from EDDB or EDSM or enter any valid coordinate.").grid(row=next_row_top(), column=0, padx=this.PADX * 2,
                                                                                                                  sticky=tk.W)
-        ttk.Separator(frame_top, orient=tk.HORIZONTAL).grid(row=next_row_top(), columnspan=6, padx=this.PADX * 2, pady=8, sticky=tk.EW)
+        ttk.Separator(frame_top, orient=tk.HORIZONTAL).grid(row=next_row_top(), column=0, padx=this.PADX * 2, pady=8, sticky=tk.EW)
 
         row_bottom = 0
 
@@ -253,8 +589,14 @@ class DistanceCalc(object):
         travelled_total = nb.Checkbutton(frame_bottom, variable=self.travelled_total_option, text="Calculate total travelled distance")
         travelled_total.var = self.travelled_total_option
         travelled_total.grid(row=row_bottom, column=0, padx=this.PADX * 2, sticky=tk.W)
-        reset_button = nb.Button(frame_bottom, text="Reset", command=self.reset_total_travelled_distance)
-        reset_button.grid(row=next_row_bottom(), column=0, padx=this.PADX * 4, pady=5, sticky=tk.W)
+        frame_total_buttons = nb.Frame(frame_bottom)
+        frame_total_buttons.grid(row=next_row_bottom(), column=0, padx=this.PADX * 4, pady=5, sticky=tk.W)
+        reset_button = nb.Button(frame_total_buttons, text="Reset", command=self.reset_total_travelled_distance)
+        reset_button.grid(row=0, column=0, sticky=tk.W)
+        self.backfill_button = nb.Button(frame_total_buttons, text="Calculate from journals", command=self.start_backfill)
+        self.backfill_button.grid(row=0, column=1, padx=this.PADX, sticky=tk.W)
+        if self.backfill_thread:
+            self.backfill_button["state"] = tk.DISABLED
 
         travelled_session = nb.Checkbutton(frame_bottom, variable=self.travelled_session_option, text="Calculate travelled distance for current session")
         travelled_session.var = self.travelled_session_option
@@ -272,6 +614,48 @@ class DistanceCalc(object):
         self.set_state_radio_buttons(travelled_session_edmc, travelled_session_elite)
         travelled_session.config(command=partial(self.set_state_radio_buttons, travelled_session_edmc, travelled_session_elite))
 
+        nb.Label(frame_bottom, text=self.get_history_text(cmdr), justify=tk.LEFT).grid(row=next_row_bottom(), column=0, padx=this.PADX * 2, pady=(5, 0), sticky=tk.W)
+
+        # snapshot for overlays
+        frame_publish = nb.Frame(frame_bottom)
+        frame_publish.grid(row=next_row_bottom(), column=0, padx=this.PADX * 2, pady=(5, 0), sticky=tk.W)
+        from distcalc.publish import SNAPSHOT_FILE_NAME
+        publish_checkbutton = nb.Checkbutton(frame_publish, variable=self.publish_option, text="Publish distances for overlays ({0})".format(SNAPSHOT_FILE_NAME))
+        publish_checkbutton.var = self.publish_option
+        publish_checkbutton.grid(row=0, column=0, sticky=tk.W)
+        nb.Label(frame_publish, text="Notify on port:").grid(row=0, column=1, padx=(this.PADX * 2, 0), sticky=tk.W)
+        port_vcmd = (frame_publish.register(lambda value: value.isdigit() and int(value) < 65536 or value == ""), "%P")
+        nb.Entry(frame_publish, textvariable=self.publish_port_option, width=6, validate="key", validatecommand=port_vcmd).grid(row=0, column=2, sticky=tk.W)
+
+        # proximity alerts
+        frame_alerts = nb.Frame(frame_bottom)
+        frame_alerts.grid(row=next_row_bottom(), column=0, padx=this.PADX * 2, pady=(5, 0), sticky=tk.W)
+        nb.Label(frame_alerts, text="Alert within").grid(row=0, column=0, sticky=tk.W)
+        radius_vcmd = (frame_alerts.register(lambda value: value.isdigit() or value == ""), "%P")
+        nb.Entry(frame_alerts, textvariable=self.alert_radius_option, width=6, validate="key", validatecommand=radius_vcmd).grid(row=0, column=1, padx=this.PADX, sticky=tk.W)
+        nb.Label(frame_alerts, text="Ly of the points of interest in").grid(row=0, column=2, sticky=tk.W)
+        nb.Label(frame_alerts, textvariable=self.alert_file_option).grid(row=0, column=3, padx=this.PADX, sticky=tk.W)
+        nb.Button(frame_alerts, text="Choose...", command=self.choose_points_of_interest).grid(row=0, column=4, sticky=tk.W)
+        nb.Button(frame_alerts, text="None", command=lambda: self.alert_file_option.set("")).grid(row=0, column=5, padx=this.PADX, sticky=tk.W)
+        nb.Label(frame_bottom, text="A CSV or JSON file like the imported targets. A radius column overrides the radius for single points.").grid(
+            row=next_row_bottom(), column=0, padx=this.PADX * 2, sticky=tk.W)
+
+        # statistics of the plugin itself
+        ttk.Separator(frame_bottom, orient=tk.HORIZONTAL).grid(row=next_row_bottom(), column=0, padx=this.PADX * 2, pady=8, sticky=tk.EW)
+        frame_stats = nb.Frame(frame_bottom)
+        frame_stats.grid(row=next_row_bottom(), column=0, padx=this.PADX * 2, sticky=tk.W)
+        stats_checkbutton = nb.Checkbutton(frame_stats, variable=self.stats_option, text="Collect performance statistics")
+        stats_checkbutton.var = self.stats_option
+        stats_checkbutton.grid(row=0, column=0, sticky=tk.W)
+        profile_checkbutton = nb.Checkbutton(frame_stats, variable=self.profile_option, text="Profile with cProfile", command=self.toggle_profiler)
+        profile_checkbutton.var = self.profile_option
+        profile_checkbutton.grid(row=0, column=1, padx=this.PADX, sticky=tk.W)
+        nb.Button(frame_stats, text="Refresh", command=self.update_stats_text).grid(row=0, column=2, padx=this.PADX, sticky=tk.W)
+        nb.Button(frame_stats, text="Reset", command=self.reset_stats).grid(row=0, column=3, sticky=tk.W)
+        self.stats_text = tk.Text(frame_stats, height=8, width=100, wrap=tk.NONE)
+        self.stats_text.grid(row=1, column=0, columnspan=4, pady=(5, 0), sticky=tk.W)
+        self.update_stats_text()
+
         nb.Label(frame_bottom).grid(row=next_row_bottom())  # spacer
         nb.Label(frame_bottom).grid(row=next_row_bottom())  # spacer
         nb.Label(frame_bottom, text="Plugin version: {0}".format(this.VERSION)).grid(row=next_row_bottom(), column=0, padx=this.PADX, sticky=tk.W)
@@ -280,64 +664,62 @@ class DistanceCalc(object):
         HyperlinkLabel(self.prefs_frame, text="Get estimated coordinates from EDTS", background=nb.Label().cget("background"),
                        url="http://edts.thargoid.space/", underline=True).grid(row=next_row_bottom(), column=0, padx=this.PADX, sticky=tk.W)
 
-        row = 0
-        if len(self.distances) > 0:
-            for var in self.distances:
-                settings_ui_element = self.settings_ui_elements[row]
-                self.fill_entries(var["system"], var["x"], var["y"], var["z"],
-                                  settings_ui_element.system_entry,
-                                  settings_ui_element.x_entry,
-                                  settings_ui_element.y_entry,
-                                  settings_ui_element.z_entry)
-                row += 1
+        self.resolve_all_result = None
+        self.update_target_count_label()
 
         return self.prefs_frame
 
+    @timed("ui.prefs_changed")
     def prefs_changed(self, cmdr: str, is_beta: bool):
-        distances = list()
-        for settings_ui_element in self.settings_ui_elements:
-            system_text = settings_ui_element.system_entry.get()
-            x_text = settings_ui_element.x_entry.get()
-            y_text = settings_ui_element.y_entry.get()
-            z_text = settings_ui_element.z_entry.get()
-            if system_text and x_text and y_text and z_text:
-                try:
-                    distances.append({
-                        "system": system_text.strip(),
-                        "x": Locale.number_from_string(x_text.strip()),
-                        "y": Locale.number_from_string(y_text.strip()),
-                        "z": Locale.number_from_string(z_text.strip())
-                    })
-
-                except Exception as e:  # error while parsing the numbers
-                    logger.exception(f"DistanceCalc: Error while parsing the coordinates for {system_text.strip()}")
-                    continue
-        self.distances = distances
-        config.set("DistanceCalc", json.dumps(self.distances))
-
-        settings = self.travelled_total_option.get() | (self.travelled_session_option.get() << 1) | (self.travelled_session_selected.get() << 2)
-        config.set("DistanceCalc_options", settings)
-
-        self.update_main_ui()
-        self.update_distances()
+        self.add_target_from_entries()  # typed in but not added yet
+        self.core.set_targets(self.target_editor.get_targets())  # the ones without coordinates are kept for later
+        self.core.save_targets()
+        self.core.set_options(bool(self.travelled_total_option.get()), bool(self.travelled_session_option.get()), bool(self.travelled_session_selected.get()))
+        STATS.enabled = bool(self.stats_option.get())
+        config.set("DistanceCalc_stats_disabled", int(not STATS.enabled))
+        config.set(DistanceCalc.PUBLISH_KEY, self.publish_option.get())
+        config.set(DistanceCalc.PUBLISH_PORT_KEY, int(self.publish_port_option.get() or 0))
+        self.update_snapshot_writer()
+        alert_file = self.alert_file_option.get()
+        alert_radius = int(self.alert_radius_option.get() or 0) or DistanceCalc.DEFAULT_ALERT_RADIUS
+        if alert_file != (config.get_str(DistanceCalc.ALERT_FILE_KEY) or "") or alert_radius != config.get_int(DistanceCalc.ALERT_RADIUS_KEY):
+            config.set(DistanceCalc.ALERT_FILE_KEY, alert_file)
+            config.set(DistanceCalc.ALERT_RADIUS_KEY, alert_radius)
+            self.load_points_of_interest()
+
+        self.request_ui_refresh(layout=True)
+        if self.edsm_client:
+            self.edsm_client.cancel_all()  # nobody is waiting for the answers anymore
+        self.hide_completions()
+        self.stats_text = None
+        self.target_list_view = None
         self.prefs_frame = None
 
+    @timed("ui.journal_entry")
     def journal_entry(self, cmdr, is_beta, system, station, entry, state):
-        if entry["event"] in ["FSDJump", "Location", "CarrierJump", "StartUp"]:
-            # We arrived at a new system!
-            if "StarPos" in entry:
-                self.coordinates = tuple(entry["StarPos"])
-            if "JumpDist" in entry:
-                distance = entry["JumpDist"]
-                if self.travelled_total_option.get():
-                    self.distance_total += distance
-                    config.set("DistanceCalc_travelled", int(self.distance_total * 1000))
-                if self.travelled_session_option.get():
-                    self.distance_session += distance
-            self.update_distances()
-        if entry["event"] == "LoadGame" and self.travelled_session_option.get() and self.travelled_session_selected.get():
-            self.distance_session = 0.0
-            self.update_distances()
+        if not self.points_of_interest_loaded:
+            self.load_points_of_interest()
+        navroute_active = self.core.navroute.active
+        if self.core.journal_entry(entry, cmdr):
+            if self.core.alerts:
+                self.show_alerts(self.core.alerts)
+                self.core.alerts = list()
+            self.request_ui_refresh(layout=navroute_active != self.core.navroute.active)
+
+    def plugin_stop(self):
+        if self.profiler.running:
+            self.profiler.stop(os.path.join(self.plugin_dir, DistanceCalc.PROFILE_FILE))
+        self.core.close()
+        if self.snapshot_writer:
+            self.snapshot_writer.close()
+        if self.typeahead:
+            self.typeahead.close()
+        if self.route_executor:
+            self.route_executor.shutdown(wait=False, cancel_futures=True)
+        if self.edsm_client:
+            self.edsm_client.close()
+            if self.edsm_client.cache is not None:
+                self.edsm_client.cache.close()
     # endregion
 
     # region user interface
@@ -348,64 +730,153 @@ class DistanceCalc(object):
         settings_ui_elements.y_entry.delete(0, tk.END)
         settings_ui_elements.z_entry.delete(0, tk.END)
 
-    def rearrange_order(self, old_index: int, new_index: int):
-        if old_index < 0 or old_index >= len(self.settings_ui_elements) or new_index < 0 or new_index >= len(self.settings_ui_elements):
-            logger.error(f"DistanceCalc: Can't rearrange system from index {old_index} to {new_index}")
-            return  # something went wrong with the indexes
-
-        old_system_text = self.settings_ui_elements[old_index].system_entry.get()
-        old_x_text = self.settings_ui_elements[old_index].x_entry.get()
-        old_y_text = self.settings_ui_elements[old_index].y_entry.get()
-        old_z_text = self.settings_ui_elements[old_index].z_entry.get()
-
-        new_system_text = self.settings_ui_elements[new_index].system_entry.get()
-        new_x_text = self.settings_ui_elements[new_index].x_entry.get()
-        new_y_text = self.settings_ui_elements[new_index].y_entry.get()
-        new_z_text = self.settings_ui_elements[new_index].z_entry.get()
-
-        self.clear_input_fields(old_index)
-        self.clear_input_fields(new_index)
-        uiElements = self.settings_ui_elements[old_index]  # type: SettingsUiElements
-        self.fill_entries(new_system_text, new_x_text, new_y_text, new_z_text, uiElements.system_entry, uiElements.x_entry, uiElements.y_entry, uiElements.z_entry)
-        uiElements = self.settings_ui_elements[new_index]  # type: SettingsUiElements
-        self.fill_entries(old_system_text, old_x_text, old_y_text, old_z_text, uiElements.system_entry, uiElements.x_entry, uiElements.y_entry, uiElements.z_entry)
-
+    def import_targets(self):
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(parent=self.prefs_frame, title="Import targets",
+                                          filetypes=[("Target lists", "*.csv *.json"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            imported = load_targets(path)
+        except Exception:
+            logger.exception(f"DistanceCalc: Error while importing targets from {path}")
+            self.error_label["text"] = f"Could not import targets from {os.path.basename(path)}"
+            self.error_label.config(foreground="red")
+            return
+
+        self.target_editor.extend(imported)
+        self.target_list_view.refresh(scroll_to_end=True)
+        self.update_target_count_label()
+        self.error_label["text"] = f"Imported {len(imported)} targets from {os.path.basename(path)}"
+        self.error_label.config(foreground="dark green")
+
+    def add_target_from_entries(self):
+        settings_ui_element = self.settings_ui_elements[0] if self.settings_ui_elements else None
+        if not settings_ui_element:
+            return
+        system_text = settings_ui_element.system_entry.get().strip()
+        x_text = settings_ui_element.x_entry.get().strip()
+        y_text = settings_ui_element.y_entry.get().strip()
+        z_text = settings_ui_element.z_entry.get().strip()
+        if not system_text:
+            return
+        if x_text or y_text or z_text:
+            try:
+                x, y, z = (float(Locale.number_from_string(text)) for text in (x_text, y_text, z_text))
+            except Exception:  # error while parsing the numbers
+                logger.exception(f"DistanceCalc: Error while parsing the coordinates for {system_text}")
+                self.show_target_error(f"The coordinates of {system_text} are not valid.")
+                return
+        else:
+            x = y = z = None  # resolve it later
+        number = self.target_editor.extend([{"system": system_text, "x": x, "y": y, "z": z}])[0]
+        self.clear_input_fields(0)
+        if self.target_list_view:
+            self.target_list_view.show(number)
+        self.update_target_count_label()
+
+    def filter_targets(self, text: str):
+        if self.target_list_view:
+            self.target_list_view.set_filter(text)
+            self.update_target_count_label()
+
+    def remove_selected_targets(self):
+        if self.target_list_view and not self.target_list_view.remove_selected():
+            self.show_target_error("Select the targets to delete first.")
+
+    def show_target_error(self, text: str):
+        self.error_label["text"] = text
+        self.error_label.config(foreground="red")
+
+    def update_target_count_label(self):
+        if not self.target_count_label:
+            return
+        editor = self.target_editor
+        texts = [f"{len(editor)} targets"]
+        unresolved = len(editor.unresolved())
+        if unresolved:
+            texts.append(f"{unresolved} without coordinates, not shown until resolved")
+        if editor.filter_text:
+            texts.append(f"{len(editor.visible)} shown")
+        self.target_count_label["text"] = ", ".join(texts)
+
+    @timed("ui.update_main_ui")
     def update_main_ui(self):
         # labels for distances to systems
         row = 0
+        displayed_targets = self.core.get_displayed_targets()
+        self.add_distance_labels(len(displayed_targets))
         for (system, distance) in self.distance_labels:
-            if len(self.distances) >= row + 1:
-                s = self.distances[row]
+            if len(displayed_targets) >= row + 1:
                 system.grid(row=row, column=0, sticky=tk.W)
-                system["text"] = "Distance {0}:".format(s["system"])
                 distance.grid(row=row, column=1, sticky=tk.W)
-                distance["text"] = "? Ly"
                 row += 1
             else:
                 system.grid_remove()
                 distance.grid_remove()
 
+        # plotted route
+        description, distance = self.navroute_labels
+        if self.core.navroute.active:
+            description.grid(row=row, column=0, sticky=tk.W)
+            distance.grid(row=row, column=1, sticky=tk.W)
+            row += 1
+        else:
+            description.grid_remove()
+            distance.grid_remove()
+
         # labels for total travelled distance
-        setting_total, setting_session, setting_session_option = self.get_settings_travelled()
+        setting_total, setting_session = self.core.travelled_total_enabled, self.core.travelled_session_enabled
 
         for i in range(len(self.travelled_labels)):
             description, distance = self.travelled_labels[i]
             if (i == 0 and setting_total) or (i == 1 and setting_session):
                 description.grid(row=row, column=0, sticky=tk.W)
-                description["text"] = "Travelled ({0}):".format("total" if i == 0 else "session")
+                self.set_label_text(description, "Travelled ({0}):".format("total" if i == 0 else "session"))
                 distance.grid(row=row, column=1, sticky=tk.W)
-                distance["text"] = "{0} Ly".format(Locale.string_from_number(self.distance_total, 2) if i == 0 else Locale.string_from_number(self.distance_session, 2))
                 row += 1
             else:
                 description.grid_remove()
                 distance.grid_remove()
 
+        # proximity alerts of the last jump
+        if self.alert_text:
+            self.alert_label.grid(row=row, column=0, columnspan=2, sticky=tk.W)
+            self.set_label_text(self.alert_label, self.alert_text)
+            row += 1
+        else:
+            self.alert_label.grid_remove()
+
         if row == 0:
             self.empty_frame.grid(row=0)
         else:
             self.empty_frame.grid_remove()
 
+    def get_history_text(self, cmdr: str) -> str:
+        history = self.core.history
+        lines = list()
+        if history.session_jumps:
+            rate = history.session_rate
+            lines.append("This session: {0} jumps, {1} Ly, longest {2} Ly, average {3} Ly{4}".format(
+                history.session_jumps, Locale.string_from_number(history.session_distance, 2), Locale.string_from_number(history.session_longest, 2),
+                Locale.string_from_number(history.session_average, 2), "" if rate is None else ", {0} Ly/h".format(Locale.string_from_number(rate, 0))))
+        if history.window_jumps:
+            rate = history.window_rate
+            lines.append("Last hour: {0} jumps, {1} Ly, longest {2} Ly{3}".format(
+                history.window_jumps, Locale.string_from_number(history.window_distance, 2), Locale.string_from_number(history.window_longest, 2),
+                "" if rate is None else ", {0} Ly/h".format(Locale.string_from_number(rate, 0))))
+        days = history.daily(cmdr or self.core.commander)
+        if days:
+            day = max(days)
+            distance, jumps = days[day]
+            lines.append("{0}: {1} jumps, {2} Ly, best day {3} Ly".format(day, jumps, Locale.string_from_number(distance, 2),
+                                                                          Locale.string_from_number(max(d for d, _ in days.values()), 2)))
+        return "\n".join(lines)
+
     def update_prefs_ui(self, event=None):
+        if self.resolve_all_result:
+            self.apply_resolved_systems(*self.resolve_all_result)
+            self.resolve_all_result = None
         for i, settings_ui_element in enumerate(self.settings_ui_elements):
             if settings_ui_element.has_data:
                 if settings_ui_element.success:
@@ -431,63 +902,548 @@ class DistanceCalc(object):
             travelled_session_edmc["state"] = "disabled"
             travelled_session_elite["state"] = "disabled"
 
+    def add_distance_labels(self, count: int):
+        # the rows of the main window are only created when there are targets for them
+        for i in range(len(self.distance_labels), count):
+            labels = (tk.Label(self.frame), tk.Label(self.frame))
+            for label in labels:
+                label.bind("<Button-1>", partial(self.plot_route, i))  # click a target to plot a route to it
+            self.distance_labels.append(labels)
+
+    @timed("ui.update_distances")
     def update_distances(self):
-        if not self.coordinates:
-            for (_, distance) in self.distance_labels:
-                distance["text"] = "? Ly"
-        else:
-            for i in range(len(self.distances)):
-                system = self.distances[i]
-                distance = self.calculate_distance(system["x"], system["y"], system["z"], *self.coordinates)
-                self.distance_labels[i][1]["text"] = "{0} Ly".format(Locale.string_from_number(distance, 2))
+        self.displayed_targets = self.core.get_displayed_targets()
+        if len(self.displayed_targets) > len(self.distance_labels):
+            self.update_main_ui()  # more targets than rows, e.g. the first update
+        for (system_label, distance_label), (system_name, distance) in zip(self.distance_labels, self.displayed_targets):
+            self.set_label_text(system_label, "Distance {0}:".format(system_name))
+            self.set_label_text(distance_label, "? Ly" if distance is None else "{0} Ly{1}".format(Locale.string_from_number(distance, 2), self.get_jumps_text(system_name, distance)))
+
+        navroute = self.core.navroute
+        if navroute.active:
+            text = "{0} Ly, {1} jumps".format(Locale.string_from_number(navroute.remaining_distance, 2), navroute.jumps_left)
+            eta = navroute.eta
+            if eta is not None and navroute.jumps_left:
+                text += ", ETA {0}:{1:02d}".format(int(eta // 3600), int(eta % 3600 // 60))
+            self.set_label_text(self.navroute_labels[1], text)
 
         _, distance = self.travelled_labels[0]
-        distance["text"] = "{0} Ly".format(Locale.string_from_number(self.distance_total, 2))
+        self.set_label_text(distance, "{0} Ly".format(Locale.string_from_number(self.core.distance_total, 2)))
         _, distance = self.travelled_labels[1]
-        distance["text"] = "{0} Ly".format(Locale.string_from_number(self.distance_session, 2))
+        self.set_label_text(distance, "{0} Ly".format(Locale.string_from_number(self.core.distance_session, 2)))
+
+        if self.snapshot_writer:
+            self.publish_snapshot()
+
+    def set_label_text(self, label: tk.Label, text: str):
+        # only touch labels whose text actually changes, every change causes Tk to lay out the frame again
+        if self.label_texts.get(label) == text:
+            self.ui_updates_suppressed += 1
+        else:
+            self.label_texts[label] = text
+            label["text"] = text
+            self.ui_updates_applied += 1
+
+    def request_ui_refresh(self, layout: bool = False):
+        """
+        Update the main window once the Tk loop is idle. Any number of requests until then result in a single update.
+        Set layout if the rows of the main window might have changed.
+        """
+        self.ui_refresh_layout = self.ui_refresh_layout or layout
+        if self.ui_refresh_pending:
+            self.ui_refresh_requests_coalesced += 1
+        elif self.frame:
+            self.ui_refresh_pending = True
+            self.frame.after_idle(self.refresh_ui)
+
+    @timed("ui.refresh_ui")
+    def refresh_ui(self):
+        self.ui_refresh_pending = False
+        self.ui_refreshes += 1
+        if self.ui_refresh_layout:
+            self.ui_refresh_layout = False
+            self.update_main_ui()
+        self.update_distances()
+    # endregion
+
+    # region typeahead
+    def get_typeahead(self) -> Union[Typeahead, None]:
+        if self.typeahead is None:
+            system_index = self.get_system_index()
+            if system_index and system_index.can_complete:
+                from distcalc.typeahead import Typeahead
+                self.typeahead = Typeahead(system_index)
+        return self.typeahead
+
+    def system_entry_key_released(self, row: int, event):
+        if event.keysym == "Escape":
+            self.hide_completions()
+            return
+        if event.keysym == "Down" and self.completion_popup and self.completion_row == row:
+            self.completion_listbox.focus_set()
+            self.completion_listbox.selection_clear(0, tk.END)
+            self.completion_listbox.selection_set(0)
+            self.completion_listbox.activate(0)
+            return
+        if event.keysym in DistanceCalc.COMPLETION_IGNORED_KEYS:
+            return
+        typeahead = self.get_typeahead()
+        if not typeahead:
+            return
+        text = self.settings_ui_elements[row].system_entry.get()
+        if len(text.strip()) < DistanceCalc.COMPLETION_MIN_LENGTH:
+            typeahead.cancel()
+            self.hide_completions()
+            return
+        typeahead.query(text, partial(self.completions_received, row))
+
+    def completions_received(self, row: int, query_number: int, text: str, completions: List[Completion]):
+        # Called by the typeahead worker thread. Like the EDSM responses, the results are handed over with an event
+        self.completion_result = (row, query_number, completions)
+        if self.prefs_frame:
+            self.prefs_frame.event_generate(DistanceCalc.EVENT_COMPLETIONS, when="tail")
+
+    def show_completions(self, event=None):
+        if not self.completion_result or not self.typeahead:
+            return
+        row, query_number, completions = self.completion_result
+        self.completion_result = None
+        if not self.typeahead.is_current(query_number) or not self.prefs_frame:
+            return  # the user kept typing
+        if not completions:
+            self.hide_completions()
+            return
+
+        system_entry = self.settings_ui_elements[row].system_entry
+        if self.completion_popup is None:
+            self.completion_popup = tk.Toplevel(self.prefs_frame)
+            self.completion_popup.overrideredirect(True)
+            self.completion_listbox = tk.Listbox(self.completion_popup, activestyle=tk.DOTBOX, exportselection=False)
+            self.completion_listbox.pack(fill=tk.BOTH, expand=True)
+            self.completion_listbox.bind("<Return>", self.pick_completion)
+            self.completion_listbox.bind("<KP_Enter>", self.pick_completion)
+            self.completion_listbox.bind("<Double-Button-1>", self.pick_completion)
+            self.completion_listbox.bind("<Escape>", lambda event: self.hide_completions(focus_entry=True))
+            self.completion_listbox.bind("<FocusOut>", self.system_entry_focus_lost)
+        self.completion_row = row
+        self.completions = completions
+        self.completion_listbox.delete(0, tk.END)
+        for name, _, _, _ in completions:
+            self.completion_listbox.insert(tk.END, name)
+        self.completion_listbox.config(width=system_entry.cget("width"), height=len(completions))
+        self.completion_popup.geometry(f"+{system_entry.winfo_rootx()}+{system_entry.winfo_rooty() + system_entry.winfo_height()}")
+        self.completion_popup.deiconify()
+        self.completion_popup.lift()
+
+    def pick_completion(self, event=None):
+        selection = self.completion_listbox.curselection() if self.completion_listbox else ()
+        if not selection or self.completion_row < 0:
+            return
+        name, x, y, z = self.completions[selection[0]]
+        settings_ui_element = self.settings_ui_elements[self.completion_row]
+        self.clear_input_fields(self.completion_row)
+        self.fill_entries(name, x, y, z, settings_ui_element.system_entry, settings_ui_element.x_entry, settings_ui_element.y_entry, settings_ui_element.z_entry)
+        self.error_label["text"] = f"Coordinates filled in for system {name}"
+        self.error_label.config(foreground="dark green")
+        self.hide_completions(focus_entry=True)
+
+    def system_entry_focus_lost(self, event=None):
+        # wait until the focus has moved, it might have gone to the list of completions
+        if self.completion_popup:
+            self.completion_popup.after(100, self.hide_completions_without_focus)
+
+    def hide_completions_without_focus(self):
+        if self.completion_popup and self.completion_popup.focus_get() is not self.completion_listbox and \
+                (self.completion_row < 0 or self.completion_popup.focus_get() is not self.settings_ui_elements[self.completion_row].system_entry):
+            self.hide_completions()
+
+    def hide_completions(self, focus_entry: bool = False):
+        if self.typeahead:
+            self.typeahead.cancel()
+        if self.completion_popup:
+            if focus_entry and 0 <= self.completion_row < len(self.settings_ui_elements):
+                self.settings_ui_elements[self.completion_row].system_entry.focus_set()
+            self.completion_popup.destroy()
+        self.completion_popup = None
+        self.completion_listbox = None
+        self.completion_row = -1
+        self.completions = list()
+    # endregion
+
+    # region snapshot
+    def update_snapshot_writer(self):
+        port = config.get_int(DistanceCalc.PUBLISH_PORT_KEY)
+        if self.snapshot_writer and (not config.get_int(DistanceCalc.PUBLISH_KEY) or port != self.snapshot_port):
+            self.snapshot_writer.close()
+            self.snapshot_writer = None
+        if config.get_int(DistanceCalc.PUBLISH_KEY) and not self.snapshot_writer:
+            from distcalc.publish import SnapshotWriter, SNAPSHOT_FILE_NAME
+            try:
+                self.snapshot_writer = SnapshotWriter(os.path.join(self.plugin_dir, SNAPSHOT_FILE_NAME), port=port)
+                self.snapshot_port = port
+            except OSError:
+                logger.exception(f"DistanceCalc: Could not publish the distances to {SNAPSHOT_FILE_NAME} with notifications on port {port}")
+
+    @timed("ui.publish_snapshot")
+    def publish_snapshot(self):
+        # the nearest targets, not only the ones that fit into the main window
+        targets = self.core.get_displayed_targets(self.snapshot_writer.capacity)
+        self.snapshot_writer.publish(self.core.coordinates, targets,
+                                     self.core.distance_total if self.core.travelled_total_enabled else None,
+                                     self.core.distance_session if self.core.travelled_session_enabled else None)
+    # endregion
+
+    # region statistics
+    def update_stats_text(self):
+        if self.stats_text:
+            self.stats_text.config(state=tk.NORMAL)
+            self.stats_text.delete("1.0", tk.END)
+            self.stats_text.insert(tk.END, STATS.format() if STATS.enabled else "Collecting statistics is disabled.")
+            self.stats_text.config(state=tk.DISABLED)  # read only
+
+    def reset_stats(self):
+        STATS.reset()
+        self.update_stats_text()
+
+    def log_stats(self):
+        if STATS.enabled:
+            import json
+            logger.info(f"DistanceCalc: stats {json.dumps(STATS.snapshot(), sort_keys=True)}")
+        self.frame.after(DistanceCalc.STATS_LOG_INTERVAL * 1000, self.log_stats)
+
+    def toggle_profiler(self):
+        if self.profile_option.get():
+            self.profiler.start()
+            logger.info("DistanceCalc: Profiling started")
+        else:
+            path = os.path.join(self.plugin_dir, DistanceCalc.PROFILE_FILE)
+            logger.info(f"DistanceCalc: Profiling stopped, saved to {path}\n{self.profiler.stop(path)}")
+    # endregion
+
+    # region routes
+    def get_jumps_text(self, system_name: str, distance: float) -> str:
+        start, route = self.routes.get(system_name, (None, None))
+        if route is not None and start == self.core.coordinates:
+            if isinstance(route, str):
+                return f" ({route})"
+            if route.neutron_jumps:
+                return f" ({route.jumps} jumps, {route.neutron_jumps} boosted)"
+            return f" ({route.jumps} jumps)"
+        jumps = self.core.estimate_jumps(distance)
+        return "" if jumps is None else f" (\u2265{jumps} jumps)"
+
+    def plot_route(self, row: int, event=None):
+        if row >= len(self.displayed_targets) or not self.core.coordinates or not self.core.jump_range:
+            return
+        system_name = self.displayed_targets[row][0]
+        end = self.core.get_target_coordinates(system_name)
+        system_index = self.get_system_index()
+        start = self.core.coordinates
+        if end is None:
+            return
+        if not system_index:
+            self.routes[system_name] = (start, "no system index")
+        else:
+            if self.route_future and self.route_future.cancel():  # only the latest click counts
+                self.routes = dict((name, value) for name, value in self.routes.items() if value[1] != "plotting...")
+            if self.route_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.route_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DistanceCalc_Route")
+            self.routes[system_name] = (start, "plotting...")
+            self.route_future = self.route_executor.submit(self.run_route, system_index, system_name, start, end, self.core.jump_range)
+        self.request_ui_refresh()
+
+    def run_route(self, system_index: SystemIndex, system_name: str, start: Tuple[float, float, float], end: Tuple[float, float, float], jump_range: float):
+        # Runs on the route worker. Don't access UI elements from here because of thread safety. Store the result and fire an event
+        try:
+            from distcalc.route import StarMap, RoutePlanner, load_neutron_names, NEUTRON_FILE_NAMES
+            if self.neutron_names is None:
+                self.neutron_names = set()
+                for file_name in NEUTRON_FILE_NAMES:
+                    path = os.path.join(self.plugin_dir, file_name)
+                    if os.path.isfile(path):
+                        self.neutron_names.update(load_neutron_names(path))
+            star_map = StarMap.from_system_index(system_index, start, end, jump_range, self.neutron_names)
+            route = RoutePlanner(star_map, jump_range).plot(start, end)
+            self.route_result = (system_name, start, route or "no route")
+        except Exception:
+            logger.exception(f"DistanceCalc: Error while plotting a route to {system_name}")
+            self.route_result = (system_name, start, "route failed")
+        if self.frame:
+            self.frame.event_generate(DistanceCalc.EVENT_ROUTE_DONE, when="tail")
+
+    def finish_route(self, event=None):
+        if self.route_result:
+            system_name, start, route = self.route_result
+            self.route_result = None
+            self.routes[system_name] = (start, route)
+            self.request_ui_refresh()
     # endregion
 
     # region EDSM
-    def get_system_information_from_edsm(self, button_number: int, system_name: str):
-        # Don't access UI elements from here because of thread safety. Use the regular (int, str, bool) variables and fire an event
+    def get_system_index(self) -> Union[SystemIndex, None]:
+        # the index is optional and opened on first use. A missing or broken file is only checked once
+        if not self.system_index_checked:
+            self.system_index_checked = True
+            from distcalc.systemindex import SystemIndex, DEFAULT_FILE_NAME as SYSTEM_INDEX_FILE_NAME
+            path = os.path.join(self.plugin_dir, SYSTEM_INDEX_FILE_NAME)
+            if os.path.isfile(path):
+                try:
+                    self.system_index = SystemIndex(path)
+                except Exception:
+                    logger.exception(f"DistanceCalc: Could not open the system index {path}")
+        return self.system_index
+
+    def fill_system_information_from_index(self, button_number: int, system_name: str) -> bool:
+        system_index = self.get_system_index()
+        if not system_index:
+            return False
+        result = system_index.lookup(system_name)
+        if not result:
+            return False
+
         settings_ui_elements = self.settings_ui_elements[button_number]
         settings_ui_elements.reset_response_data()
-
-        edsmUrl = "https://www.edsm.net/api-v1/system?systemName={SYSTEM}&showCoordinates=1".format(SYSTEM=parse.quote(system_name))
+        settings_ui_elements.success = True
+        settings_ui_elements.system_name, settings_ui_elements.x, settings_ui_elements.y, settings_ui_elements.z = result
+        settings_ui_elements.status_text = f"Coordinates filled in for system {settings_ui_elements.system_name}"
+        settings_ui_elements.has_data = True
+        return True
+
+    def get_edsm_client(self) -> EdsmClient:
+        if self.edsm_client is None:
+            from distcalc.edsmcache import EdsmCache, DEFAULT_FILE_NAME as EDSM_CACHE_FILE_NAME
+            from distcalc.edsm import EdsmClient  # the HTTP stack is only loaded when EDSM is asked for the first time
+            edsm_cache = None
+            try:
+                edsm_cache = EdsmCache(os.path.join(self.plugin_dir, EDSM_CACHE_FILE_NAME))
+            except Exception:
+                logger.exception("DistanceCalc: Could not open the EDSM cache, requests won't be cached")
+            self.edsm_client = EdsmClient(cache=edsm_cache)
+        return self.edsm_client
+
+    def edsm_response_received(self, settings_ui_elements: SettingsUiElements, system_name: str, future: Future):
+        # Called by an EDSM worker thread. Don't access UI elements from here because of thread safety. Use the regular (int, str, bool) variables and fire an event
+        from concurrent.futures import CancelledError
         try:
-            url = request.urlopen(edsmUrl, timeout=15)
-            response = url.read()
-            edsm_json = json.loads(response)
-            if "name" in edsm_json and "coords" in edsm_json:
+            system = future.result()
+        except CancelledError:
+            return  # the settings were closed
+        except Exception as e:
+            settings_ui_elements.status_text = f"Could not get system information for {system_name} from EDSM"
+            logger.error(f"Could not get system information for {system_name} from EDSM: {e}")
+        else:
+            if system.found:
                 settings_ui_elements.success = True
-                settings_ui_elements.system_name = edsm_json["name"]
-                settings_ui_elements.x = edsm_json["coords"]["x"]
-                settings_ui_elements.y = edsm_json["coords"]["y"]
-                settings_ui_elements.z = edsm_json["coords"]["z"]
-                settings_ui_elements.status_text = f"Coordinates filled in for system {edsm_json['name']}"
+                settings_ui_elements.system_name = system.name
+                settings_ui_elements.x = system.x
+                settings_ui_elements.y = system.y
+                settings_ui_elements.z = system.z
+                settings_ui_elements.status_text = f"Coordinates filled in for system {system.name}"
             else:
                 settings_ui_elements.status_text = f"Could not get system information for {system_name} from EDSM"
-        except:
-            settings_ui_elements.status_text = f"Could not get system information for {system_name} from EDSM"
-            logger.error(f"Could not get system information for {system_name} from EDSM")
-        finally:
-            settings_ui_elements.has_data = True
-            if self.prefs_frame:
-                self.prefs_frame.event_generate(DistanceCalc.EVENT_EDSM_RESPONSE, when="tail")
+        settings_ui_elements.has_data = True
+        if self.prefs_frame:
+            self.prefs_frame.event_generate(DistanceCalc.EVENT_EDSM_RESPONSE, when="tail")
 
     def fill_system_information_from_edsm_async(self, button_number: int, system_entry: nb.EntryMenu):
         if system_entry.get() == "":
             self.error_label["text"] = "No system name provided."
             self.error_label.config(foreground="red")
+        elif self.fill_system_information_from_index(button_number, system_entry.get()):
+            self.update_prefs_ui()  # found in the local index, no need to ask EDSM
+        else:
+            settings_ui_elements = self.settings_ui_elements[button_number]
+            settings_ui_elements.edsm_button["state"] = tk.DISABLED
+            settings_ui_elements.reset_response_data()
+            system_name = system_entry.get()
+            future = self.get_edsm_client().lookup(system_name)
+            future.add_done_callback(partial(self.edsm_response_received, settings_ui_elements, system_name))
+
+    def resolve_all_targets(self):
+        """
+        Look up all targets without coordinates in one go.
+        """
+        numbers = self.target_editor.unresolved()
+        if not numbers:
+            self.error_label["text"] = "All systems have coordinates."
+            self.error_label.config(foreground="dark green")
+            return
+
+        from distcalc.edsmcache import CachedSystem
+        from distcalc.systemindex import normalize_name
+        resolved: Dict[str, CachedSystem] = dict()
+        system_index = self.get_system_index()
+        if system_index:
+            for system_name in numbers.values():
+                result = system_index.lookup(system_name)
+                if result:
+                    resolved[normalize_name(system_name)] = CachedSystem(True, *result)
+        missing = list(dict.fromkeys(system_name for system_name in numbers.values() if normalize_name(system_name) not in resolved))
+        if not missing:
+            self.apply_resolved_systems(numbers, resolved, False)
+            return
+
+        self.resolve_all_button["state"] = tk.DISABLED
+        self.error_label["text"] = f"Looking up {len(missing)} systems on EDSM..."
+        self.error_label.config(foreground="dark green")
+        future = self.get_edsm_client().lookup_many(missing)
+        future.add_done_callback(partial(self.resolve_all_response_received, numbers, resolved))
+
+    def resolve_all_response_received(self, numbers: Dict[int, str], resolved: Dict[str, CachedSystem], future: Future):
+        # Called by an EDSM worker thread. Don't access UI elements from here because of thread safety. Store the result and fire an event
+        from concurrent.futures import CancelledError
+        try:
+            resolved.update(future.result())
+            failed = False
+        except CancelledError:
+            return  # the settings were closed
+        except Exception as e:
+            logger.error(f"Could not get system information for {len(numbers)} systems from EDSM: {e}")
+            failed = True
+        self.resolve_all_result = (numbers, resolved, failed)
+        if self.prefs_frame:
+            self.prefs_frame.event_generate(DistanceCalc.EVENT_EDSM_RESPONSE, when="tail")
+
+    def apply_resolved_systems(self, numbers: Dict[int, str], resolved: Dict[str, CachedSystem], failed: bool):
+        from distcalc.systemindex import normalize_name
+        count = 0
+        editor = self.target_editor
+        for number, system_name in numbers.items():
+            system = resolved.get(normalize_name(system_name))
+            target = editor.targets.get(number)
+            # the target might have been changed or deleted in the meantime
+            if system and system.found and target and not has_coordinates(target) and normalize_name(target["system"]) == normalize_name(system_name):
+                editor.update(number, "system", system.name)
+                for axis, value in zip("xyz", (system.x, system.y, system.z)):
+                    editor.update(number, axis, value)
+                count += 1
+        if self.target_list_view:
+            self.target_list_view.refresh()
+        self.update_target_count_label()
+
+        self.resolve_all_button["state"] = tk.NORMAL
+        if failed:
+            self.error_label["text"] = f"Could not reach EDSM, coordinates filled in for {count} of {len(numbers)} systems"
         else:
-            self.settings_ui_elements[button_number].edsm_button["state"] = tk.DISABLED
-            t = Thread(name="EDSM_caller_{0}".format(button_number), target=self.get_system_information_from_edsm, args=(button_number, system_entry.get()))
-            t.start()
+            self.error_label["text"] = f"Coordinates filled in for {count} of {len(numbers)} systems"
+        self.error_label.config(foreground="dark green" if count == len(numbers) else "red")
     # endregion
 
+    # region proximity alerts
+    def load_points_of_interest(self):
+        self.points_of_interest_loaded = True
+        self.points_of_interest_generation += 1
+        path = config.get_str(DistanceCalc.ALERT_FILE_KEY)
+        if not path:
+            self.core.set_proximity_alerts(None)
+            return
+        from threading import Thread
+        # the alerts from before are kept until the new ones are built
+        thread = Thread(name="DistanceCalc_points_of_interest", target=self.run_points_of_interest,
+                        args=(self.points_of_interest_generation, path, config.get_int(DistanceCalc.ALERT_RADIUS_KEY) or DistanceCalc.DEFAULT_ALERT_RADIUS))
+        thread.daemon = True
+        thread.start()
+
+    def run_points_of_interest(self, generation: int, path: str, radius: int):
+        # Don't access UI elements from here because of thread safety. Store the result and fire an event
+        alerts = None
+        try:
+            points = load_points_of_interest(path, radius)
+            alerts = create_alerts(points) if points else None
+            logger.info(f"DistanceCalc: Alerting for {len(points)} points of interest from {path}")
+        except Exception:
+            logger.exception(f"DistanceCalc: Could not read the points of interest from {path}")
+        self.points_of_interest_results[generation] = alerts
+        if self.frame:
+            self.frame.event_generate(DistanceCalc.EVENT_POINTS_OF_INTEREST_DONE, when="tail")
+
+    def finish_points_of_interest(self, event=None):
+        generation = self.points_of_interest_generation
+        if generation in self.points_of_interest_results:
+            self.core.set_proximity_alerts(self.points_of_interest_results[generation])
+            self.points_of_interest_results.clear()  # the ones of older loads as well
+
+    def choose_points_of_interest(self):
+        from tkinter import filedialog
+        path = filedialog.askopenfilename(parent=self.prefs_frame, title="Points of interest",
+                                          filetypes=[("Target lists", "*.csv *.json"), ("All files", "*.*")])
+        if path:
+            self.alert_file_option.set(path)
+
+    def show_alerts(self, alerts: List[Alert]):
+        texts = list()
+        for alert in alerts[:3]:
+            if alert.entered:
+                texts.append("{0} Ly to {1}".format(Locale.string_from_number(alert.distance, 2), alert.name))
+            else:
+                texts.append("Left {0}".format(alert.name))
+        if len(alerts) > 3:
+            texts.append("{0} more".format(len(alerts) - 3))
+        self.alert_text = ", ".join(texts)
+        if self.frame:
+            if self.alert_hide_job:
+                self.frame.after_cancel(self.alert_hide_job)
+            self.alert_hide_job = self.frame.after(DistanceCalc.ALERT_DURATION * 1000, self.hide_alerts)
+        self.request_ui_refresh(layout=True)
+
+    def hide_alerts(self):
+        self.alert_hide_job = None
+        self.alert_text = ""
+        self.request_ui_refresh(layout=True)
+    # endregion
+
+    def flush_travelled_distance(self):
+        self.core.travelled.flush_if_due()
+        self.core.history.flush()
+        self.frame.after(int(FLUSH_INTERVAL * 1000), self.flush_travelled_distance)
+
     def reset_total_travelled_distance(self):
-        config.set("DistanceCalc_travelled", 0)
-        self.distance_total = 0.0
+        self.core.travelled.set(0.0)
+        self.request_ui_refresh()
+
+    # region journal backfill
+    def start_backfill(self):
+        if self.backfill_thread:
+            return
+        journal_dir = config.get_str("journaldir") or config.default_journal_dir
+        self.backfill_button["state"] = tk.DISABLED
+        self.error_label["text"] = "Calculating the travelled distance from the journals..."
+        self.error_label.config(foreground="dark green")
+        from threading import Thread
+        self.backfill_thread = Thread(name="DistanceCalc_backfill", target=self.run_backfill, args=(journal_dir,))
+        self.backfill_thread.daemon = True
+        self.backfill_thread.start()
+
+    def run_backfill(self, journal_dir: str):
+        # Don't access UI elements from here because of thread safety. Store the result and fire an event
+        try:
+            # threads instead of processes because the plugin runs inside EDMC
+            from distcalc.backfill import JournalBackfill
+            backfill = JournalBackfill(journal_dir, os.path.join(self.plugin_dir, DistanceCalc.BACKFILL_CHECKPOINT_FILE), processes=False)
+            self.backfill_result = backfill.run()
+        except Exception:
+            logger.exception(f"DistanceCalc: Error while calculating the travelled distance from the journals in {journal_dir}")
+            self.backfill_result = None
+        finally:
+            if self.frame:
+                self.frame.event_generate(DistanceCalc.EVENT_BACKFILL_DONE, when="tail")
+
+    def finish_backfill(self, event=None):
+        self.backfill_thread = None
+        result = self.backfill_result
+        if result:
+            distance_total, jumps = result
+            self.core.travelled.set(distance_total)
+            self.request_ui_refresh()
+            status_text, color = f"Travelled distance calculated from {jumps} jumps in the journals", "dark green"
+        else:
+            status_text, color = "Could not calculate the travelled distance from the journals", "red"
+        if self.prefs_frame:
+            self.error_label["text"] = status_text
+            self.error_label.config(foreground=color)
+            self.backfill_button["state"] = tk.NORMAL
+    # endregion
 
 
 """
@@ -523,10 +1479,14 @@ class DistanceCalc(object):
 
 
 def plugin_start3(plugin_dir):
-    this.distanceCalc = DistanceCalc()
+    this.distanceCalc = DistanceCalc(plugin_dir)
     return "DistanceCalc"
 
 
+def plugin_stop():
+    this.distanceCalc.plugin_stop()
+
+
 def plugin_prefs(parent, cmdr, is_beta):
     return this.distanceCalc.open_prefs(parent, cmdr, is_beta)
 
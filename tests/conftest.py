@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the helper modules are imported like the plugin does, from the plugin folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,53 @@
+import math
+import random
+
+import pytest
+
+from distcalc.core import LINEAR_SCAN_TARGETS, DistanceCore, MemoryConfig
+from distcalc.history import JumpHistory
+from distcalc.proximity import create_alerts
+
+
+def test_empty_history_is_kept(tmp_path):
+    # a new history has no jumps yet, which makes it falsy
+    history = JumpHistory(str(tmp_path / "history.bin"), str(tmp_path / "history.json"))
+    assert len(history) == 0
+    core = DistanceCore(MemoryConfig(), str(tmp_path / "travelled.log"), history=history)
+    assert core.history is history
+    history.close()
+
+
+def test_prebuilt_proximity_alerts(tmp_path):
+    core = DistanceCore(MemoryConfig(), str(tmp_path / "travelled.log"))
+    core.journal_entry({"event": "Location", "StarSystem": "Sol", "StarPos": [0.0, 0.0, 0.0]})
+    core.set_proximity_alerts(create_alerts([{"system": "Alpha Centauri", "x": 3.0, "y": 0.0, "z": 3.0, "radius": 10.0},
+                                             {"system": "Colonia", "x": -9530.5, "y": -910.3, "z": 19808.1, "radius": 10.0}]))
+    assert not core.alerts  # already being close isn't news
+    core.journal_entry({"event": "FSDJump", "StarSystem": "Far", "StarPos": [0.0, 0.0, 50.0], "JumpDist": 50.0})
+    assert [(alert.name, alert.entered) for alert in core.alerts] == [("Alpha Centauri", False)]
+    core.set_proximity_alerts(None)
+    core.journal_entry({"event": "FSDJump", "StarSystem": "Sol", "StarPos": [0.0, 0.0, 0.0], "JumpDist": 50.0})
+    assert not core.alerts
+    core.close()
+
+
+@pytest.mark.parametrize("count", (20, LINEAR_SCAN_TARGETS + 20))
+def test_duplicated_targets(tmp_path, count):
+    # the linear scan below LINEAR_SCAN_TARGETS and the spatial index above it have to show the same
+    rng = random.Random(count)
+    targets = [{"system": f"Target {i}", "x": rng.uniform(-500, 500), "y": rng.uniform(-500, 500), "z": rng.uniform(-500, 500)} for i in range(count)]
+    duplicate = {"system": "Duplicate", "x": 1.0, "y": 2.0, "z": 3.0}
+    core = DistanceCore(MemoryConfig(), str(tmp_path / "travelled.log"), displayed_targets=5)
+    core.journal_entry({"event": "Location", "StarSystem": "Sol", "StarPos": [0.0, 0.0, 0.0]})
+
+    def expected():
+        nearest = sorted((math.dist((t["x"], t["y"], t["z"]), (0.0, 0.0, 0.0)), t["system"]) for t in core.distances)[:5]
+        return [(name, pytest.approx(distance)) for distance, name in nearest]
+
+    core.set_targets(targets + [dict(duplicate), dict(duplicate)])
+    assert core.get_displayed_targets() == expected()
+    assert [name for name, _ in core.get_displayed_targets()][:2] == ["Duplicate", "Duplicate"]
+    core.set_targets(targets + [dict(duplicate)])  # removing one of them keeps the other
+    assert core.get_displayed_targets() == expected()
+    assert [name for name, _ in core.get_displayed_targets()].count("Duplicate") == 1
+    core.close()
@@ -0,0 +1,264 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import parse
+from concurrent.futures import CancelledError
+
+import pytest
+
+from distcalc import edsmcache
+from distcalc.edsm import MAX_URL_LENGTH, EdsmClient, EdsmError
+from distcalc.edsmcache import CachedSystem, EdsmCache
+from distcalc.systemindex import normalize_name
+
+SYSTEMS = {"sol": ("Sol", 0.0, 0.0, 0.0), "colonia": ("Colonia", -9530.5, -910.28125, 19808.125),
+           "sagittarius a*": ("Sagittarius A*", 25.21875, -20.90625, 25899.96875)}
+
+
+class FakeEdsmHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep alive like EDSM
+
+    def do_GET(self):
+        server: FakeEdsm = self.server
+        with server.lock:
+            server.paths.append(self.path)
+            status = server.failures.pop(0) if server.failures else 200
+        server.release.wait(5)
+        url = parse.urlsplit(self.path)
+        query = parse.parse_qs(url.query)
+        if url.path.endswith("/api-v1/system"):
+            data = server.system(query["systemName"][0]) or list()
+        else:
+            data = [system for system in map(server.system, query.get("systemName[]", list())) if system is not None]
+        body = json.dumps(data).encode() if status == 200 else b"{}"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeEdsm(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeEdsmHandler)
+        self.lock = threading.Lock()
+        self.paths = list()
+        self.failures = list()  # HTTP status of the next responses
+        self.release = threading.Event()  # cleared to hold the responses back
+        self.release.set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @staticmethod
+    def system(system_name):
+        system = SYSTEMS.get(normalize_name(system_name))
+        if system is None:
+            return None
+        name, x, y, z = system
+        return {"name": name, "coords": {"x": x, "y": y, "z": z}}
+
+
+@pytest.fixture
+def edsm():
+    server = FakeEdsm()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = EdsmCache(str(tmp_path / "edsm.sqlite"))
+    yield cache
+    cache.close()
+
+
+def create_client(edsm, cache=None, **kwargs):
+    kwargs.setdefault("backoff", 0.01)
+    return EdsmClient(edsm.url, cache=cache, timeout=5, **kwargs)
+
+
+def test_empty_cache_is_used(cache):
+    # an empty cache is falsy because of __len__, callers have to compare it against None
+    assert len(cache) == 0 and not cache
+    assert cache.get("Sol") is None
+    cache.put("Sol", CachedSystem(True, "Sol", 0.0, 0.0, 0.0))
+    assert cache.get("SOL") == cache.get(" sol ") == CachedSystem(True, "Sol", 0.0, 0.0, 0.0)
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 1, "evictions": 0}
+
+
+def test_unknown_systems_expire(tmp_path):
+    cache = EdsmCache(str(tmp_path / "edsm.sqlite"), miss_ttl=-1)
+    try:
+        cache.put("Sol", CachedSystem(True, "Sol", 0.0, 0.0, 0.0))
+        cache.put("Nowhere", CachedSystem(False))
+        assert cache.get("Nowhere") is None
+        assert cache.get("Sol").found
+    finally:
+        cache.close()
+
+
+def test_least_recently_used_are_evicted(tmp_path, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(edsmcache.time, "time", lambda: next(clock))
+    cache = EdsmCache(str(tmp_path / "edsm.sqlite"), max_entries=2)
+    try:
+        for name in ("A", "B"):
+            cache.put(name, CachedSystem(True, name, 1.0, 2.0, 3.0))
+        cache.get("A")
+        cache.put("C", CachedSystem(True, "C", 1.0, 2.0, 3.0))
+        assert len(cache) == 2
+        assert cache.get("B") is None
+        assert cache.get("A") is not None and cache.get("C") is not None
+    finally:
+        cache.close()
+
+
+def test_empty_cache_is_used_by_the_client(edsm, cache):
+    assert len(cache) == 0
+    client = create_client(edsm, cache)
+    try:
+        assert client.lookup("Sol").result(5).found
+        assert client.lookup("sol").result(5) == client.lookup("SOL").result(5)
+    finally:
+        client.close()
+    assert len(edsm.paths) == 1
+    assert client.requests == 1
+    assert len(cache) == 1
+
+
+def wait_for_requests(edsm, count):
+    for _ in range(500):
+        if len(edsm.paths) >= count:
+            return
+        time.sleep(0.01)
+    raise AssertionError(f"expected {count} requests, got {edsm.paths}")
+
+
+def test_lookups_of_the_same_system_are_coalesced(edsm):
+    edsm.release.clear()
+    client = create_client(edsm)
+    try:
+        first = client.lookup("Colonia")
+        wait_for_requests(edsm, 1)
+        second = client.lookup(" colonia ")
+        assert second is first
+        edsm.release.set()
+        assert first.result(5).name == "Colonia"
+        assert client.lookup("COLONIA").result(5).found
+    finally:
+        client.close()
+    assert len(edsm.paths) == 2  # the last lookup came after the first had finished
+
+
+def test_cache_hits_and_misses(edsm, cache):
+    cache.put("Sol", EdsmClient.parse_system(FakeEdsm.system("Sol")))
+    client = create_client(edsm, cache)
+    try:
+        assert client.lookup("Sol").result(5).found
+        assert not edsm.paths
+        unknown = client.lookup("Nowhere").result(5)
+        assert not unknown.found
+        assert not client.lookup("nowhere").result(5).found  # misses are cached too
+    finally:
+        client.close()
+    assert len(edsm.paths) == 1
+    assert cache.get("Nowhere") is not None
+
+
+def test_retries_with_backoff(edsm):
+    edsm.failures = [503, 429]
+    client = create_client(edsm, retries=3)
+    try:
+        assert client.lookup("Sol").result(5).found
+    finally:
+        client.close()
+    assert client.requests == 3
+
+
+def test_gives_up_after_retries(edsm):
+    edsm.failures = [503] * 3
+    client = create_client(edsm, retries=2)
+    try:
+        with pytest.raises(EdsmError):
+            client.lookup("Sol").result(5)
+    finally:
+        client.close()
+    assert client.requests == 3
+
+
+def test_no_retry_for_client_errors(edsm):
+    edsm.failures = [404]
+    client = create_client(edsm)
+    try:
+        with pytest.raises(EdsmError):
+            client.lookup("Sol").result(5)
+    finally:
+        client.close()
+    assert client.requests == 1
+
+
+def test_cancel_all(edsm):
+    edsm.release.clear()
+    client = create_client(edsm, workers=1)
+    try:
+        running = client.lookup("Sol")
+        wait_for_requests(edsm, 1)
+        queued = client.lookup("Colonia")
+        client.cancel_all()
+        edsm.release.set()
+        with pytest.raises(CancelledError):
+            running.result(5)
+        with pytest.raises(CancelledError):
+            queued.result(5)
+        assert client.lookup("Sol").result(5).found  # the client still works afterwards
+    finally:
+        client.close()
+    assert len(edsm.paths) == 2  # the queued lookup was never sent
+
+
+def sent_names(path):
+    return parse.parse_qs(parse.urlsplit(path).query)["systemName[]"]
+
+
+def test_lookup_many_splits_long_urls(edsm):
+    system_names = ["Sol", "Colonia"] + [f"Wregoe {i}" for i in range(300)]
+    client = create_client(edsm)
+    try:
+        result = client.lookup_many(system_names).result(5)
+    finally:
+        client.close()
+    assert len(edsm.paths) == 5
+    assert all(len(edsm.url) + len(path) <= MAX_URL_LENGTH for path in edsm.paths)
+    assert [name for path in edsm.paths for name in sent_names(path)] == system_names
+    assert len(result) == 302
+    assert result["sol"].found and result["colonia"].found
+    assert not any(result[normalize_name(f"Wregoe {i}")].found for i in range(300))
+
+
+def test_lookup_many_merges_cached_and_missing(edsm, cache):
+    cache.put("Sol", EdsmClient.parse_system(FakeEdsm.system("Sol")))
+    cache.put("Nowhere", EdsmClient.parse_system(list()))
+    client = create_client(edsm, cache)
+    try:
+        result = client.lookup_many(["Sol", "nowhere", "Colonia", "COLONIA", "Elsewhere"]).result(5)
+        again = client.lookup_many(["colonia", "elsewhere"]).result(5)
+    finally:
+        client.close()
+    assert len(edsm.paths) == 1  # only the names that weren't cached, once each
+    assert [normalize_name(name) for name in sent_names(edsm.paths[0])] == ["colonia", "elsewhere"]
+    assert sorted(result) == ["colonia", "elsewhere", "nowhere", "sol"]
+    assert result["sol"].found and result["colonia"].name == "Colonia"
+    assert not result["nowhere"].found and not result["elsewhere"].found
+    assert again == {"colonia": result["colonia"], "elsewhere": result["elsewhere"]}
@@ -0,0 +1,43 @@
+from distcalc.navroute import NavRoute
+
+
+def create_route(count: int) -> NavRoute:
+    route = NavRoute()
+    route.load([{"StarSystem": f"Hop {i}", "SystemAddress": 100 + i, "StarPos": [i * 40.0, 0.0, 0.0]} for i in range(count)])
+    return route
+
+
+def test_jumps_left_along_the_route():
+    route = create_route(5)
+    assert route.jumps_left == 4
+    route.arrive(101, (40.0, 0.0, 0.0), "2021-01-01T00:00:00Z")
+    route.arrive(102, (80.0, 0.0, 0.0), "2021-01-01T00:01:00Z")
+    assert route.jumps_left == 2 and route.remaining_distance == 80.0
+    assert route.eta == 120.0
+
+
+def test_off_route_counts_the_jump_back():
+    route = create_route(5)
+    route.arrive(101, (40.0, 0.0, 0.0), "2021-01-01T00:00:00Z")
+    route.arrive(1, (40.0, 30.0, 0.0))  # a detour to refuel, the next system is 50 Ly away
+    assert route.off_route is not None
+    assert route.jumps_left == 4  # back to Hop 2 and three more
+    assert route.remaining_distance == 50.0 + 80.0
+    route.arrive(102, (80.0, 0.0, 0.0))
+    assert route.off_route is None and route.jumps_left == 2
+    route.arrive(7, (80.0, 10.0, 0.0))
+    route.arrive(104, (160.0, 0.0, 0.0))  # back on the route further along
+    assert route.finished and route.jumps_left == 0
+
+
+def test_location_at_the_current_system_is_no_jump():
+    route = create_route(5)
+    route.arrive(101, (40.0, 0.0, 0.0), "2021-01-01T00:00:00Z")
+    route.arrive(102, (80.0, 0.0, 0.0), "2021-01-01T00:01:00Z")
+    assert route.seconds_per_jump == 60.0
+    route.arrive(102, (80.0, 0.0, 0.0), "2021-01-01T00:05:00Z", jumped=False)  # logged in again
+    assert route.resyncs == 0 and route.seconds_per_jump == 60.0 and route.jumps_left == 2
+    route.arrive(103, (120.0, 0.0, 0.0), "2021-01-01T00:06:00Z")
+    assert route.seconds_per_jump == 60.0  # the time since logging in doesn't count either
+    route.arrive(104, (160.0, 0.0, 0.0), "2021-01-01T00:09:00Z", jumped=False)  # moved while logged out
+    assert route.finished and route.resyncs == 1 and route.seconds_per_jump == 60.0
@@ -0,0 +1,37 @@
+import math
+import random
+
+from distcalc.proximity import ProximityAlerts, create_alerts
+
+
+def random_points(rng: random.Random, count: int, radius: float):
+    return [{"system": f"POI {i}", "x": rng.uniform(-40000, 40000), "y": rng.uniform(-2000, 2000), "z": rng.uniform(-10000, 70000),
+             "radius": rng.uniform(radius / 2, radius)} for i in range(count)]
+
+
+def walk(rng: random.Random, alerts: ProximityAlerts, points, jumps: int):
+    x, y, z = points[0]["x"], points[0]["y"], points[0]["z"]
+    for _ in range(jumps):
+        x, y, z = x + rng.gauss(0, 300), y + rng.gauss(0, 30), z + rng.gauss(0, 300)
+        alerts.move(x, y, z)
+        within = set(i for i, point in enumerate(points) if math.dist((point["x"], point["y"], point["z"]), (x, y, z)) <= point["radius"])
+        assert within <= alerts.inside
+
+
+def test_large_radii_are_not_checked_on_every_jump():
+    rng = random.Random(5)
+    points = random_points(rng, 5000, 1000.0)
+    alerts = create_alerts(points)
+    walk(rng, alerts, points, 200)
+    stats = alerts.stats()
+    assert stats["checked_per_jump"] < len(points) / 50
+    assert stats["buckets"] <= 27 * len(points)  # each POI touches at most 27 cells of its level
+
+
+def test_mixed_radii():
+    rng = random.Random(6)
+    points = random_points(rng, 2000, 30.0) + random_points(rng, 200, 600.0) + random_points(rng, 20, 20000.0)
+    alerts = create_alerts(points)
+    walk(rng, alerts, points, 200)
+    assert alerts.stats()["levels"] == 4  # 64, 512, 4096 and 32768 Ly
+    assert alerts.stats()["checked_per_jump"] < 100
@@ -0,0 +1,127 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from distcalc import publish
+
+# generous budgets, the benchmark measures about a tenth of them on a laptop
+WRITE_BUDGET = 1.0  # ms to write a full snapshot
+READ_BUDGET = 1.0  # ms to read a full snapshot
+NOTIFY_BUDGET = 20.0  # ms p99 until a notified reader has a new snapshot
+
+
+@pytest.fixture
+def port():
+    with socket.socket() as s:
+        s.bind((publish.NOTIFY_HOST, 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def writer(tmp_path, port):
+    writer = publish.SnapshotWriter(str(tmp_path / publish.SNAPSHOT_FILE_NAME), port=port)
+    yield writer
+    writer.close()
+
+
+def publish_next(writer, count: int = publish.CAPACITY):
+    # the distances are the sequence plus the number of the target, so a reader can tell torn snapshots
+    sequence = writer.sequence + 2
+    writer.publish((12.5, -3.25, 25000.0), [(f"Target {i}", float(sequence + i)) for i in range(count)], 1234.5, 67.8)
+
+
+def is_consistent(snapshot) -> bool:
+    return all(distance == snapshot.sequence + i for i, (_, distance) in enumerate(snapshot.targets))
+
+
+def test_read_what_was_written(writer):
+    reader = publish.SnapshotReader(writer.path)
+    try:
+        assert reader.read() is None
+        writer.publish(None, [("Sol", 12.5), ("Unknown", None)], None, 3.0)
+        snapshot = reader.read()
+        assert snapshot.coordinates is None and snapshot.travelled_total is None and snapshot.travelled_session == 3.0
+        assert snapshot.targets == [("Sol", 12.5), ("Unknown", None)] and snapshot.running
+    finally:
+        reader.close()
+
+
+def test_write_and_read_latency(writer):
+    reader = publish.SnapshotReader(writer.path)
+    try:
+        publish_next(writer)
+        reader.read()  # warm up
+        repeat = 200
+        start = time.perf_counter()
+        for _ in range(repeat):
+            publish_next(writer)
+        write_time = (time.perf_counter() - start) / repeat * 1000
+        start = time.perf_counter()
+        for _ in range(repeat):
+            snapshot = reader.read()
+        read_time = (time.perf_counter() - start) / repeat * 1000
+        assert len(snapshot.targets) == publish.CAPACITY and is_consistent(snapshot)
+    finally:
+        reader.close()
+    assert write_time < WRITE_BUDGET, f"writing a snapshot takes {write_time:.3f} ms"
+    assert read_time < READ_BUDGET, f"reading a snapshot takes {read_time:.3f} ms"
+
+
+def test_notified_latency(writer, port):
+    reader = publish.SnapshotReader(writer.path, port)
+    latencies = list()
+    count = 200
+
+    def follow():
+        while len(latencies) < count:
+            snapshot = reader.wait(5.0)
+            if snapshot is None:
+                break
+            latencies.append(time.time() - snapshot.timestamp)
+
+    publish_next(writer, 10)
+    reader.read()
+    thread = threading.Thread(target=follow)
+    thread.start()
+    try:
+        for _ in range(50):
+            if writer.connections:
+                break
+            time.sleep(0.01)
+        for _ in range(count):
+            publish_next(writer, 10)
+            time.sleep(0.002)
+        thread.join(10)
+    finally:
+        reader.close()
+    assert len(latencies) > count * 0.9
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    assert p99 < NOTIFY_BUDGET, f"p99 latency of notified readers is {p99:.2f} ms"
+
+
+def test_no_torn_reads(writer):
+    stop = threading.Event()
+
+    def write():
+        while not stop.is_set():
+            publish_next(writer)
+
+    publish_next(writer)
+    thread = threading.Thread(target=write)
+    thread.start()
+    reader = publish.SnapshotReader(writer.path)
+    sequences = set()
+    try:
+        end = time.monotonic() + 0.5
+        while time.monotonic() < end:
+            snapshot = reader.read()
+            assert snapshot is not None and is_consistent(snapshot)
+            sequences.add(snapshot.sequence)
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+    assert len(sequences) > 1  # the writer got to write in between
@@ -0,0 +1,46 @@
+import math
+import random
+
+import pytest
+
+from distcalc.route import NEUTRON_BOOST, RoutePlanner, StarMap, corridor_boxes
+
+
+def distance_to_line(point, start, end):
+    direction = [b - a for a, b in zip(start, end)]
+    length_squared = sum(d * d for d in direction) or 1.0
+    t = max(0.0, min(1.0, sum((p - s) * d for p, s, d in zip(point, start, direction)) / length_squared))
+    return math.dist(point, [s + t * d for s, d in zip(start, direction)])
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_corridor_boxes_cover_the_corridor_once(seed):
+    rng = random.Random(seed)
+    for _ in range(10):
+        start = tuple(rng.uniform(-1000, 1000) for _ in range(3))
+        end = rng.choice((start, tuple(rng.uniform(-20000, 20000) for _ in range(3))))
+        radius = rng.choice((10.0, 100.0))
+        boxes = list(corridor_boxes(start, end, radius, 4 * radius))
+        for _ in range(50):
+            # a random point of the corridor, some of them right at its edge
+            t = rng.random()
+            point = [s + t * (e - s) + rng.gauss(0, 1) for s, e in zip(start, end)]
+            offset = [rng.gauss(0, 1) for _ in range(3)]
+            scale = radius * rng.choice((rng.random(), 1.0)) / (math.hypot(*offset) or 1.0)
+            point = tuple(p + o * scale for p, o in zip(point, offset))
+            if distance_to_line(point, start, end) > radius:
+                continue
+            inside = [box for box in boxes if all(a <= c <= b for a, c, b in zip(box[0], point, box[1]))]
+            assert len(inside) == 1
+
+
+def test_neutron_stars_save_jumps():
+    rng = random.Random(3)
+    star_map = StarMap(50.0)
+    for i in range(20000):
+        star_map.add(f"Star {i}", rng.uniform(-100, 1300), rng.uniform(-100, 100), rng.uniform(-100, 100), i % 100 == 0)
+    planner = RoutePlanner(star_map, 50.0)
+    route = planner.plot((0.0, 0.0, 0.0), (1200.0, 0.0, 0.0))
+    assert route is not None and route.neutron_jumps > 0
+    assert route.jumps < math.ceil(1200.0 / 50.0) / 2
+    assert route.jumps >= math.ceil(1200.0 / (50.0 * NEUTRON_BOOST))
@@ -0,0 +1,91 @@
+import math
+import random
+
+import pytest
+
+from distcalc.spatial import SECTOR_ORIGIN, SECTOR_SIZE, SectorGrid
+
+
+def border_coordinates(rng: random.Random):
+    # close to the corner of a sector, so neighbours are often in the next sector
+    return tuple(SECTOR_ORIGIN[axis] + rng.randint(35, 45) * SECTOR_SIZE + rng.uniform(-30, 30) for axis in range(3))
+
+
+def random_entries(rng: random.Random, count: int):
+    entries = dict()
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            entries[i] = border_coordinates(rng)
+        elif kind == 1:
+            entries[i] = (rng.gauss(0, 100), rng.gauss(0, 100), rng.gauss(0, 100))  # crowded, the octrees split
+        elif kind == 2:
+            entries[i] = (25.0, 25.0, 25.0)  # many at the same position
+        else:
+            entries[i] = (rng.uniform(-40000, 40000), rng.uniform(-2000, 2000), rng.uniform(-10000, 70000))
+    return entries
+
+
+def brute_force(entries, position):
+    return sorted((math.dist(coordinates, position), key) for key, coordinates in entries.items())
+
+
+def check_queries(grid: SectorGrid, entries, rng: random.Random):
+    positions = [border_coordinates(rng) for _ in range(10)] + [(rng.gauss(0, 150), rng.gauss(0, 150), rng.gauss(0, 150)) for _ in range(10)]
+    positions += [(rng.uniform(-40000, 40000), rng.uniform(-2000, 2000), rng.uniform(-10000, 70000)) for _ in range(5)]
+    for position in positions:
+        expected = brute_force(entries, position)
+        for k in (1, 10, 50):
+            found = grid.nearest(*position, k)
+            assert len(found) == min(k, len(entries))
+            assert [distance for distance, _ in found] == pytest.approx([distance for distance, _ in expected[:k]])
+            assert all(math.dist(entries[key], position) == pytest.approx(distance) for distance, key in found)
+        radius = rng.choice((10.0, 100.0, 700.0))
+        found = grid.within(*position, radius)
+        assert sorted(key for _, key in found) == sorted(key for distance, key in expected if distance <= radius)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_matches_brute_force(seed):
+    rng = random.Random(seed)
+    entries = random_entries(rng, 2000)
+    grid = SectorGrid()
+    for key, coordinates in entries.items():
+        grid.insert(key, *coordinates)
+    assert len(grid) == len(entries)
+    check_queries(grid, entries, rng)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_after_insert_and_remove(seed):
+    rng = random.Random(100 + seed)
+    entries = random_entries(rng, 2000)
+    grid = SectorGrid()
+    for key, coordinates in entries.items():
+        grid.insert(key, *coordinates)
+
+    for key in rng.sample(sorted(entries), 800):  # collapses nodes and empties sectors
+        assert grid.remove(key)
+        del entries[key]
+    assert not grid.remove(-1)
+    for key in rng.sample(sorted(entries), 200):  # moving an entry replaces it
+        entries[key] = border_coordinates(rng)
+        grid.insert(key, *entries[key])
+    for key in range(2000, 2300):
+        entries[key] = border_coordinates(rng)
+        grid.insert(key, *entries[key])
+
+    assert len(grid) == len(entries)
+    assert all(key in grid for key in entries)
+    check_queries(grid, entries, rng)
+
+
+def test_empty_and_small_grids():
+    grid = SectorGrid()
+    assert grid.nearest(0, 0, 0, 5) == []
+    grid.insert("a", 0, 0, 0)
+    grid.insert("b", SECTOR_SIZE * 3, 0, 0)
+    assert [key for _, key in grid.nearest(SECTOR_SIZE * 2, 0, 0, 5)] == ["b", "a"]
+    grid.remove("a")
+    grid.remove("b")
+    assert len(grid) == 0 and grid.nearest(0, 0, 0, 1) == []
@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+
+from distcalc.core import STARTUP_DEFERRED_MODULES
+from distcalc.targetstore import DEFAULT_FILE_NAME, TargetStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Starts the plugin like EDMC does, in a new interpreter so nothing is imported already. EDMC's modules and tkinter are
+# replaced by stubs without a display. unittest.mock isn't used for them because it imports asyncio, which imports
+# some of the deferred modules itself.
+SCRIPT = """
+import sys, json, types
+from distcalc.core import MemoryConfig
+
+
+class Stub(object):
+    idle = list()  # callbacks for when the Tk loop is idle
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __getattr__(self, name):
+        return Stub()
+
+    def __getitem__(self, key):
+        return Stub()
+
+    def __setitem__(self, key, value):
+        pass
+
+    def get(self):
+        return ""
+
+    def after_idle(self, function, *args):
+        Stub.idle.append((function, args))
+
+
+def stub_module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__getattr__ = lambda attribute: Stub()
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+
+
+class Config(MemoryConfig):
+    default_journal_dir = sys.argv[2]
+
+
+stub_module("config", config=Config(), appname="EDMarketConnector")
+for name in ("l10n", "ttkHyperlinkLabel", "myNotebook", "tkinter", "tkinter.ttk"):
+    stub_module(name)
+
+
+def run_idle():
+    while Stub.idle:
+        function, args = Stub.idle.pop(0)
+        function(*args)
+
+
+import load
+load.plugin_start3(sys.argv[1])
+load.plugin_app(Stub())
+run_idle()
+for entry in ({"event": "Location", "StarSystem": "Sol", "SystemAddress": 10477373803, "StarPos": [0.0, 0.0, 0.0]},
+              {"event": "Loadout", "Ship": "anaconda", "MaxJumpRange": 65.5},
+              {"event": "FSDJump", "StarSystem": "Alpha Centauri", "SystemAddress": 1, "StarPos": [3.03, -0.09, 3.16], "JumpDist": 4.38}):
+    load.journal_entry("Jameson", False, entry.get("StarSystem", "Sol"), None, entry, dict())
+    run_idle()
+assert load.this.distanceCalc.ui_refreshes > 1 and load.this.distanceCalc.core.jump_range == 65.5
+load.plugin_stop()
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def test_deferred_modules_are_not_imported(tmp_path):
+    plugin_dir, journal_dir = tmp_path / "plugin", tmp_path / "journals"
+    plugin_dir.mkdir()
+    journal_dir.mkdir()
+    TargetStore(str(plugin_dir / DEFAULT_FILE_NAME)).save([{"system": f"Target {i}", "x": i * 10.0, "y": 0.0, "z": i * 100.0} for i in range(50)])
+    output = subprocess.run([sys.executable, "-c", SCRIPT, str(plugin_dir), str(journal_dir)], cwd=ROOT, env=dict(os.environ, PYTHONPATH=ROOT),
+                            capture_output=True, text=True)
+    assert output.returncode == 0, output.stderr
+    modules = json.loads(output.stdout)
+    imported = [name for name in STARTUP_DEFERRED_MODULES if name in modules]
+    assert not imported, f"imported while starting and after the first jump: {', '.join(imported)}"
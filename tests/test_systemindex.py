@@ -0,0 +1,60 @@
+import json
+import random
+
+import pytest
+
+from distcalc.systemindex import CELL_SIZE, SystemIndex, build_index
+
+
+@pytest.fixture(scope="module")
+def systems(tmp_path_factory):
+    rng = random.Random(12)
+    systems = list()
+    for i in range(20000):
+        if i % 4 == 0:
+            # on and next to cell borders
+            coordinates = tuple(rng.randint(-20, 20) * CELL_SIZE + rng.choice((-1e-3, 0.0, 1e-3)) for _ in range(3))
+        elif i % 4 == 1:
+            coordinates = (rng.gauss(0, 300), rng.gauss(0, 300), rng.gauss(0, 300))
+        elif i % 4 == 2:
+            coordinates = (rng.uniform(-40000, 40000), rng.uniform(-2000, 2000), rng.uniform(-10000, 70000))
+        else:
+            coordinates = (rng.choice((-1, 1)) * 1e9, rng.uniform(-100, 100), 0.0)  # outside of the grid
+        systems.append((f"System {i}", *coordinates))
+    path = tmp_path_factory.mktemp("index")
+    with open(path / "systems.json", "w", encoding="utf-8") as f:
+        f.write("[\n" + ",\n".join(json.dumps({"name": name, "coords": {"x": x, "y": y, "z": z}}) for name, x, y, z in systems) + "\n]\n")
+    build_index(str(path / "systems.json"), str(path / "systems.dcsi"))
+    index = SystemIndex(str(path / "systems.dcsi"))
+    yield index
+    index.close()
+
+
+def random_boxes(rng: random.Random):
+    for _ in range(40):
+        center = rng.choice(((0.0, 0.0, 0.0), (rng.randint(-20, 20) * CELL_SIZE, 0.0, rng.randint(-20, 20) * CELL_SIZE),
+                             (rng.uniform(-40000, 40000), 0.0, rng.uniform(-10000, 70000))))
+        size = rng.choice((1.0, CELL_SIZE, 1000.0, 20000.0))
+        yield (tuple(c - rng.uniform(0, size) for c in center), tuple(c + rng.uniform(0, size) for c in center))
+    yield (-2e9, -2e9, -2e9), (2e9, 2e9, 2e9)
+    yield (1.0, 1.0, 1.0), (0.0, 0.0, 0.0)  # empty
+
+
+def test_records_in_box_matches_scan(systems):
+    assert systems.cell_count > 0
+    rng = random.Random(1)
+    found = 0
+    for lower, upper in random_boxes(rng):
+        records = list(systems.records_in_box(lower, upper))
+        expected = list(systems._scan_box(lower, upper))
+        assert sorted(records) == sorted(expected)
+        for _, x, y, z in records:
+            assert all(a <= c <= b for a, c, b in zip(lower, (x, y, z), upper))
+        found += len(records)
+    assert found > len(systems)  # the boxes aren't all empty
+
+
+def test_records_on_cell_borders(systems):
+    for name, x, y, z in systems.records_in_box((-5 * CELL_SIZE,) * 3, (5 * CELL_SIZE,) * 3):
+        # a box around a single system has to find it, even if it is on the border of a cell
+        assert (name, x, y, z) in systems.records_in_box((x, y, z), (x, y, z))
@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from distcalc import tail
+from distcalc.persistence import TRAVELLED_KEY
+
+JOURNAL = "Journal.2026-10-17T120000.01.log"
+
+
+def jump(number: int) -> dict:
+    return {"timestamp": f"2026-10-17T12:{number // 60:02d}:{number % 60:02d}Z", "event": "FSDJump", "StarSystem": f"System {number}",
+            "StarPos": [float(number), 0.0, 0.0], "JumpDist": 1.5}
+
+
+def write(path, *entries):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(entry) + "\n" for entry in entries)
+
+
+@pytest.fixture
+def journal_dir(tmp_path):
+    directory = tmp_path / "journals"
+    directory.mkdir()
+    write(directory / JOURNAL, {"event": "LoadGame", "Commander": "Jameson"}, *map(jump, range(4)))
+    return directory
+
+
+def run(tmp_path, journal_dir, *args, seconds: float = 0.05):
+    assert tail.main(["--journal-dir", str(journal_dir), "--plugin-dir", str(tmp_path), "--poll", "--quiet", "--for", str(seconds), *args]) == 0
+    with open(tmp_path / tail.DEFAULT_STATE_FILE_NAME, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_first_start_begins_at_the_end(tmp_path, journal_dir):
+    state = run(tmp_path, journal_dir)
+    assert state[tail.JOURNAL_KEY] == JOURNAL and state[tail.OFFSET_KEY] == (journal_dir / JOURNAL).stat().st_size
+    assert not state.get(TRAVELLED_KEY)
+    write(journal_dir / JOURNAL, jump(4))
+    assert run(tmp_path, journal_dir)[TRAVELLED_KEY] == 1500
+
+
+def test_replay(tmp_path, journal_dir):
+    assert run(tmp_path, journal_dir, "--replay")[TRAVELLED_KEY] == 6000
+    assert run(tmp_path, journal_dir, "--replay")[TRAVELLED_KEY] == 6000  # only on the first start
+
+
+def test_saved_state_is_consistent(tmp_path, journal_dir, monkeypatch):
+    # every state that reaches the file has to be a valid point to continue from after a crash
+    states = list()
+    save = tail.FileConfig.save
+
+    def record(config):
+        save(config)
+        with open(config.path, encoding="utf-8") as f:
+            states.append(json.load(f))
+
+    jumps = iter(range(4, 10))
+    read = tail.JournalTail.read
+
+    def game_writes(self):
+        # the game makes a jump between two reads
+        number = next(jumps, None)
+        if number is not None:
+            write(journal_dir / JOURNAL, jump(number))
+        return read(self)
+
+    monkeypatch.setattr(tail.FileConfig, "save", record)
+    monkeypatch.setattr(tail.JournalTail, "read", game_writes)
+    run(tmp_path, journal_dir, "--replay", seconds=0.2)
+    with open(journal_dir / JOURNAL, "rb") as f:
+        data = f.read()
+    assert len(states) > 6
+    for state in states:
+        applied = [json.loads(line) for line in data[:state[tail.OFFSET_KEY]].splitlines()]
+        assert state.get(TRAVELLED_KEY, 0) == sum(int(entry.get("JumpDist", 0) * 1000) for entry in applied)
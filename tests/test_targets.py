@@ -0,0 +1,110 @@
+import os
+import json
+import math
+
+from distcalc.core import TARGETS_KEY, DistanceCore, MemoryConfig
+from distcalc.targets import TargetEditor
+from distcalc.targetstore import CORRUPT_SUFFIX, TargetStore
+
+TARGETS = [{"system": "Sol", "x": 0.0, "y": 0.0, "z": 0.0}, {"system": "Unknown", "x": None, "y": None, "z": None},
+           {"system": "Colonia", "x": -9530.5, "y": -910.28125, "z": 19808.125}]
+
+
+def test_editor_keeps_targets_without_coordinates():
+    editor = TargetEditor(TARGETS)
+    assert editor.get_targets() == TARGETS
+    assert list(editor.unresolved().values()) == ["Unknown"]
+    number = editor.order[1]
+    editor.update(number, "x", 10.0)  # one coordinate isn't enough
+    assert list(editor.unresolved().values()) == ["Unknown"]
+    editor.update(number, "y", 20.0)
+    editor.update(number, "z", 30.0)
+    assert not editor.unresolved()
+
+
+def test_store_keeps_targets_without_coordinates(tmp_path):
+    store = TargetStore(str(tmp_path / "targets.bin"))
+    partial = TARGETS + [{"system": "Partial", "x": 1.5, "y": None, "z": None}]
+    assert store.save(partial)
+    assert TargetStore(store.path).load() == partial
+    store.load()
+    rewrites = store.rewrites
+    resolved = [dict(target) for target in partial]
+    resolved[1].update(x=1.0, y=2.0, z=3.0)
+    assert store.save(resolved)
+    assert store.rewrites == rewrites and store.writes_in_place == 1  # only the coordinates changed
+    assert TargetStore(store.path).load() == resolved
+    assert store.save(partial) and store.writes_in_place == 2
+    assert store.save(partial) and store.writes_in_place == 2  # nothing changed, even though NaN isn't equal to itself
+
+
+def test_writes_in_place_are_synced(tmp_path, monkeypatch):
+    store = TargetStore(str(tmp_path / "targets.bin"))
+    assert store.save(TARGETS)
+    synced = list()
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(os.fstat(fd).st_size) or fsync(fd))
+    resolved = [dict(target) for target in TARGETS]
+    resolved[1].update(x=1.0, y=2.0, z=3.0)
+    assert store.save(resolved) and store.writes_in_place == 1
+    assert synced == [os.path.getsize(store.path)]
+
+
+def test_core_saves_targets_without_coordinates(tmp_path):
+    store = TargetStore(str(tmp_path / "targets.bin"))
+    core = DistanceCore(MemoryConfig(), str(tmp_path / "travelled.log"), target_store=store)
+    core.set_targets([dict(target) for target in TARGETS])
+    core.save_targets()
+    assert [name for name, _ in core.get_displayed_targets()] == ["Sol", "Colonia"]
+    core.coordinates = (0.0, 0.0, 0.0)
+    assert core.get_displayed_targets()[0] == ("Sol", 0.0)
+    assert math.isclose(core.get_displayed_targets()[1][1], math.dist((0, 0, 0), (-9530.5, -910.28125, 19808.125)))
+    core.close()
+    core = DistanceCore(MemoryConfig(), str(tmp_path / "travelled.log"), target_store=TargetStore(store.path))
+    assert core.distances == TARGETS
+    core.close()
+
+
+def test_unreadable_store_is_moved_aside(tmp_path):
+    store = TargetStore(str(tmp_path / "targets.bin"))
+    assert store.save(TARGETS)
+    with open(store.path, "rb") as f:
+        data = f.read()
+    with open(store.path, "wb") as f:
+        f.write(data[:len(data) // 2])  # truncated
+    assert store.load() == list()
+    with open(store.path + CORRUPT_SUFFIX, "rb") as f:
+        assert f.read() == data[:len(data) // 2]
+    assert store.save(TARGETS[:1])
+    assert TargetStore(store.path).load() == TARGETS[:1]
+    assert os.path.getsize(store.path + CORRUPT_SUFFIX) == len(data) // 2  # the next save doesn't touch it
+
+
+def test_unreadable_store_is_not_overwritten(tmp_path, monkeypatch):
+    store = TargetStore(str(tmp_path / "targets.bin"))
+    with open(store.path, "wb") as f:
+        f.write(b"not a target file")
+
+    def replace(source, destination):
+        raise PermissionError(source)
+
+    monkeypatch.setattr(os, "replace", replace)
+    assert store.load() == list()
+    assert not store.save(TARGETS)  # the core keeps them in the config instead
+    monkeypatch.undo()
+    with open(store.path, "rb") as f:
+        assert f.read() == b"not a target file"
+
+
+def test_migration_keeps_unreadable_store(tmp_path):
+    path = str(tmp_path / "targets.bin")
+    with open(path, "wb") as f:
+        f.write(b"DCTG broken")
+    config = MemoryConfig()
+    config.set(TARGETS_KEY, json.dumps(TARGETS))  # from a save that failed
+    core = DistanceCore(config, str(tmp_path / "travelled.log"), target_store=TargetStore(path))
+    assert core.distances == TARGETS
+    core.close()
+    assert TargetStore(path).load() == TARGETS and not config.get_str(TARGETS_KEY)
+    with open(path + CORRUPT_SUFFIX, "rb") as f:
+        assert f.read() == b"DCTG broken"